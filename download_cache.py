@@ -0,0 +1,111 @@
+"""
+Download Cache Manifest
+=======================
+Manifest-based cache for the downloaded datasets. For every dataset the
+manifest records the URL, ETag / Last-Modified, size and SHA-256 of the file on
+disk:
+
+    {"airports": {"url": "...", "filename": "airports_geographic.csv",
+                  "size": 12345678, "sha256": "...", "etag": "\"abc\"",
+                  "last_modified": "Tue, 01 Oct 2024 10:00:00 GMT",
+                  "fetched_at": "2024-10-02T03:00:00Z", "checked_at": "..."}}
+
+Before downloading, each local file is verified against its entry. A file
+that matches is re-requested conditionally (If-None-Match / If-Modified-Since),
+and a 304 answer means nothing is transferred. A file that is missing,
+truncated or altered is fetched again in full.
+
+Usage:
+    from download_cache import sync
+    results = sync(jobs, 'data/manifest.json')
+"""
+
+import json
+import os
+from datetime import datetime, timezone
+
+from downloader import download_all, hash_file
+
+MANIFEST_NAME = 'manifest.json'
+
+
+def _now():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def load_manifest(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically so an interrupted run never leaves it half-written."""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def file_sha256(path):
+    return hash_file(path).hexdigest()
+
+
+def verify(entry, path):
+    """
+    Check a file against its manifest entry.
+    Returns (valid, message).
+    """
+    if not os.path.exists(path):
+        return False, "File does not exist"
+    if not entry:
+        return False, "Not in manifest"
+
+    size = os.path.getsize(path)
+    if size != entry['size']:
+        return False, f"Size {size} does not match manifest ({entry['size']}), file is truncated or changed"
+    if file_sha256(path) != entry['sha256']:
+        return False, "SHA-256 does not match manifest, file is corrupted"
+
+    return True, "OK (size and SHA-256 match)"
+
+
+def sync(jobs, manifest_path, force=False, **download_kwargs):
+    """
+    Bring every job's file up to date, transferring only what changed upstream.
+
+    Each result gains a 'status' of 'downloaded' or 'not_modified'.
+    """
+    manifest = load_manifest(manifest_path)
+
+    for job in jobs:
+        entry = manifest.get(job['key'])
+        job['validators'] = None
+        if not force and entry and entry.get('url') == job['url']:
+            valid, _ = verify(entry, job['output_path'])
+            if valid:
+                job['validators'] = {'etag': entry.get('etag'), 'last_modified': entry.get('last_modified')}
+
+    results = download_all(jobs, **download_kwargs)
+
+    for job in jobs:
+        result = results[job['key']]
+        if not result['success']:
+            continue
+        if result['status'] == 'not_modified':
+            manifest[job['key']]['checked_at'] = _now()
+        else:
+            manifest[job['key']] = {
+                'url': job['url'],
+                'filename': os.path.basename(job['output_path']),
+                'size': result['size'],
+                'sha256': result['sha256'],
+                'etag': result['etag'],
+                'last_modified': result['last_modified'],
+                'fetched_at': _now(),
+                'checked_at': _now(),
+            }
+
+    save_manifest(manifest, manifest_path)
+    return results
@@ -0,0 +1,240 @@
+"""
+Concurrent Resumable Downloader
+===============================
+Thread-pool downloader used by sample.py.
+
+- Files download in parallel, with at most PER_HOST_LIMIT connections per host
+- Data streams into "<file>.part"; an interrupted download resumes from where
+  it stopped with an HTTP Range request, and the .part file is renamed only
+  once the transfer completes
+- One shared progress line reports every file in flight
+
+Usage:
+    from downloader import download_all
+    results = download_all([
+        {'key': 'airports', 'url': 'https://.../airports.csv', 'output_path': 'data/airports.csv'},
+    ])
+"""
+
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+MAX_WORKERS = 4
+PER_HOST_LIMIT = 2
+CHUNK_SIZE = 256 * 1024
+TIMEOUT = 60
+
+_host_semaphores = {}
+_host_lock = threading.Lock()
+
+
+class DownloadCancelled(Exception):
+    """Raised inside a worker when the whole batch has been interrupted."""
+
+
+def format_size(bytes):
+    """Convert bytes to human-readable format."""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if bytes < 1024.0:
+            return f"{bytes:.2f} {unit}"
+        bytes /= 1024.0
+    return f"{bytes:.2f} TB"
+
+
+def host_semaphore(url, limit=PER_HOST_LIMIT):
+    """Return the semaphore bounding concurrent connections to the URL's host."""
+    host = urlsplit(url).netloc
+    with _host_lock:
+        if host not in _host_semaphores:
+            _host_semaphores[host] = threading.BoundedSemaphore(limit)
+        return _host_semaphores[host]
+
+
+# ============================================================================
+# PROGRESS REPORTING
+# ============================================================================
+
+class Progress:
+    """Thread-safe progress line covering every download in flight."""
+
+    def __init__(self, stream=sys.stdout):
+        self.stream = stream
+        self.lock = threading.Lock()
+        self.files = {}
+
+    def update(self, key, downloaded, total):
+        with self.lock:
+            self.files[key] = (downloaded, total)
+            parts = []
+            for name, (done, size) in self.files.items():
+                if size:
+                    parts.append(f"{name} {min(done * 100 / size, 100):.0f}%")
+                else:
+                    parts.append(f"{name} {done / (1024 * 1024):.1f} MB")
+            print('\r  ' + ' | '.join(parts), end='', flush=True, file=self.stream)
+
+    def finish(self):
+        with self.lock:
+            if self.files:
+                print(file=self.stream)
+
+
+# ============================================================================
+# DOWNLOAD
+# ============================================================================
+
+def _content_range_total(header):
+    """Parse the total size out of 'bytes 100-199/1000' or 'bytes */1000'."""
+    match = re.search(r'/(\d+)$', header or '')
+    return int(match.group(1)) if match else None
+
+
+def _validators(headers):
+    """ETag / Last-Modified of a response, for later conditional requests."""
+    return {'etag': headers.get('ETag'), 'last_modified': headers.get('Last-Modified')}
+
+
+def hash_file(path, digest=None):
+    """Feed a file's bytes into a hashlib digest (SHA-256 by default)."""
+    digest = digest or hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest
+
+
+def download_file(url, output_path, key=None, progress=None, timeout=TIMEOUT,
+                  per_host_limit=PER_HOST_LIMIT, cancel=None, validators=None):
+    """
+    Download url to output_path, resuming from output_path + '.part' if a
+    previous attempt was interrupted.
+
+    If validators ({'etag', 'last_modified'} from an earlier download) are given
+    and output_path exists, the request is conditional and an unchanged file is
+    not transferred again.
+
+    Returns {'status': 'downloaded' | 'not_modified', 'size', 'sha256', 'etag',
+    'last_modified'}; sha256 is None when nothing was transferred.
+    """
+    key = key or os.path.basename(output_path)
+    part_path = output_path + '.part'
+    part_meta_path = part_path + '.json'
+    existing = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+    request = urllib.request.Request(url)
+    if existing:
+        request.add_header('Range', f'bytes={existing}-')
+        # Only resume if the resource is still the version the .part came from
+        if os.path.exists(part_meta_path):
+            with open(part_meta_path) as f:
+                part_validators = json.load(f)
+            if part_validators.get('etag') or part_validators.get('last_modified'):
+                request.add_header('If-Range', part_validators['etag'] or part_validators['last_modified'])
+    elif validators and os.path.exists(output_path):
+        if validators.get('etag'):
+            request.add_header('If-None-Match', validators['etag'])
+        if validators.get('last_modified'):
+            request.add_header('If-Modified-Since', validators['last_modified'])
+
+    with host_semaphore(url, per_host_limit):
+        try:
+            response = urllib.request.urlopen(request, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return {'status': 'not_modified', 'size': os.path.getsize(output_path),
+                        'sha256': None, **validators}
+            # 416: the .part file already holds the whole resource
+            if e.code == 416 and existing and _content_range_total(e.headers.get('Content-Range')) == existing:
+                return _finish(part_path, output_path, existing, hash_file(part_path),
+                               _read_part_validators(part_meta_path))
+            raise
+
+        with response:
+            digest = hashlib.sha256()
+            if existing and response.status == 206:
+                mode = 'ab'
+                total = _content_range_total(response.headers.get('Content-Range'))
+                hash_file(part_path, digest)
+            else:
+                # Server ignored the Range header (or the resource changed): start over
+                mode = 'wb'
+                existing = 0
+                length = response.headers.get('Content-Length')
+                total = int(length) if length else None
+                with open(part_meta_path, 'w') as f:
+                    json.dump(_validators(response.headers), f)
+
+            downloaded = existing
+            with open(part_path, mode) as f:
+                while True:
+                    if cancel is not None and cancel.is_set():
+                        raise DownloadCancelled(f"{key} interrupted at {downloaded} bytes")
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    digest.update(chunk)
+                    downloaded += len(chunk)
+                    if progress:
+                        progress.update(key, downloaded, total)
+
+    if total is not None and downloaded != total:
+        raise IOError(f"incomplete download: got {downloaded} of {total} bytes (run again to resume)")
+
+    return _finish(part_path, output_path, downloaded, digest, _read_part_validators(part_meta_path))
+
+
+def _read_part_validators(part_meta_path):
+    if not os.path.exists(part_meta_path):
+        return {'etag': None, 'last_modified': None}
+    with open(part_meta_path) as f:
+        return json.load(f)
+
+
+def _finish(part_path, output_path, size, digest, validators):
+    """Move a completed .part file into place and describe the result."""
+    os.replace(part_path, output_path)
+    if os.path.exists(part_path + '.json'):
+        os.remove(part_path + '.json')
+    return {'status': 'downloaded', 'size': size, 'sha256': digest.hexdigest(), **validators}
+
+
+def download_all(jobs, max_workers=MAX_WORKERS, per_host_limit=PER_HOST_LIMIT, progress=None):
+    """
+    Download every job ({'key', 'url', 'output_path'} plus optional
+    'validators') concurrently.
+
+    Returns {key: {'success': bool, 'error': str or None, **download_file result}}.
+    """
+    progress = progress or Progress()
+    cancel = threading.Event()
+
+    def run(job):
+        try:
+            result = download_file(job['url'], job['output_path'], key=job['key'],
+                                   progress=progress, per_host_limit=per_host_limit, cancel=cancel,
+                                   validators=job.get('validators'))
+            return job['key'], {'success': True, 'error': None, **result}
+        except Exception as e:
+            return job['key'], {'success': False, 'size': 0, 'error': str(e)}
+
+    pool = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        results = dict(pool.map(run, jobs))
+    except KeyboardInterrupt:
+        # Let workers stop at the next chunk; their .part files are kept for resuming
+        cancel.set()
+        raise
+    finally:
+        pool.shutdown(wait=True)
+        progress.finish()
+
+    return results
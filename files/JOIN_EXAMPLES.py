@@ -7,18 +7,42 @@ Usage:
     Copy-paste these examples into your merge script
 """
 
+import os
+import sys
+
 import pandas as pd
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src1'))
+from airline_resolver import AirlineResolver, add_review_carrier
+from dimensions import load_dimensions
+from ingest import load_dataset
+from instrument import Sections
+from weather_join import join_weather
+
+# Per-section timings (read by src1/benchmark.py)
+sections = Sections()
+
 # ============================================================================
 # LOAD ALL DATASETS
 # ============================================================================
 
-# Load data
-bts = pd.read_csv('data/raw/bts_airline_delays.csv')
-airports = pd.read_csv('data/raw/airports_geographic.csv')
-weather = pd.read_csv('data/raw/weather_all_airports.csv')
-reviews = pd.read_csv('data/raw/skytrax_airline_reviews.csv')
+sections.section('load')
+
+# Load data (from the Parquet store written by src1/ingest.py when present,
+# otherwise from the raw CSVs). Every flight column is kept, as all of them are
+# written to merged_complete.csv; weather is read only for the columns joined
+RAW_DIR = 'data/raw'
+STORE_DIR = 'data/store'
+
+bts = load_dataset('flights', raw_dir=RAW_DIR, store_dir=STORE_DIR)
+# Cleaned airport and airline lookup tables (see src1/dimensions.py)
+dimensions = load_dimensions(RAW_DIR, STORE_DIR)
+airports = dimensions['airports']
+weather = load_dataset('weather', columns=[
+    'station', 'valid', 'tmpf', 'dwpf', 'relh', 'sknt', 'p01i', 'vsby', 'gust'
+], raw_dir=RAW_DIR, store_dir=STORE_DIR)
+reviews = load_dataset('reviews', raw_dir=RAW_DIR, store_dir=STORE_DIR)
 
 print("Datasets loaded!")
 print(f"BTS: {len(bts):,} rows")
@@ -30,33 +54,26 @@ print(f"Reviews: {len(reviews):,} rows")
 # JOIN 1: BTS + AIRPORTS (Add Geographic Data)
 # ============================================================================
 
+sections.section('join_geo')
 print("\n" + "="*70)
 print("JOIN 1: BTS + AIRPORTS")
 print("="*70)
 
-# Clean airport codes (remove whitespace, uppercase)
+# Clean airport codes (remove whitespace, uppercase); the airport dimension's
+# IATA codes are already cleaned
 bts['Origin'] = bts['Origin'].str.strip().str.upper()
-airports['iata_code'] = airports['iata_code'].str.strip().str.upper()
 
 # Filter to US airports only (optional but recommended)
-us_airports = airports[airports['iso_country'] == 'US'].copy()
+us_airports = airports.subset(airports.table['iso_country'] == 'US')
 
-# Perform LEFT JOIN (keep all BTS records)
-bts_with_geo = bts.merge(
-    us_airports[['iata_code', 'name', 'latitude_deg', 'longitude_deg', 'elevation_ft', 'type']],
-    left_on='Origin',
-    right_on='iata_code',
-    how='left'
-)
-
-# Rename columns for clarity
-bts_with_geo = bts_with_geo.rename(columns={
-    'name': 'origin_airport_name',
-    'latitude_deg': 'origin_lat',
-    'longitude_deg': 'origin_lon',
-    'elevation_ft': 'origin_elevation',
-    'type': 'origin_type'
-})
+# LEFT JOIN as one lookup on the airport code (keeps all BTS records, in order)
+bts_with_geo = bts.assign(**us_airports.join(bts['Origin'], {
+    'origin_airport_name': 'name',
+    'origin_lat': 'latitude_deg',
+    'origin_lon': 'longitude_deg',
+    'origin_elevation': 'elevation_ft',
+    'origin_type': 'type',
+}))
 
 print(f"✓ Merged BTS + Airports: {len(bts_with_geo):,} rows")
 print(f"  Matched airports: {bts_with_geo['origin_lat'].notna().sum():,}")
@@ -70,39 +87,25 @@ print(bts_with_geo[['Origin', 'origin_airport_name', 'origin_lat', 'origin_lon',
 # JOIN 2: BTS + WEATHER (Add Weather Conditions)
 # ============================================================================
 
+sections.section('join_weather')
 print("\n" + "="*70)
 print("JOIN 2: BTS + WEATHER")
 print("="*70)
 
 # Convert dates to datetime
 bts_with_geo['FlightDate'] = pd.to_datetime(bts_with_geo['FlightDate'])
-weather['valid'] = pd.to_datetime(weather['valid'])
-
-# Extract date only (ignore time for daily matching)
-bts_with_geo['date_only'] = bts_with_geo['FlightDate'].dt.date
-weather['date_only'] = weather['valid'].dt.date
 
 # OPTION A: Match with daily average weather
-# Aggregate weather to daily averages
-weather_daily = weather.groupby(['station', 'date_only']).agg({
-    'tmpf': 'mean',      # Average temperature
-    'dwpf': 'mean',      # Average dew point
-    'relh': 'mean',      # Average humidity
-    'sknt': 'mean',      # Average wind speed
-    'p01i': 'sum',       # Total precipitation
-    'vsby': 'mean',      # Average visibility
-    'gust': 'max'        # Max gust
-}).reset_index()
+# Hourly observations are aggregated per (station, day) and matched on the
+# flight's origin and date, keeping datetime64 keys (see src1/weather_join.py)
+bts_with_weather = join_weather(bts_with_geo, weather, on='Origin', time_col='FlightDate', align='daily')
 
-print(f"  Weather aggregated to {len(weather_daily):,} daily records")
+# OPTION B: Match the nearest hourly observation within an hour of departure
+# (needs a departure timestamp column, e.g. FlightDate + CRSDepTime):
+# bts_with_weather = join_weather(bts_with_geo, weather, on='Origin', time_col='dep_time',
+#                                 align='hourly', direction='nearest', tolerance='1h')
 
-# Merge
-bts_with_weather = bts_with_geo.merge(
-    weather_daily,
-    left_on=['Origin', 'date_only'],
-    right_on=['station', 'date_only'],
-    how='left'
-)
+print(f"  Weather matched from {len(weather):,} hourly observations")
 
 print(f"✓ Merged BTS + Weather: {len(bts_with_weather):,} rows")
 print(f"  Weather matched: {bts_with_weather['tmpf'].notna().sum():,}")
@@ -118,26 +121,15 @@ if bts_with_weather['vsby'].notna().sum() > 0:
 # JOIN 3: BTS + REVIEWS (Add Customer Sentiment)
 # ============================================================================
 
+sections.section('join_reviews')
 print("\n" + "="*70)
 print("JOIN 3: BTS + REVIEWS")
 print("="*70)
 
-# Create airline mapping (from airline names to carrier codes)
-airline_mapping = {
-    'american-airlines': 'AA',
-    'delta-air-lines': 'DL',
-    'united-airlines': 'UA',
-    'southwest-airlines': 'WN',
-    'alaska-airlines': 'AS',
-    'jetblue-airways': 'B6',
-    'spirit-airlines': 'NK',
-    'frontier-airlines': 'F9',
-    'allegiant-air': 'G4',
-    'hawaiian-airlines': 'HA',
-}
-
-# Apply mapping
-reviews['carrier_code'] = reviews['airline_name'].map(airline_mapping)
+# Map airline names to carrier codes, with a match confidence (see
+# src1/airline_resolver.py); each distinct name is matched once
+add_review_carrier(reviews, AirlineResolver.from_carriers())
+print(f"  Reviews matched to a carrier: {reviews['carrier_code'].notna().sum():,}")
 
 # Parse dates
 reviews['date_flown'] = pd.to_datetime(reviews['date_flown'], errors='coerce')
@@ -172,12 +164,13 @@ print(f"  Review data matched: {bts_complete['avg_rating'].notna().sum():,}")
 # CREATE VISUALIZATION-READY DATASETS
 # ============================================================================
 
+sections.section('viz_datasets')
 print("\n" + "="*70)
 print("CREATING VISUALIZATION DATASETS")
 print("="*70)
 
 # Dataset 1: Airport Summary (for map and bar chart)
-airport_summary = bts_complete.groupby('Origin').agg({
+airport_summary = bts_complete.groupby('Origin', observed=True).agg({
     'DepDelay': 'mean',
     'CarrierDelay': 'mean',
     'WeatherDelay': 'mean',
@@ -202,7 +195,7 @@ weather_delay_corr = bts_complete[
 print(f"✓ Weather-delay data: {len(weather_delay_corr):,} observations")
 
 # Dataset 3: Carrier sentiment vs performance (for gap analysis)
-carrier_summary = bts_complete.groupby('Carrier').agg({
+carrier_summary = bts_complete.groupby('Carrier', observed=True).agg({
     'DepDelay': 'mean',
     'WeatherDelay': 'mean',
     'CarrierDelay': 'mean',
@@ -229,6 +222,7 @@ print(f"✓ Daily time series: {len(daily_summary)} days")
 # SAVE PROCESSED DATA
 # ============================================================================
 
+sections.section('save')
 print("\n" + "="*70)
 print("SAVING DATASETS")
 print("="*70)
@@ -257,6 +251,7 @@ print("✓ Saved: viz_daily_summary.csv")
 # PRINT SUMMARY STATISTICS
 # ============================================================================
 
+sections.section('summary')
 print("\n" + "="*70)
 print("SUMMARY STATISTICS")
 print("="*70)
@@ -285,6 +280,8 @@ if len(weather_delay_corr) > 0:
         print(f"  Avg delay when vsby >= 3 miles: {high_vis['WeatherDelay'].mean():.1f} min")
         print(f"  Difference: {low_vis['WeatherDelay'].mean() - high_vis['WeatherDelay'].mean():.1f} min")
 
+sections.end()
+
 print("\n" + "="*70)
 print("✅ ALL JOINS COMPLETE!")
 print("="*70)
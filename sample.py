@@ -5,19 +5,29 @@ Downloads all datasets for Airline Performance Dashboard project
 
 This script will:
 1. Create data/raw/ folder structure
-2. Download all 4 datasets automatically
+2. Download all 4 datasets automatically, in parallel
 3. Show progress and file sizes
 4. Verify downloads
 
+Interrupted downloads are kept as .part files and resumed on the next run.
+
+Unchanged files are not downloaded again: data/manifest.json records each
+file's ETag/Last-Modified, size and SHA-256, and re-runs send conditional
+requests. The script never prompts, so it can run from cron.
+
 Usage:
-    python download_all_datasets.py
+    python download_all_datasets.py [--force]
 """
 
-import urllib.request
+import argparse
 import os
 import time
 from pathlib import Path
 
+from download_cache import MANIFEST_NAME, load_manifest, sync, verify
+from downloader import format_size
+from weather_fetch import WEATHER_CONFIG, fetch_weather
+
 # ============================================================================
 # CONFIGURATION
 # ============================================================================
@@ -33,17 +43,18 @@ DATASETS = {
         'url': 'https://raw.githubusercontent.com/quankiquanki/skytrax-reviews-dataset/master/data/airline.csv',
         'filename': 'skytrax_airline_reviews.csv',
         'description': 'Skytrax Airline Reviews'
-    },
-    'weather': {
-        'url': 'https://mesonet.agron.iastate.edu/cgi-bin/request/asos.py?station=ATL&station=ORD&station=DEN&station=LAX&station=JFK&station=DFW&station=SFO&station=MIA&data=tmpf&data=dwpf&data=relh&data=drct&data=sknt&data=p01i&data=vsby&data=gust&data=skyc1&data=skyc2&data=feel&year1=2023&month1=1&day1=1&year2=2024&month2=12&day2=31&tz=Etc/UTC&format=comma&latlon=yes',
-        'filename': 'weather_all_airports.csv',
-        'description': 'Weather Data (8 Airports Combined)'
     }
 }
 
+# Weather comes from weather_fetch.py in station/month chunks (see WEATHER_CONFIG
+# there) and is written as Parquet under <OUTPUT_DIR>/store/weather
+
 # Output directory
 OUTPUT_DIR = '/Users/preddy/Desktop/DataVisualization/InClass_Activity/DV_PROJECT/data'
 
+# Size, SHA-256 and ETag/Last-Modified of every downloaded file
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, MANIFEST_NAME)
+
 # ============================================================================
 # HELPER FUNCTIONS
 # ============================================================================
@@ -53,80 +64,25 @@ def create_directory():
     Path(OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
     print(f"✓ Created directory: {OUTPUT_DIR}")
 
-def format_size(bytes):
-    """Convert bytes to human-readable format."""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if bytes < 1024.0:
-            return f"{bytes:.2f} {unit}"
-        bytes /= 1024.0
-    return f"{bytes:.2f} TB"
-
-def download_with_progress(url, output_path, description):
-    """
-    Download a file with progress indication.
-    """
-    print(f"\n{'='*70}")
-    print(f"📥 Downloading: {description}")
-    print(f"{'='*70}")
-    print(f"URL: {url[:80]}...")
-    print(f"Saving to: {output_path}")
-    print()
-    
-    try:
-        # Download with progress
-        def reporthook(block_num, block_size, total_size):
-            downloaded = block_num * block_size
-            if total_size > 0:
-                percent = min(downloaded * 100 / total_size, 100)
-                downloaded_mb = downloaded / (1024 * 1024)
-                total_mb = total_size / (1024 * 1024)
-                
-                # Progress bar
-                bar_length = 40
-                filled = int(bar_length * percent / 100)
-                bar = '█' * filled + '░' * (bar_length - filled)
-                
-                print(f'\r  [{bar}] {percent:.1f}% ({downloaded_mb:.1f}/{total_mb:.1f} MB)', 
-                      end='', flush=True)
-            else:
-                # Unknown size
-                downloaded_mb = downloaded / (1024 * 1024)
-                print(f'\r  Downloaded: {downloaded_mb:.1f} MB', end='', flush=True)
-        
-        # Perform download
-        urllib.request.urlretrieve(url, output_path, reporthook)
-        print()  # New line after progress
-        
-        # Get final file size
-        file_size = os.path.getsize(output_path)
-        print(f"✓ Download complete! Size: {format_size(file_size)}")
-        
-        return True, file_size
-        
-    except Exception as e:
-        print(f"\n✗ Download failed: {e}")
-        return False, 0
-
-def verify_file(filepath, min_size_kb=10):
+def verify_file(filepath, manifest):
     """
-    Verify that a file exists and is not empty/corrupted.
+    Verify that a file exists and matches the size and SHA-256 recorded in
+    the download manifest (catches truncated or corrupted files).
     """
-    if not os.path.exists(filepath):
-        return False, "File does not exist"
-    
-    file_size = os.path.getsize(filepath)
-    if file_size < min_size_kb * 1024:
-        return False, f"File too small ({format_size(file_size)}), may be corrupted"
-    
-    return True, f"OK ({format_size(file_size)})"
+    entry = next((e for e in manifest.values() if e.get('filename') == os.path.basename(filepath)), None)
+    valid, message = verify(entry, filepath)
+    if valid:
+        message = f"OK ({format_size(entry['size'])}, sha256 {entry['sha256'][:12]}…)"
+    return valid, message
 
 # ============================================================================
 # MAIN DOWNLOAD FUNCTION
 # ============================================================================
 
-def main():
+def main(force=False):
     """
-    Main function to download all datasets.
+    Main function to download all datasets. Runs without prompts; pass
+    force=True (--force) to ignore the manifest and fetch everything again.
     """
     print()
     print("╔" + "="*68 + "╗")
@@ -136,15 +92,13 @@ def main():
     print("This script will download 3 datasets:")
     print("  1. Airport Geographic Data (~5 MB)")
     print("  2. Skytrax Airline Reviews (~33 MB)")
-    print("  3. Weather Data for 8 Airports (~15-25 MB)")
+    print(f"  3. Weather Data for {len(WEATHER_CONFIG['stations'])} Airports (~15-25 MB, "
+          f"one request per station and {WEATHER_CONFIG['chunk']})")
     print()
     print("Total estimated download: ~50-60 MB")
     print("Estimated time: 2-5 minutes (depends on internet speed)")
     print()
     
-    input("Press ENTER to start downloading...")
-    print()
-    
     # Create output directory
     create_directory()
     print()
@@ -154,34 +108,30 @@ def main():
     total_size = 0
     start_time = time.time()
     
-    # Download each dataset
-    for key, dataset in DATASETS.items():
-        url = dataset['url']
-        filename = dataset['filename']
-        description = dataset['description']
-        output_path = os.path.join(OUTPUT_DIR, filename)
-        
-        # Check if file already exists
-        if os.path.exists(output_path):
-            print(f"\n⚠️  File already exists: {filename}")
-            response = input("    Overwrite? (y/n): ").lower()
-            if response != 'y':
-                print("    Skipped.")
-                file_size = os.path.getsize(output_path)
-                results[key] = {'success': True, 'size': file_size, 'skipped': True}
-                total_size += file_size
-                continue
-        
-        # Download
-        success, file_size = download_with_progress(url, output_path, description)
-        results[key] = {'success': success, 'size': file_size, 'skipped': False}
-        
-        if success:
-            total_size += file_size
-        
-        # Be nice to servers - wait between downloads
-        if key != list(DATASETS.keys())[-1]:  # If not the last one
-            time.sleep(2)
+    # Every dataset is checked against the manifest: unchanged files are
+    # revalidated with a conditional request and not transferred again
+    jobs = [
+        {'key': key, 'url': dataset['url'], 'output_path': os.path.join(OUTPUT_DIR, dataset['filename'])}
+        for key, dataset in DATASETS.items()
+    ]
+    
+    print(f"📥 Syncing {len(jobs)} dataset(s)...")
+    for job in jobs:
+        print(f"   • {DATASETS[job['key']]['description']} -> {job['output_path']}")
+    print()
+    
+    for key, result in sync(jobs, MANIFEST_PATH, force=force).items():
+        skipped = result['success'] and result['status'] == 'not_modified'
+        results[key] = {'success': result['success'], 'size': result['size'], 'skipped': skipped}
+        if result['success']:
+            total_size += result['size']
+        else:
+            print(f"✗ {DATASETS[key]['filename']} failed: {result['error']}")
+    
+    # Weather: chunked requests, only the chunks not already on disk
+    weather_dir = os.path.join(OUTPUT_DIR, 'store', 'weather')
+    print(f"\n🌦  Fetching weather chunks into {weather_dir}")
+    weather = fetch_weather(WEATHER_CONFIG, weather_dir)
     
     # Calculate total time
     elapsed_time = time.time() - start_time
@@ -203,7 +153,7 @@ def main():
         filename = dataset['filename']
         
         if result.get('skipped'):
-            status = "⊙ Skipped"
+            status = "⊙ Unchanged"
         elif result['success']:
             status = "✓ Success"
         else:
@@ -212,6 +162,10 @@ def main():
         size = format_size(result['size']) if result['size'] > 0 else "-"
         print(f"{filename:<35} {status:<15} {size:<15}")
     
+    weather_status = "✗ Failed" if weather['failed'] else "✓ Success"
+    weather_note = f"{weather['fetched']} new / {weather['skipped']} cached chunks"
+    print(f"{'store/weather/':<35} {weather_status:<15} {weather_note}")
+    
     print("-" * 70)
     print(f"{'TOTAL':<35} {success_count}/{len(DATASETS)} {'':>5} {format_size(total_size):<15}")
     print()
@@ -222,11 +176,12 @@ def main():
     print("Verifying downloads...")
     print("-" * 70)
     
+    manifest = load_manifest(MANIFEST_PATH)
     all_valid = True
     for key, dataset in DATASETS.items():
         filename = dataset['filename']
         filepath = os.path.join(OUTPUT_DIR, filename)
-        valid, message = verify_file(filepath)
+        valid, message = verify_file(filepath, manifest)
         
         status = "✓" if valid else "✗"
         print(f"  {status} {filename:<35} {message}")
@@ -234,6 +189,10 @@ def main():
         if not valid:
             all_valid = False
     
+    if weather['failed']:
+        print(f"  ✗ {'store/weather/':<35} {len(weather['failed'])} chunk(s) failed; run again to retry them")
+        all_valid = False
+    
     print()
     
     # Final status
@@ -280,8 +239,13 @@ def main():
 # ============================================================================
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Download the project datasets.")
+    parser.add_argument('--force', action='store_true',
+                        help="Ignore the manifest and download every file again")
+    args = parser.parse_args()
+    
     try:
-        main()
+        main(force=args.force)
     except KeyboardInterrupt:
         print("\n\n⚠️  Download interrupted by user.")
         print("   Run the script again to resume.\n")
@@ -6,11 +6,36 @@ let dataCache = {
   delays: null,
   reviews: null,
   airports: null,
+  reviewCarriers: null,
   loading: false,
   promise: null
 }
 
-// Load all data once and cache it
+let reviewsPromise = null
+
+// Load the reviews (and the review -> carrier matches) once and cache them.
+// The KPI strip needs these whether or not the query service is running.
+export async function loadReviews() {
+  if (!reviewsPromise) {
+    reviewsPromise = Promise.all([
+      d3.csv('/skytrax_airline_reviews.csv'),
+      d3.csv('/review_carriers.csv').catch(() => null) // Optional, from src1/dataProcess.py
+    ])
+      .then(([reviews, reviewCarriers]) => {
+        dataCache.reviews = reviews
+        dataCache.reviewCarriers = reviewCarrierMap(reviewCarriers)
+        return reviews
+      })
+      .catch(error => {
+        reviewsPromise = null
+        throw error
+      })
+  }
+  return reviewsPromise
+}
+
+// Load all data once and cache it. The full delay CSV is only needed when the
+// query service is not running.
 export async function loadAllData() {
   // If already loading, return the existing promise
   if (dataCache.loading && dataCache.promise) {
@@ -32,13 +57,12 @@ export async function loadAllData() {
   // Create promise for data loading
   dataCache.promise = Promise.all([
     d3.csv('/Airline_Delay_Cause.csv'),
-    d3.csv('/skytrax_airline_reviews.csv'),
+    loadReviews(),
     d3.csv('/airports_geographic.csv').catch(() => null) // Optional
   ])
     .then(([delays, reviews, airports]) => {
       // Cache the data
       dataCache.delays = delays
-      dataCache.reviews = reviews
       dataCache.airports = airports
       dataCache.loading = false
 
@@ -63,10 +87,12 @@ export async function getCachedData() {
 
 // Clear cache (useful for testing or forced refresh)
 export function clearDataCache() {
+  reviewsPromise = null
   dataCache = {
     delays: null,
     reviews: null,
     airports: null,
+    reviewCarriers: null,
     loading: false,
     promise: null
   }
@@ -109,8 +135,38 @@ export function filterDelayData(delays, filters = {}) {
   })
 }
 
+// airline_name -> BTS carrier_name for the names the Python resolver matched
+// (src1/airline_resolver.py), so reviews filter by carrier with one lookup
+function reviewCarrierMap(rows) {
+  if (!rows) return null
+  const map = new Map()
+  rows.forEach(row => {
+    if (row.carrier_name) map.set(row.airline_name, row.carrier_name)
+  })
+  return map
+}
+
+// Fuzzy fallback when review_carriers.csv is not available
+function airlineMatchesCarrier(airlineName, carrier) {
+  const reviewAirline = (airlineName || '').toLowerCase().trim()
+  const filterCarrier = carrier.toLowerCase().trim()
+
+  // Check if airline name contains carrier or vice versa
+  if (reviewAirline.includes(filterCarrier) || filterCarrier.includes(reviewAirline)) return true
+
+  // Try partial matching
+  const reviewWords = reviewAirline.split(/\s+/)
+  const filterWords = filterCarrier.split(/\s+/)
+
+  return reviewWords.some(rw =>
+    filterWords.some(fw => rw.includes(fw) || fw.includes(rw))
+  )
+}
+
 // Filter review data based on common filters
 export function filterReviewData(reviews, filters = {}) {
+  const reviewCarriers = dataCache.reviewCarriers
+
   return reviews.filter(row => {
     const date = new Date(row.date)
     const year = date.getFullYear()
@@ -123,22 +179,12 @@ export function filterReviewData(reviews, filters = {}) {
       if (year < filters.yearStart || year > filters.yearEnd) return false
     }
     
-    // Carrier/Airline filter (fuzzy match since names might differ)
+    // Carrier/Airline filter: the precomputed match, or fuzzy matching without it
     if (filters.selectedCarrier) {
-      const reviewAirline = (row.airline_name || '').toLowerCase().trim()
-      const filterCarrier = filters.selectedCarrier.toLowerCase().trim()
-      
-      // Check if airline name contains carrier or vice versa
-      if (!reviewAirline.includes(filterCarrier) && !filterCarrier.includes(reviewAirline)) {
-        // Try partial matching
-        const reviewWords = reviewAirline.split(/\s+/)
-        const filterWords = filterCarrier.split(/\s+/)
-        
-        const hasMatch = reviewWords.some(rw => 
-          filterWords.some(fw => rw.includes(fw) || fw.includes(rw))
-        )
-        
-        if (!hasMatch) return false
+      if (reviewCarriers) {
+        if (reviewCarriers.get(row.airline_name) !== filters.selectedCarrier) return false
+      } else if (!airlineMatchesCarrier(row.airline_name, filters.selectedCarrier)) {
+        return false
       }
     }
     
@@ -146,9 +192,214 @@ export function filterReviewData(reviews, filters = {}) {
   })
 }
 
-// Preload data on app initialization
+// ---------------------------------------------------------------------------
+// Pre-aggregated chart payloads (built by src1/payloads.py into public/payloads)
+// ---------------------------------------------------------------------------
+
+const PAYLOAD_BASE = '/payloads'
+const PAYLOAD_SCHEMA_VERSION = 2
+
+let payloadManifest = null
+const payloadCache = {}
+
+// manifest.json is small and revalidated; payload files are content-versioned
+async function loadPayloadManifest() {
+  if (!payloadManifest) {
+    payloadManifest = fetch(`${PAYLOAD_BASE}/manifest.json`, { cache: 'no-cache' })
+      .then(response => {
+        if (!response.ok) throw new Error(`Payload manifest: HTTP ${response.status}`)
+        return response.json()
+      })
+      .catch(error => {
+        payloadManifest = null
+        throw error
+      })
+  }
+  return payloadManifest
+}
+
+// Fetch the gzip copy and inflate it in the browser when possible, so the
+// payload stays small even if the server does not compress JSON itself
+async function fetchPayloadJson(entry) {
+  if (entry.gzip && typeof DecompressionStream !== 'undefined') {
+    try {
+      const response = await fetch(`${PAYLOAD_BASE}/${entry.gzip}`)
+      if (response.ok) {
+        const stream = response.body.pipeThrough(new DecompressionStream('gzip'))
+        return await new Response(stream).json()
+      }
+    } catch (error) {
+      // Fall through to the uncompressed file
+    }
+  }
+  return d3.json(`${PAYLOAD_BASE}/${entry.file}`)
+}
+
+// Turn one column-wise table into an array of row objects
+function decodeTable(table) {
+  const names = Object.keys(table.columns)
+  const rows = new Array(table.rows)
+
+  for (let i = 0; i < table.rows; i++) {
+    const row = {}
+    names.forEach(name => {
+      const value = table.columns[name][i]
+      const dictionary = table.dictionaries[name]
+      row[name] = dictionary ? (value >= 0 ? dictionary[value] : null) : value
+    })
+    rows[i] = row
+  }
+
+  return rows
+}
+
+function decodePayload(payload) {
+  const tables = {}
+  Object.entries(payload.tables).forEach(([name, table]) => { tables[name] = decodeTable(table) })
+  return { tables, airports: payload.airports || {} }
+}
+
+// Load one chart's payload: { tables: { facet: rows }, airports }. Cached for the session.
+export async function loadPayload(name) {
+  if (!payloadCache[name]) {
+    payloadCache[name] = loadPayloadManifest()
+      .then(manifest => {
+        const entry = manifest.payloads[name]
+        if (!entry) throw new Error(`No "${name}" payload in the manifest`)
+        if (entry.schema_version !== PAYLOAD_SCHEMA_VERSION) {
+          throw new Error(`"${name}" payload has schema ${entry.schema_version}, expected ${PAYLOAD_SCHEMA_VERSION}`)
+        }
+        return fetchPayloadJson(entry)
+      })
+      .then(decodePayload)
+      .catch(error => {
+        delete payloadCache[name]
+        throw error
+      })
+  }
+  return payloadCache[name]
+}
+
+// Dashboard filter behind each filter dimension of a payload's filtered view
+const FILTER_KEYS = {
+  carrier_name: 'selectedCarrier',
+  airport: 'selectedAirport'
+}
+
+// Rows for a chart view filtered by carrier or airport, which its facets are
+// too coarse for: null when none of those filters is set. Asks the query
+// service for the payload's 'filtered' grouping, or filters the
+// <name>_filtered payload when the service is not running.
+export async function loadFilteredRows(name, filters = {}) {
+  const manifest = await loadPayloadManifest()
+  const spec = manifest.payloads[name]?.filtered
+  if (!spec) return null
+
+  const active = spec.filters.filter(dim => filters[FILTER_KEYS[dim]])
+  if (active.length === 0) return null
+
+  // Only the filters this view depends on, so the year slider reuses the result
+  const viewFilters = {}
+  active.forEach(dim => { viewFilters[FILTER_KEYS[dim]] = filters[FILTER_KEYS[dim]] })
+
+  try {
+    return await queryDelays({ groupBy: spec.keys, measures: spec.measures, filters: viewFilters })
+  } catch (queryError) {
+    const { tables } = await loadPayload(spec.payload)
+    return tables.filtered.filter(row => active.every(dim => row[dim] === viewFilters[FILTER_KEYS[dim]]))
+  }
+}
+
+// ---------------------------------------------------------------------------
+// Carrier-month delay vs sentiment table (src1/dataProcess.py, stage
+// monthly_sentiment; copy monthly_delay_sentiment.csv into public/)
+// ---------------------------------------------------------------------------
+
+const MONTHLY_SENTIMENT_COUNTS = [
+  'year', 'month', 'arr_flights', 'arr_del15', 'review_count', 'rated_reviews', 'delay_mentions'
+]
+
+// Carrier code of each month's row counting every review (and no flights)
+export const ALL_AIRLINES = 'ALL'
+
+let monthlySentiment = null
+
+// Rows of { year_month, year, month, carrier, carrier_name, arr_flights, arr_del15,
+// delay_rate, review_count, rated_reviews, avg_rating, delay_mentions }, plus an
+// ALL_AIRLINES row per month. Cached.
+export async function loadMonthlySentiment() {
+  if (!monthlySentiment) {
+    monthlySentiment = d3.csv('/monthly_delay_sentiment.csv', row => {
+      MONTHLY_SENTIMENT_COUNTS.forEach(name => { row[name] = +row[name] || 0 })
+      row.delay_rate = row.delay_rate === '' ? null : +row.delay_rate
+      row.avg_rating = row.avg_rating === '' ? null : +row.avg_rating
+      return row
+    })
+      .catch(error => {
+        monthlySentiment = null
+        throw error
+      })
+  }
+  return monthlySentiment
+}
+
+// ---------------------------------------------------------------------------
+// Filtered aggregations from the local query service (src1/query_service.py)
+// ---------------------------------------------------------------------------
+
+const QUERY_SERVICE_URL = import.meta.env.VITE_QUERY_SERVICE_URL || 'http://localhost:8765'
+const queryCache = new Map()
+
+// Map the dashboard filter object onto query-service parameters
+function queryParams(groupBy, measures, filters) {
+  const params = new URLSearchParams()
+  groupBy.forEach(dim => params.append('group_by', dim))
+  measures.forEach(measure => params.append('measure', measure))
+
+  if (filters.yearStart && filters.yearEnd) {
+    params.set('year_start', filters.yearStart)
+    params.set('year_end', filters.yearEnd)
+  }
+  if (filters.selectedCarrier) params.set('carrier_name', filters.selectedCarrier)
+  if (filters.selectedAirport) params.set('airport', filters.selectedAirport)
+  if (filters.selectedState) params.set('state', filters.selectedState)
+  if (filters.selectedDelayType) {
+    params.set('delay_type', filters.selectedDelayType.toLowerCase().replace(/\s+/g, '_'))
+  }
+  return params
+}
+
+// Ask the query service for exactly the slice a view needs, e.g.
+//   queryDelays({ groupBy: ['state'], measures: ['arr_delay', 'arr_flights'], filters })
+// Resolves to an array of row objects, one per group.
+export async function queryDelays({ groupBy = [], measures = [], filters = {} } = {}) {
+  const url = `${QUERY_SERVICE_URL}/query?${queryParams(groupBy, measures, filters)}`
+
+  if (!queryCache.has(url)) {
+    queryCache.set(url, fetch(url)
+      .then(async response => {
+        const result = await response.json()
+        if (!response.ok) throw new Error(`Query service: ${result.error || response.status}`)
+
+        const names = Object.keys(result.columns)
+        return Array.from({ length: result.rows }, (_, i) => {
+          const row = {}
+          names.forEach(name => { row[name] = result.columns[name][i] })
+          return row
+        })
+      })
+      .catch(error => {
+        queryCache.delete(url)
+        throw error
+      }))
+  }
+  return queryCache.get(url)
+}
+
+// Preload data on app initialization: the reviews and the payload manifest.
+// Delay figures come from the payloads and the query service.
 export function preloadData() {
-  loadAllData().catch(error => {
+  Promise.all([loadReviews(), loadPayloadManifest()]).catch(error => {
     console.error('Failed to preload data:', error)
   })
 }
\ No newline at end of file
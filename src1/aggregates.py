@@ -0,0 +1,326 @@
+"""
+Additive Partial Aggregates
+===========================
+Mergeable per-month partial sums from which dataProcess.py's BTS outputs
+(state_summary.json, sunburst_data.json, carrier_metrics.csv,
+temporal_delays.csv, airport_performance.csv, summary_stats.json,
+rankings.json) can be re-derived without the row-level data.
+
+Two partial tables are kept, both keyed by year_month:
+    carrier - (year_month, carrier, carrier_full_name) sums of every measure
+    airport - (year_month, airport, state) sums of every measure, plus row
+              counts, the sum of per-row avg_delay_per_flight and a count per
+              dominant delay type (so row-level means and modes stay exact)
+
+Ratios such as delay_rate, cancel_rate and avg_delay are only computed when
+the partials are finalized into outputs.
+
+Partial rows keep the order in which their keys first appear in the BTS rows,
+so the sunburst (which lists states and airports in that order) comes out the
+same as when built from the rows themselves.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from enrich import DELAY_COLS, add_airport_details, enrich_bts
+from metrics import DELAY_TYPES, dominant_delay_type, row_metric
+from rankings import RankingIndex, build_rankings, rank_partials
+from sunburst import build_sunburst
+from writers import keyed_records, write_json
+
+MEASURES = ['arr_flights', 'arr_del15', 'arr_delay', 'arr_cancelled'] + DELAY_COLS
+
+# Sorted, so that the first maximum matches Series.mode()[0]
+DOMINANT_TYPES = DELAY_TYPES
+DOMINANT_COLS = [f'dominant_{t}' for t in DOMINANT_TYPES]
+
+PARTIAL_KEYS = {
+    'carrier': ['year_month', 'carrier', 'carrier_full_name'],
+    'airport': ['year_month', 'airport', 'state'],
+}
+
+
+# ============================================================================
+# BUILD AND MERGE PARTIALS
+# ============================================================================
+
+def partial_aggregates(bts_data):
+    """
+    Aggregate enriched BTS rows (state, carrier_full_name and year_month
+    already added) into partial tables. avg_delay_per_flight and the dominant
+    delay type are computed from the row's measures here (metrics.py).
+    """
+    carrier = bts_data.groupby(PARTIAL_KEYS['carrier'], observed=True, dropna=False, sort=False)[
+        MEASURES
+    ].sum().reset_index()
+
+    rows = bts_data[PARTIAL_KEYS['airport'] + MEASURES].copy()
+    rows['n_rows'] = 1
+    # float64, as the sums feed the row-level means
+    rows['avg_delay_per_flight_sum'] = row_metric(bts_data, 'avg_delay_per_flight', dtype='float64')
+    dominant = dominant_delay_type(bts_data)
+    for delay_type, col in zip(DOMINANT_TYPES, DOMINANT_COLS):
+        rows[col] = (dominant == delay_type).astype('int32')
+
+    airport = rows.groupby(PARTIAL_KEYS['airport'], observed=True, dropna=False, sort=False).sum().reset_index()
+
+    return {'carrier': _as_keys(carrier), 'airport': _as_keys(airport)}
+
+
+def _as_keys(partial):
+    """Store key columns as plain objects so partials from different sources concat cleanly."""
+    for col in partial.columns:
+        if isinstance(partial[col].dtype, pd.CategoricalDtype):
+            partial[col] = partial[col].astype(object)
+    return partial
+
+
+def combine_partials(left, right):
+    """Add two sets of partials together (e.g. two chunks of the same months)."""
+    combined = {}
+    for view, keys in PARTIAL_KEYS.items():
+        stacked = pd.concat([left[view], right[view]], ignore_index=True)
+        combined[view] = stacked.groupby(keys, dropna=False, sort=False).sum().reset_index()
+    return combined
+
+
+def stream_partials(chunks, airports):
+    """
+    Enrich and aggregate raw BTS chunks one at a time, folding each into the
+    running partials. Memory is bounded by the chunk size plus the partials
+    (one row per month and carrier / airport), not by the number of rows.
+    """
+    partials = None
+    for chunk in chunks:
+        chunk_partials = partial_aggregates(enrich_bts(chunk, airports))
+        partials = chunk_partials if partials is None else combine_partials(partials, chunk_partials)
+    return partials
+
+
+def replace_months(old, new):
+    """Drop the months present in `new` from `old`, then append `new`."""
+    merged = {}
+    for view in PARTIAL_KEYS:
+        months = set(new[view]['year_month'])
+        kept = old[view][~old[view]['year_month'].isin(months)]
+        merged[view] = pd.concat([kept, new[view]], ignore_index=True)
+    return merged
+
+
+def partial_months(partials):
+    """Return the sorted year_month labels covered by a set of partials."""
+    return sorted(set(partials['carrier']['year_month']))
+
+
+def save_partials(partials, partials_dir):
+    os.makedirs(partials_dir, exist_ok=True)
+    for view, df in partials.items():
+        df.to_parquet(os.path.join(partials_dir, f'{view}.parquet'), index=False)
+
+
+def load_partials(partials_dir):
+    """Load saved partials, or return None if none have been saved yet."""
+    paths = {view: os.path.join(partials_dir, f'{view}.parquet') for view in PARTIAL_KEYS}
+    if not all(os.path.exists(path) for path in paths.values()):
+        return None
+    return {view: pd.read_parquet(path) for view, path in paths.items()}
+
+
+# ============================================================================
+# FINALIZE INTO OUTPUTS
+# ============================================================================
+
+def group_mode(group_ids, values, n_groups, default='unknown'):
+    """
+    Most frequent non-null value per group, like Series.mode()[0] per group (ties
+    go to the smallest value), or `default` for groups with none. group_ids are
+    the rows' group numbers (GroupBy.ngroup(), -1 for none); the counts are one
+    bincount over (group, value) pairs and the mode is a row-wise argmax.
+    """
+    group_ids = np.asarray(group_ids)
+    codes, uniques = pd.factorize(values, sort=True)
+    keep = (codes >= 0) & (group_ids >= 0)
+    n_values = max(len(uniques), 1)
+
+    counts = np.bincount(
+        group_ids[keep] * n_values + codes[keep], minlength=n_groups * n_values
+    ).reshape(n_groups, n_values)
+    modes = np.asarray(uniques, dtype=object)[counts.argmax(axis=1)] if len(uniques) else np.full(n_groups, default)
+    return np.where(counts.any(axis=1), modes, default)
+
+
+def finalize_state_summary(partials, rankings):
+    """Return the state_summary.json dictionary."""
+    airport = partials['airport']
+    airport = airport[airport['state'].notna()]
+
+    state_summary = airport.groupby('state')[
+        ['arr_flights', 'arr_del15', 'arr_delay', 'arr_cancelled'] + DELAY_COLS
+    ].sum().reset_index()
+
+    state_summary['avg_delay'] = state_summary['arr_delay'] / state_summary['arr_flights']
+    state_summary['delay_rate'] = (state_summary['arr_del15'] / state_summary['arr_flights'] * 100)
+    state_summary['cancel_rate'] = (state_summary['arr_cancelled'] / state_summary['arr_flights'] * 100)
+
+    # Worst airport per state, from the ranking index
+    worst_airports = rankings.leaders('airport', 'row_avg_delay', by='state')
+    state_summary['worst_airport'] = state_summary['state'].map(worst_airports)
+
+    return state_summary_dict(state_summary)
+
+
+def state_summary_dict(state_summary):
+    """The state_summary.json dictionary from the per-state frame, built column-wise."""
+    state_summary = state_summary[state_summary['state'].notna()]
+
+    def rounded(col):
+        return [round(value, 2) for value in state_summary[col].astype('float64').tolist()]
+
+    worst_airport = state_summary['worst_airport'].astype(object)
+    return keyed_records(state_summary['state'].astype(object).tolist(), {
+        'total_flights': state_summary['arr_flights'].astype('int64').tolist(),
+        'avg_delay': rounded('avg_delay'),
+        'delay_rate': rounded('delay_rate'),
+        'cancel_rate': rounded('cancel_rate'),
+        'worst_airport': worst_airport.where(worst_airport.notna(), None).tolist(),
+        'total_delays': state_summary['arr_del15'].astype('int64').tolist(),
+    })
+
+
+def finalize_carrier_metrics(partials):
+    """Return the full per-carrier metrics frame."""
+    carrier_metrics = partials['carrier'].groupby('carrier_full_name')[[
+        'arr_flights', 'arr_delay', 'arr_cancelled', 'arr_del15',
+        'carrier_delay', 'weather_delay', 'nas_delay', 'late_aircraft_delay'
+    ]].sum().reset_index()
+
+    carrier_metrics['avg_delay'] = carrier_metrics['arr_delay'] / carrier_metrics['arr_flights']
+    carrier_metrics['cancel_rate'] = (carrier_metrics['arr_cancelled'] / carrier_metrics['arr_flights'] * 100)
+    carrier_metrics['ontime_rate'] = 100 - ((carrier_metrics['arr_del15'] / carrier_metrics['arr_flights']) * 100)
+
+    total_delay_carrier = (carrier_metrics['carrier_delay'] + carrier_metrics['weather_delay'] +
+                           carrier_metrics['nas_delay'] + carrier_metrics['late_aircraft_delay'])
+
+    carrier_metrics['carrier_delay_pct'] = (carrier_metrics['carrier_delay'] / total_delay_carrier * 100).fillna(0)
+    carrier_metrics['weather_delay_pct'] = (carrier_metrics['weather_delay'] / total_delay_carrier * 100).fillna(0)
+    carrier_metrics['nas_delay_pct'] = (carrier_metrics['nas_delay'] / total_delay_carrier * 100).fillna(0)
+
+    return carrier_metrics
+
+
+def carrier_output(carrier_metrics):
+    """Select and rename the carrier_metrics.csv columns."""
+    output = carrier_metrics[[
+        'carrier_full_name', 'arr_flights', 'avg_delay', 'cancel_rate',
+        'weather_delay_pct', 'carrier_delay_pct', 'nas_delay_pct', 'ontime_rate'
+    ]].copy()
+
+    output.columns = [
+        'carrier', 'total_flights', 'avg_delay_min', 'cancel_rate_pct',
+        'weather_pct', 'carrier_pct', 'nas_pct', 'ontime_pct'
+    ]
+    return output
+
+
+def finalize_temporal_delays(partials):
+    """Return the temporal_delays.csv frame."""
+    temporal_delays = partials['carrier'].groupby('year_month')[
+        DELAY_COLS + ['arr_flights']
+    ].sum().reset_index()
+    return temporal_delays.sort_values('year_month')
+
+
+def finalize_airport_performance(partials, airports):
+    """Return the airport_performance.csv frame."""
+    grouped = partials['airport'].groupby('airport')
+    airport_performance = grouped[['arr_flights', 'arr_delay', 'arr_cancelled'] + DOMINANT_COLS].sum()
+    airport_performance['state'] = grouped['state'].first()
+
+    # Most frequent per-row dominant delay type
+    dominant_counts = airport_performance[DOMINANT_COLS]
+    airport_performance['dominant_delay_type'] = (
+        dominant_counts.idxmax(axis=1).str.replace('dominant_', '', regex=False)
+        .where(dominant_counts.sum(axis=1) > 0, 'unknown')
+    )
+    airport_performance = airport_performance.reset_index()
+
+    airport_performance['avg_delay'] = airport_performance['arr_delay'] / airport_performance['arr_flights']
+
+    # Add airport names and coordinates
+    add_airport_details(airport_performance, airports)
+
+    # Filter to airports with significant traffic (>1000 flights)
+    airport_performance = airport_performance[airport_performance['arr_flights'] > 1000]
+
+    airport_output = airport_performance[[
+        'airport', 'airport_name', 'state', 'arr_flights', 'avg_delay',
+        'arr_cancelled', 'dominant_delay_type', 'latitude', 'longitude'
+    ]].copy()
+
+    airport_output.columns = [
+        'airport_code', 'airport_name', 'state', 'total_flights', 'avg_delay_min',
+        'total_cancelled', 'dominant_delay_type', 'latitude', 'longitude'
+    ]
+    return airport_output
+
+
+def finalize_summary_stats(partials, rankings):
+    """Return the summary_stats.json dictionary."""
+    carrier = partials['carrier']
+    airport = partials['airport']
+    years = carrier['year_month'].str[:4].astype(int)
+
+    return {
+        "dataset_overview": {
+            "bts_records": int(airport['n_rows'].sum()),
+            "airports": airport['airport'].nunique(),
+            "carriers": carrier['carrier'].nunique(),
+            "states": airport['state'].nunique(),
+            "years": f"{years.min()}-{years.max()}",
+            "total_flights": int(carrier['arr_flights'].sum()),
+            "total_delays": int(carrier['arr_del15'].sum()),
+            "total_cancellations": int(carrier['arr_cancelled'].sum())
+        },
+        "top_delay_causes": {
+            "weather": int(carrier['weather_delay'].sum()),
+            "carrier": int(carrier['carrier_delay'].sum()),
+            "nas": int(carrier['nas_delay'].sum()),
+            "late_aircraft": int(carrier['late_aircraft_delay'].sum()),
+            "security": int(carrier['security_delay'].sum())
+        },
+        "worst_airports": dict(rankings.top('airport', 'row_avg_delay', 10)),
+        "best_carriers": [
+            {'carrier_full_name': name, 'avg_delay': value} for name, value in rankings.bottom('carrier', 'avg_delay', 5)
+        ]
+    }
+
+
+def finalize(partials, airports):
+    """Derive every BTS output from a set of partials."""
+    carrier_metrics = finalize_carrier_metrics(partials)
+    rankings = build_rankings(rank_partials(partials))
+    return {
+        'state_summary.json': finalize_state_summary(partials, rankings),
+        'sunburst_data.json': build_sunburst(partials['airport']),
+        'carrier_metrics.csv': carrier_output(carrier_metrics),
+        'temporal_delays.csv': finalize_temporal_delays(partials),
+        'airport_performance.csv': finalize_airport_performance(partials, airports),
+        'summary_stats.json': finalize_summary_stats(partials, rankings),
+        'rankings.json': rankings,
+    }
+
+
+def write_outputs(outputs, out_dir, pretty_json=False):
+    """Write finalized outputs: the ranking index with its own save(), dictionaries as JSON (see writers.py), frames as CSV."""
+    os.makedirs(out_dir, exist_ok=True)
+    for filename, output in outputs.items():
+        path = os.path.join(out_dir, filename)
+        if isinstance(output, RankingIndex):
+            output.save(path, pretty=pretty_json)
+        elif filename.endswith('.json'):
+            write_json(output, path, pretty=pretty_json)
+        else:
+            output.to_csv(path, index=False)
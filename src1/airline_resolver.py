@@ -0,0 +1,262 @@
+"""
+Airline Name Resolver
+=====================
+Resolves free-form airline names (Skytrax airline_name slugs such as
+'delta-air-lines', or any other spelling of a carrier) to BTS carrier codes
+with a confidence score, so reviews are matched to the delay data once at
+build time instead of by substring matching per review and per click.
+
+Names are normalized first: lower-cased, punctuation and '-' to spaces,
+'air lines' -> 'airlines', and generic words (airlines, airways, air, inc,
+co, corp, llc, ...) dropped, leaving the distinctive part:
+
+    'delta-air-lines', 'Delta Air Lines Inc.'   -> 'delta'
+    'sun-country-airlines'                      -> 'sun country'
+
+The airline words dropped there (air, airlines, airways, aviation) are kept as
+the name's kind. A name and an alias that both state a kind must share one,
+so 'united-airways' (a Bangladeshi airline) is not United Airlines, while
+'Air Wisconsin Airlines Corp' still matches 'air-wisconsin'.
+
+The index holds every alias of every carrier: the Skytrax slugs in
+REVIEW_AIRLINES, the readable names in CARRIER_MAPPING and, when BTS rows are
+given, BTS's own carrier_name values (a 'd/b/a' name counts as two aliases).
+Each distinct name is scored against all aliases at once, as the larger of
+    - the Dice overlap of their character trigrams (typos, 'south west')
+    - the Jaccard overlap of their words (reordered words)
+and takes the best alias's carrier if that score reaches MIN_CONFIDENCE (pairs
+whose kinds conflict score 0). A column of names is scored once per distinct
+value; unmatched names get no carrier and no alias.
+
+Usage:
+    from airline_resolver import AirlineResolver, add_review_carrier
+    resolver = AirlineResolver.from_carriers(bts_data)     # any frame with carrier, carrier_name
+    add_review_carrier(reviews_data, resolver)              # + carrier_code, carrier_match
+
+    python airline_resolver.py [--data-dir DIR] [--out review_carriers.csv]
+"""
+
+import argparse
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from dimensions import CARRIER_MAPPING, REVIEW_AIRLINES, Dimension
+from ingest import load_dataset
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+MIN_CONFIDENCE = 0.8
+
+GENERIC_WORDS = {
+    'airlines', 'airline', 'airways', 'air', 'aviation', 'the',
+    'inc', 'co', 'corp', 'corporation', 'company', 'llc', 'ltd',
+}
+
+# Generic words that say what kind of airline a name is, as bit flags
+KIND_BITS = {'air': 1, 'airlines': 2, 'airline': 2, 'airways': 4, 'aviation': 8}
+
+DBA_PATTERN = re.compile(r'\s+d/?b/?a\s+', re.IGNORECASE)
+
+MATCH_COLUMNS = ['carrier', 'carrier_name', 'confidence', 'alias']
+
+
+# ============================================================================
+# NORMALIZE
+# ============================================================================
+
+def _words(name):
+    text = re.sub(r'[^a-z0-9]+', ' ', str(name).lower())
+    return re.sub(r'\bair lines\b', 'airlines', text).split()
+
+
+def normalize_name(name):
+    """The distinctive words of an airline name ('Delta Air Lines Inc.' -> 'delta')."""
+    words = _words(name)
+    distinctive = [word for word in words if word not in GENERIC_WORDS]
+    return ' '.join(distinctive or words)
+
+
+def name_kind(name):
+    """KIND_BITS of the airline words in a name ('United Airways' -> airways), 0 if none."""
+    kind = 0
+    for word in _words(name):
+        kind |= KIND_BITS.get(word, 0)
+    return kind
+
+
+def trigrams(normalized):
+    """Character trigrams of a normalized name, spaces removed and the ends marked."""
+    compact = '#' + normalized.replace(' ', '') + '#'
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def _incidence(feature_sets, vocabulary):
+    """0/1 matrix: one row per set, one column per vocabulary entry it contains."""
+    matrix = np.zeros((len(feature_sets), len(vocabulary)), dtype=np.float32)
+    for row, features in enumerate(feature_sets):
+        columns = [vocabulary[f] for f in features if f in vocabulary]
+        matrix[row, columns] = 1
+    return matrix
+
+
+# ============================================================================
+# RESOLVER
+# ============================================================================
+
+class AirlineResolver:
+    """A trigram and word index over carrier aliases, scoring names against all of them at once."""
+
+    def __init__(self, aliases, carrier_names=None, min_confidence=MIN_CONFIDENCE):
+        """aliases: [(alias, carrier code)]; carrier_names: {code: name reported with matches}."""
+        normalized = {}
+        for alias, code in aliases:
+            # The first carrier listed for an alias keeps it
+            normalized.setdefault((normalize_name(alias), name_kind(alias)), code)
+        self.aliases = [alias for alias, _ in normalized]
+        self.kinds = np.array([kind for _, kind in normalized], dtype=np.int64)
+        self.codes = np.array(list(normalized.values()), dtype=object)
+        self.carrier_names = carrier_names or {}
+        self.min_confidence = min_confidence
+
+        grams = [trigrams(alias) for alias in self.aliases]
+        words = [set(alias.split()) for alias in self.aliases]
+        self.gram_index = {g: i for i, g in enumerate(sorted(set().union(*grams)))}
+        self.word_index = {w: i for i, w in enumerate(sorted(set().union(*words)))}
+        self.alias_grams = _incidence(grams, self.gram_index)
+        self.alias_words = _incidence(words, self.word_index)
+
+    @classmethod
+    def from_carriers(cls, bts_carriers=None, carrier_mapping=CARRIER_MAPPING, min_confidence=MIN_CONFIDENCE):
+        """
+        Resolver over REVIEW_AIRLINES, carrier_mapping and the carrier /
+        carrier_name pairs of BTS rows (any frame with those columns, or None).
+        Matches report BTS's carrier_name where there is one.
+        """
+        aliases = [(slug, code) for slug, code in REVIEW_AIRLINES.items()]
+        aliases += [(name, code) for code, name in carrier_mapping.items()]
+
+        carrier_names = dict(carrier_mapping)
+        if bts_carriers is not None:
+            pairs = bts_carriers[['carrier', 'carrier_name']].drop_duplicates().astype(object).dropna()
+            bts_names = {}
+            for code, name in pairs.itertuples(index=False):
+                bts_names.setdefault(code, name)
+                aliases += [(part, code) for part in DBA_PATTERN.split(name)]
+            carrier_names.update(bts_names)
+
+        return cls(aliases, carrier_names, min_confidence)
+
+    def scores(self, names):
+        """(names x aliases) confidence matrix for a list of names."""
+        normalized = [normalize_name(name) for name in names]
+        grams = [trigrams(name) for name in normalized]
+        words = [set(name.split()) for name in normalized]
+
+        shared_grams = _incidence(grams, self.gram_index) @ self.alias_grams.T
+        gram_counts = np.array([len(g) for g in grams], dtype=np.float32)
+        dice = 2 * shared_grams / (gram_counts[:, None] + self.alias_grams.sum(axis=1)[None, :])
+
+        shared_words = _incidence(words, self.word_index) @ self.alias_words.T
+        word_counts = np.array([len(w) for w in words], dtype=np.float32)
+        union = word_counts[:, None] + self.alias_words.sum(axis=1)[None, :] - shared_words
+        jaccard = shared_words / np.maximum(union, 1)
+
+        # Both name a kind of airline, and not the same one
+        kinds = np.array([name_kind(name) for name in names], dtype=np.int64)
+        conflict = (kinds[:, None] != 0) & (self.kinds[None, :] != 0) & (kinds[:, None] & self.kinds[None, :] == 0)
+
+        return np.where(conflict, 0.0, np.maximum(dice, jaccard))
+
+    def match_table(self, names):
+        """One row per distinct name (the index): carrier, carrier_name, confidence, alias."""
+        names = pd.Index(pd.unique(pd.Series(list(names), dtype=object).dropna()), name='airline_name')
+        table = pd.DataFrame(index=names, columns=MATCH_COLUMNS)
+        if len(names) == 0 or len(self.aliases) == 0:
+            return table.assign(confidence=0.0)
+
+        scores = self.scores(names)
+        best = scores.argmax(axis=1)
+        confidence = scores[np.arange(len(names)), best].astype(float).round(3)
+        matched = confidence >= self.min_confidence
+
+        carriers = np.where(matched, self.codes[best], None)
+        table['carrier'] = carriers
+        table['carrier_name'] = [self.carrier_names.get(code) if code else None for code in carriers]
+        table['confidence'] = confidence
+        table['alias'] = np.where(matched, np.array(self.aliases, dtype=object)[best], None)
+        return table
+
+    def resolve(self, names):
+        """
+        carrier, carrier_name and confidence for each name, as a DataFrame on
+        the names' index (carrier is NaN below min_confidence, confidence is 0
+        for missing names).
+        """
+        names = names if isinstance(names, pd.Series) else pd.Series(names)
+        distinct = names.cat.categories if isinstance(names.dtype, pd.CategoricalDtype) else names.unique()
+        matches = Dimension(self.match_table(distinct)).join(
+            names, {'carrier': 'carrier', 'carrier_name': 'carrier_name', 'confidence': 'confidence'}
+        )
+        matches['confidence'] = matches['confidence'].astype(float).fillna(0.0)
+        return matches
+
+
+def add_review_carrier(reviews_data, resolver):
+    """Add carrier_code (NaN if unmatched) and carrier_match (the confidence) to each review."""
+    matches = resolver.resolve(reviews_data['airline_name'])
+    reviews_data['carrier_code'] = matches['carrier']
+    reviews_data['carrier_match'] = matches['confidence']
+    return reviews_data
+
+
+def review_carriers(reviews_data, resolver):
+    """
+    The match table for the review airline names, with a review count per
+    name: what the dashboard loads to filter reviews by carrier.
+    """
+    counts = reviews_data['airline_name'].astype(object).value_counts()
+    table = resolver.match_table(counts.index)
+    table['reviews'] = counts.reindex(table.index).to_numpy()
+    return table.reset_index()[['airline_name', 'carrier', 'carrier_name', 'confidence', 'reviews']]
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Match Skytrax airline names to BTS carriers.")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    parser.add_argument('--min-confidence', type=float, default=MIN_CONFIDENCE)
+    parser.add_argument('--out', default=None, help="Also write the match table to this CSV")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+    bts_carriers = load_dataset('bts', columns=['carrier', 'carrier_name'],
+                                raw_dir=args.data_dir, store_dir=store_dir)
+    reviews_data = load_dataset('reviews', columns=['airline_name'], raw_dir=args.data_dir, store_dir=store_dir)
+
+    resolver = AirlineResolver.from_carriers(bts_carriers, min_confidence=args.min_confidence)
+    table = review_carriers(reviews_data, resolver)
+
+    for row in table.itertuples(index=False):
+        mark = '✓' if pd.notna(row.carrier) else '✗'
+        print(f"  {mark} {row.airline_name:<32} {row.carrier or '-':<4} {row.confidence:>5.2f}  {row.reviews:>7,}")
+
+    matched = table['carrier'].notna()
+    print(f"\n✓ {table.loc[matched, 'reviews'].sum():,} of {table['reviews'].sum():,} reviews "
+          f"matched to {table.loc[matched, 'carrier'].nunique()} carriers")
+
+    if args.out:
+        table.to_csv(args.out, index=False)
+        print(f"  Match table: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Sunburst Builder Benchmark
+==========================
+Times the grouped sunburst builder against the original nested filtering loop
+on synthetic BTS-shaped data, and checks that both serialize to identical JSON.
+
+Usage:
+    python bench_sunburst.py [--airports 300] [--carriers 15] [--years 10]
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+
+from schema import apply_bts_schema
+from sunburst import build_sunburst, build_sunburst_loop
+from synth import make_airports, make_bts, make_carriers
+
+
+def make_bts_like(n_airports, n_carriers, n_years, seed=0):
+    """
+    Synthetic BTS rows (see synth.py) with the compact schema dtypes, every
+    carrier serving every airport. About 2% of airports have no state mapping.
+    """
+    rng = np.random.default_rng(seed)
+    airports = make_airports(n_airports, rng)
+    bts_data = apply_bts_schema(make_bts(airports, make_carriers(n_carriers), n_years, n_airports, rng))
+
+    airport_state = airports.set_index('code')['state'].astype(object)
+    airport_state[rng.random(n_airports) < 0.02] = None
+    bts_data['state'] = bts_data['airport'].map(airport_state).astype(object)
+
+    return bts_data
+
+
+def time_call(func, *args, repeat=3):
+    """Return (best wall time in seconds, last result)."""
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--airports', type=int, default=300)
+    parser.add_argument('--carriers', type=int, default=15)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    bts_data = make_bts_like(args.airports, args.carriers, args.years)
+    print(f"Synthetic BTS rows: {len(bts_data):,} "
+          f"({args.airports} airports, {args.carriers} carriers, {args.years} years)")
+
+    loop_time, loop_root = time_call(build_sunburst_loop, bts_data, repeat=args.repeat)
+    grouped_time, grouped_root = time_call(build_sunburst, bts_data, repeat=args.repeat)
+
+    identical = json.dumps(loop_root, indent=2) == json.dumps(grouped_root, indent=2)
+
+    print(f"  Nested loop:      {loop_time:8.3f} s")
+    print(f"  Grouped builder:  {grouped_time:8.3f} s")
+    print(f"  Speedup:          {loop_time / grouped_time:8.1f}x")
+    print(f"  Identical JSON:   {'✓' if identical else '✗'}")
+
+    if not identical:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
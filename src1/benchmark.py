@@ -0,0 +1,357 @@
+"""
+Pipeline Benchmark
+==================
+Times every dataProcess.py stage and every files/JOIN_EXAMPLES.py section on
+synthetic data (see synth.py) and compares the timings with a stored baseline,
+so an optimization can be measured, and a regression caught, without the real
+downloads.
+
+For each scale the synthetic raw files are generated once under
+<bench-dir>/<scale>/raw (and reused while the scale and seed are unchanged).
+Each suite then runs in a fresh subprocess:
+
+    dataProcess             dataProcess.py --force, stage records from its run log
+    dataProcess_streaming   the same with --streaming (with --streaming)
+    join_examples           JOIN_EXAMPLES.py, section records from its Sections log
+
+With --ingest the raw CSVs are first converted into a Parquet store (timed as
+the 'ingest' suite) and every suite reads from it.
+
+Besides timings, each suite records a hash of every output file: a changed hash
+means an optimization changed the results, not just the speed.
+
+Results:
+    <bench-dir>/results/<scale>-<run_id>.json   one file per benchmark run
+    bench/baseline.json                         {scale: result}, from --save-baseline
+
+The baseline is committed (the bench dir is not), so every checkout compares
+against the same output hashes. Its timings come from the machine that saved
+it: rerun with --save-baseline before comparing timings on another machine.
+
+A stage is reported as a regression when it is more than --tolerance times
+slower than the baseline and at least MIN_SECONDS slower; the script exits 1 on
+a regression or a changed output.
+
+Usage:
+    python benchmark.py --scale 1x --save-baseline      # record the baseline
+    python benchmark.py --scale 1x                      # compare against it
+    python benchmark.py --scale tiny 1x --repeat 3 --streaming --ingest
+"""
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+from synth import SCALES, scale_config, write_datasets
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+SRC_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(SRC_DIR)
+BENCH_DIR = os.path.join(PROJECT_DIR, 'data', 'bench')
+BASELINE_PATH = os.path.join(PROJECT_DIR, 'bench', 'baseline.json')
+JOIN_EXAMPLES = os.path.join(PROJECT_DIR, 'files', 'JOIN_EXAMPLES.py')
+
+TOLERANCE = 1.25
+# Differences below this are timer noise, whatever the ratio
+MIN_SECONDS = 0.05
+
+# Runs JOIN_EXAMPLES.py as a script, then writes its section log
+JOIN_RUNNER = (
+    "import runpy, sys\n"
+    "g = runpy.run_path(sys.argv[1], run_name='__main__')\n"
+    "g['sections'].log.write(sys.argv[2])\n"
+)
+
+
+# ============================================================================
+# DATA
+# ============================================================================
+
+def prepare_data(bench_dir, scale, seed=0):
+    """Generate the scale's raw files unless an identical set is already there. Returns the raw dir."""
+    raw_dir = os.path.join(bench_dir, scale, 'raw')
+    marker_path = os.path.join(raw_dir, 'synth.json')
+    marker = {'scale': scale, 'seed': seed, 'config': scale_config(scale)}
+
+    if os.path.exists(marker_path):
+        with open(marker_path) as f:
+            if json.load(f) == marker:
+                print(f"  Reusing synthetic data in {raw_dir}")
+                return raw_dir
+        shutil.rmtree(raw_dir)
+
+    start = time.time()
+    rows = write_datasets(raw_dir, scale, seed)
+    with open(marker_path, 'w') as f:
+        json.dump(marker, f, indent=2)
+    print(f"  ✓ Generated {sum(rows.values()):,} synthetic rows in {time.time() - start:.1f} s")
+    return raw_dir
+
+
+# ============================================================================
+# SUITES
+# ============================================================================
+
+def _run(args, cwd, log_path):
+    """Run a command with its output going to log_path. Returns its wall time."""
+    start = time.perf_counter()
+    with open(log_path, 'w') as log:
+        completed = subprocess.run(args, cwd=cwd, stdout=log, stderr=subprocess.STDOUT)
+    elapsed = time.perf_counter() - start
+    if completed.returncode != 0:
+        with open(log_path) as f:
+            tail = ''.join(f.readlines()[-20:])
+        raise RuntimeError(f"{' '.join(args)} failed (see {log_path}):\n{tail}")
+    return elapsed
+
+
+def hash_outputs(out_dir):
+    """{file name: short sha256} for every file in out_dir."""
+    hashes = {}
+    for path in sorted(glob.glob(os.path.join(out_dir, '*'))):
+        if os.path.isfile(path):
+            with open(path, 'rb') as f:
+                hashes[os.path.basename(path)] = hashlib.sha256(f.read()).hexdigest()[:12]
+    return hashes
+
+
+def _stage_times(log_dir):
+    """{stage: wall seconds} from the run log a suite wrote into log_dir."""
+    [path] = glob.glob(os.path.join(log_dir, 'run-*.json'))
+    with open(path) as f:
+        run = json.load(f)
+    return {record['name']: record['wall_s'] for record in run['stages'] if record['status'] == 'ran'}
+
+
+def _fresh_dir(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    os.makedirs(path)
+    return path
+
+
+def run_ingest(raw_dir, work_dir):
+    store_dir = os.path.join(work_dir, 'store')
+    if os.path.isdir(store_dir):
+        shutil.rmtree(store_dir)
+    elapsed = _run(
+        [sys.executable, os.path.join(SRC_DIR, 'ingest.py'), '--raw-dir', raw_dir, '--store-dir', store_dir],
+        SRC_DIR, os.path.join(work_dir, 'ingest.log'),
+    )
+    return {'stages': {'ingest': round(elapsed, 4)}, 'outputs': {}}
+
+
+def run_dataprocess(raw_dir, work_dir, streaming=False, workers=None):
+    name = 'dataProcess_streaming' if streaming else 'dataProcess'
+    out_dir = _fresh_dir(os.path.join(work_dir, name, 'out'))
+    log_dir = _fresh_dir(os.path.join(work_dir, name, 'runs'))
+
+    args = [
+        sys.executable, os.path.join(SRC_DIR, 'dataProcess.py'),
+        '--data-dir', raw_dir,
+        '--store-dir', os.path.join(work_dir, 'store'),
+        '--out-dir', out_dir,
+        '--cache-dir', _fresh_dir(os.path.join(work_dir, name, 'cache')),
+        '--log-dir', log_dir,
+        '--force',
+    ]
+    if streaming:
+        args.append('--streaming')
+    if workers is not None:
+        args += ['--workers', str(workers)]
+
+    elapsed = _run(args, SRC_DIR, os.path.join(work_dir, f'{name}.log'))
+    stages = _stage_times(log_dir)
+    stages['total'] = round(elapsed, 4)
+    return {'stages': stages, 'outputs': hash_outputs(out_dir)}
+
+
+def run_join_examples(raw_dir, work_dir):
+    # JOIN_EXAMPLES.py reads data/raw (and data/store) and writes data/processed,
+    # relative to the working directory
+    join_dir = _fresh_dir(os.path.join(work_dir, 'join'))
+    os.makedirs(os.path.join(join_dir, 'data'))
+    os.symlink(raw_dir, os.path.join(join_dir, 'data', 'raw'))
+    store_dir = os.path.join(work_dir, 'store')
+    if os.path.isdir(store_dir):
+        os.symlink(store_dir, os.path.join(join_dir, 'data', 'store'))
+    log_dir = os.path.join(join_dir, 'runs')
+
+    elapsed = _run(
+        [sys.executable, '-c', JOIN_RUNNER, JOIN_EXAMPLES, log_dir],
+        join_dir, os.path.join(work_dir, 'join_examples.log'),
+    )
+    stages = _stage_times(log_dir)
+    stages['total'] = round(elapsed, 4)
+    return {'stages': stages, 'outputs': hash_outputs(os.path.join(join_dir, 'data', 'processed'))}
+
+
+def run_benchmark(bench_dir, scale, seed=0, repeat=1, streaming=False, ingest=False, workers=None):
+    """Run every suite `repeat` times on one scale, keeping each stage's best time."""
+    print(f"\nScale {scale}: {scale_config(scale)}")
+    raw_dir = prepare_data(bench_dir, scale, seed)
+    work_dir = os.path.join(bench_dir, scale, 'work')
+    _fresh_dir(work_dir)
+
+    suites = {}
+    for i in range(repeat):
+        runs = {}
+        if ingest:
+            runs['ingest'] = run_ingest(raw_dir, work_dir)
+        runs['dataProcess'] = run_dataprocess(raw_dir, work_dir, workers=workers)
+        if streaming:
+            runs['dataProcess_streaming'] = run_dataprocess(raw_dir, work_dir, streaming=True, workers=workers)
+        runs['join_examples'] = run_join_examples(raw_dir, work_dir)
+
+        for suite, run in runs.items():
+            best = suites.setdefault(suite, {'stages': {}, 'outputs': run['outputs']})
+            for stage, seconds in run['stages'].items():
+                best['stages'][stage] = min(seconds, best['stages'].get(stage, seconds))
+            if run['outputs'] != best['outputs']:
+                print(f"  ⚠️  {suite} outputs differ between repeats")
+        print(f"  ✓ Run {i + 1}/{repeat}: " +
+              ', '.join(f"{suite} {run['stages'].get('total', sum(run['stages'].values())):.2f} s"
+                        for suite, run in runs.items()))
+
+    return {
+        'scale': scale,
+        'seed': seed,
+        'config': scale_config(scale),
+        'repeat': repeat,
+        'workers': workers,
+        'created': datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'machine': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'suites': suites,
+    }
+
+
+# ============================================================================
+# BASELINE
+# ============================================================================
+
+def load_baseline(path=BASELINE_PATH):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_baseline(results, path=BASELINE_PATH):
+    """Store results as the baseline of their scales, keeping other scales' baselines."""
+    baseline = load_baseline(path)
+    baseline.update({result['scale']: result for result in results})
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+        f.write('\n')
+    return path
+
+
+def compare(result, baseline, tolerance=TOLERANCE):
+    """Return (printable table, [problems]) comparing a result with its scale's baseline."""
+    lines = [f"  {'suite / stage':<44}{'baseline s':>12}{'current s':>12}{'ratio':>8}"]
+    problems = []
+
+    for suite, current in result['suites'].items():
+        base = baseline.get('suites', {}).get(suite)
+        for stage, seconds in current['stages'].items():
+            label = f"{suite} / {stage}"
+            before = base['stages'].get(stage) if base else None
+            if before is None:
+                lines.append(f"  {label:<44}{'-':>12}{seconds:>12.3f}{'new':>8}")
+                continue
+
+            ratio = seconds / before if before else float('inf')
+            flag = ''
+            if ratio > tolerance and seconds - before >= MIN_SECONDS:
+                flag = '  ✗ slower'
+                problems.append(f"{label} took {seconds:.3f} s (baseline {before:.3f} s)")
+            elif ratio < 1 / tolerance and before - seconds >= MIN_SECONDS:
+                flag = '  ✓ faster'
+            lines.append(f"  {label:<44}{before:>12.3f}{seconds:>12.3f}{ratio:>8.2f}{flag}")
+
+        if base:
+            changed = sorted(
+                name for name in set(base['outputs']) | set(current['outputs'])
+                if base['outputs'].get(name) != current['outputs'].get(name)
+            )
+            if changed:
+                problems.append(f"{suite} outputs changed: {', '.join(changed)}")
+
+    return '\n'.join(lines), problems
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the pipeline on synthetic data.")
+    parser.add_argument('--scale', nargs='+', default=['1x'], choices=list(SCALES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per suite; the best time counts")
+    parser.add_argument('--streaming', action='store_true', help="Also time dataProcess.py --streaming")
+    parser.add_argument('--ingest', action='store_true', help="Run from a Parquet store built by ingest.py")
+    parser.add_argument('--workers', type=int, default=None, help="Passed on to dataProcess.py")
+    parser.add_argument('--bench-dir', default=BENCH_DIR)
+    parser.add_argument('--baseline', default=BASELINE_PATH, help="Baseline file (default: bench/baseline.json)")
+    parser.add_argument('--tolerance', type=float, default=TOLERANCE,
+                        help="Slowdown ratio reported as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="Store this run as the baseline")
+    args = parser.parse_args()
+
+    print("=" * 80)
+    print("PIPELINE BENCHMARK")
+    print("=" * 80)
+
+    results = [
+        run_benchmark(args.bench_dir, scale, args.seed, args.repeat, args.streaming, args.ingest, args.workers)
+        for scale in args.scale
+    ]
+
+    results_dir = os.path.join(args.bench_dir, 'results')
+    os.makedirs(results_dir, exist_ok=True)
+    run_id = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    for result in results:
+        with open(os.path.join(results_dir, f"{result['scale']}-{run_id}.json"), 'w') as f:
+            json.dump(result, f, indent=2)
+
+    baseline = load_baseline(args.baseline)
+    problems = []
+    for result in results:
+        print(f"\nScale {result['scale']}" +
+              (" (no baseline yet)" if result['scale'] not in baseline else " vs baseline"))
+        table, found = compare(result, baseline.get(result['scale'], {}), args.tolerance)
+        print(table)
+        problems += [f"{result['scale']}: {problem}" for problem in found]
+
+    if args.save_baseline:
+        print(f"\n✓ Baseline saved: {save_baseline(results, args.baseline)}")
+
+    if problems:
+        print("\n✗ Regressions:")
+        for problem in problems:
+            print(f"  - {problem}")
+        if not args.save_baseline:
+            sys.exit(1)
+    else:
+        print("\n✓ No regressions")
+
+
+if __name__ == "__main__":
+    main()
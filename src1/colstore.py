@@ -0,0 +1,304 @@
+"""
+Memory-Mapped BTS Column Store
+==============================
+The hot BTS measures and their group keys as plain NumPy arrays on disk, so
+pipeline workers, the query service and notebooks can all map the same
+files instead of each loading and holding its own DataFrame:
+
+    <store_dir>/columns/bts/meta.json           rows, sort order, key labels
+    <store_dir>/columns/bts/keys/<key>.npy      int16/int32 codes into the key's labels
+    <store_dir>/columns/bts/measures/<m>.npy    float64, missing values stored as 0
+
+Keys (year, month, carrier, carrier_name, airport, state) are dictionary
+encoded: labels are sorted, missing values get code -1. Rows are sorted by
+year, month, carrier, airport. Opening the store reads meta.json only; each
+array is np.load(..., mmap_mode='r'), so it costs nothing until it is read
+and every process reading it shares the same page cache.
+
+Group sums use NumPy kernels instead of pandas groupby:
+    - by a prefix of the sort order (year; year, month; ...) with no filter:
+      np.add.reduceat over the runs of equal keys
+    - otherwise: the key codes are combined into one group id per row and
+      each measure is summed with np.bincount (through np.unique first when
+      the key combinations would not fit a dense array)
+Results match DataFrame.groupby(by, dropna=False).sum(): groups sorted by
+label, missing labels last.
+
+Usage:
+    from colstore import load_column_store
+    store = load_column_store()                 # saved store, or built from the BTS data
+    store.group_sum(['year', 'month'], ['arr_flights', 'arr_del15'])
+    store.group_sum(['state'], where={'year': (2015, 2020), 'carrier': 'DL'})
+
+    python colstore.py --rebuild [--check]      # (re)build; --check compares with pandas
+"""
+
+import argparse
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+from aggregates import MEASURES
+from dimensions import is_fresh, load_dimensions
+from enrich import add_state
+from ingest import load_dataset, source_files
+from writers import write_json
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+KEYS = ['year', 'month', 'carrier', 'carrier_name', 'airport', 'state']
+SORT_KEYS = ['year', 'month', 'carrier', 'airport']
+
+BTS_COLUMNS = ['year', 'month', 'carrier', 'carrier_name', 'airport'] + MEASURES
+
+# Largest key-combination space summed with a dense bincount
+DENSE_GROUPS = 1 << 22
+
+
+# ============================================================================
+# KERNELS
+# ============================================================================
+
+def _code_dtype(n_labels):
+    return np.int16 if n_labels < np.iinfo(np.int16).max else np.int32
+
+
+def group_ids(codes, sizes):
+    """
+    One flat group id per row from several key code arrays (code -1 for a
+    missing label). Returns (ids, shape); missing sorts after every label.
+    """
+    shape = tuple(size + 1 for size in sizes)
+    shifted = [np.where(c < 0, size, c).astype(np.int64) for c, size in zip(codes, sizes)]
+    return np.ravel_multi_index(shifted, shape), shape
+
+
+def bincount_sums(ids, values, n_groups):
+    """{name: per-group sum} of each value array, for dense group ids."""
+    return {name: np.bincount(ids, weights=v, minlength=n_groups) for name, v in values.items()}
+
+
+def run_starts(codes):
+    """Start of every run of equal keys in rows sorted by those keys."""
+    n = len(codes[0]) if codes else 0
+    change = np.zeros(n, dtype=bool)
+    if n:
+        change[0] = True
+    for c in codes:
+        change[1:] |= c[1:] != c[:-1]
+    return np.flatnonzero(change)
+
+
+def reduceat_sums(starts, values):
+    """{name: per-run sum} of each value array, for runs starting at `starts`."""
+    return {name: np.add.reduceat(v, starts) if len(starts) else np.zeros(0) for name, v in values.items()}
+
+
+# ============================================================================
+# STORE
+# ============================================================================
+
+class ColumnStore:
+    """Memory-mapped key codes and measures with group-sum kernels."""
+
+    def __init__(self, path):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self.sort_keys = meta['sort_keys']
+        self.labels = meta['labels']
+        self.measures = meta['measures']
+        self._arrays = {}
+
+    def __len__(self):
+        return self.rows
+
+    def _array(self, kind, name):
+        if (kind, name) not in self._arrays:
+            self._arrays[(kind, name)] = np.load(os.path.join(self.path, kind, f'{name}.npy'), mmap_mode='r')
+        return self._arrays[(kind, name)]
+
+    def codes(self, key):
+        return self._array('keys', key)
+
+    def values(self, measure):
+        return self._array('measures', measure)
+
+    def mask(self, where):
+        """
+        Row mask for {key: value, list/set of values, or (low, high) inclusive
+        range}; every condition must hold.
+        """
+        mask = np.ones(self.rows, dtype=bool)
+        for key, allowed in where.items():
+            if key not in self.labels:
+                raise KeyError(f"unknown column store key {key!r}")
+            labels = self.labels[key]
+            if isinstance(allowed, tuple):
+                low, high = allowed
+                keep = [label is not None and (low is None or label >= low) and (high is None or label <= high)
+                        for label in labels]
+            else:
+                allowed = set(allowed) if isinstance(allowed, (list, set, frozenset)) else {allowed}
+                keep = [label in allowed for label in labels]
+            # One lookup per row: the last slot is code -1 (missing), never kept
+            mask &= np.array(keep + [False])[self.codes(key)]
+        return mask
+
+    def group_sum(self, by, measures=None, where=None):
+        """
+        Sum the measures per combination of the `by` keys (all rows if empty),
+        with an n_rows count. Returns a DataFrame of labels and sums.
+        """
+        by = list(by)
+        measures = list(measures) if measures is not None else self.measures
+        mask = self.mask(where) if where else None
+
+        codes = [np.asarray(self.codes(key)) for key in by]
+        values = {m: np.asarray(self.values(m)) for m in measures}
+        values['n_rows'] = np.ones(self.rows)
+
+        if not by:
+            if mask is not None:
+                values = {m: v[mask] for m, v in values.items()}
+            return pd.DataFrame({m: [v.sum()] for m, v in values.items()})
+
+        if mask is None and by == self.sort_keys[:len(by)]:
+            # Rows are already grouped: sum each run
+            starts = run_starts(codes)
+            sums = reduceat_sums(starts, values)
+            key_codes = [c[starts] for c in codes]
+        else:
+            ids, shape = group_ids(codes, [len(self.labels[key]) for key in by])
+            if mask is not None:
+                ids = ids[mask]
+                values = {m: v[mask] for m, v in values.items()}
+            n_groups = int(np.prod(shape))
+            if n_groups <= DENSE_GROUPS:
+                sums = bincount_sums(ids, values, n_groups)
+                present = np.flatnonzero(sums['n_rows'])
+                sums = {m: s[present] for m, s in sums.items()}
+            else:
+                present, ids = np.unique(ids, return_inverse=True)
+                sums = bincount_sums(ids, values, len(present))
+            key_codes = np.unravel_index(present, shape)
+
+        table = {}
+        for key, key_code in zip(by, key_codes):
+            labels = np.array(self.labels[key] + [None], dtype=object)
+            table[key] = labels[key_code]
+        table.update(sums)
+        return pd.DataFrame(table)
+
+
+def build_column_store(bts_data, path, measures=MEASURES):
+    """Write BTS rows (with 'state' already added) as a column store at path. Returns it opened."""
+    keys = [key for key in KEYS if key in bts_data.columns]
+    codes, labels = {}, {}
+    for key in keys:
+        key_codes, uniques = pd.factorize(bts_data[key].astype(object), sort=True)
+        codes[key] = key_codes.astype(_code_dtype(len(uniques)))
+        labels[key] = [u.item() if isinstance(u, np.generic) else u for u in uniques]
+
+    # Missing sorts last, as in group_sum
+    sort_keys = [key for key in SORT_KEYS if key in keys]
+    order = np.lexsort([np.where(codes[key] < 0, len(labels[key]), codes[key]) for key in reversed(sort_keys)])
+
+    tmp_path = path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(os.path.join(tmp_path, 'keys'))
+    os.makedirs(os.path.join(tmp_path, 'measures'))
+
+    for key in keys:
+        np.save(os.path.join(tmp_path, 'keys', f'{key}.npy'), codes[key][order])
+    for measure in measures:
+        values = pd.to_numeric(bts_data[measure], errors='coerce').to_numpy('float64', na_value=0.0)
+        np.save(os.path.join(tmp_path, 'measures', f'{measure}.npy'), values[order])
+
+    meta = {'rows': len(bts_data), 'sort_keys': sort_keys, 'labels': labels, 'measures': list(measures)}
+    write_json(meta, os.path.join(tmp_path, 'meta.json'), pretty=True, compress=False)
+
+    # Processes that still map the old files keep reading them until they reopen
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return ColumnStore(path)
+
+
+def column_store_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'columns', 'bts')
+
+
+def load_column_store(data_dir=DATA_DIR, store_dir=STORE_DIR, rebuild=False):
+    """Open the saved column store while it is newer than the BTS and airports sources; rebuild it otherwise."""
+    path = column_store_path(store_dir)
+    sources = source_files('bts', data_dir, store_dir) + source_files('airports', data_dir, store_dir)
+    if not rebuild and is_fresh(os.path.join(path, 'meta.json'), sources):
+        return ColumnStore(path)
+
+    bts_data = load_dataset('bts', columns=BTS_COLUMNS, raw_dir=data_dir, store_dir=store_dir)
+    airports = load_dimensions(data_dir, store_dir)['airports']
+    return build_column_store(add_state(bts_data, airports), path)
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+CHECKS = [['year'], ['year', 'month'], ['state'], ['carrier_name', 'airport']]
+
+
+def check(store, bts_data):
+    """Compare group_sum with pandas groupby for a few groupings; print the timings."""
+    for by in CHECKS:
+        start = time.perf_counter()
+        result = store.group_sum(by, MEASURES)
+        store_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        expected = bts_data.groupby(by, observed=True, dropna=False)[MEASURES].sum().reset_index()
+        pandas_s = time.perf_counter() - start
+
+        same = len(result) == len(expected) and all(
+            np.allclose(result[m].to_numpy(), expected[m].to_numpy('float64')) for m in MEASURES
+        )
+        mark = '✓' if same else '✗'
+        print(f"  {mark} {', '.join(by):<24} {len(result):>7,} groups  "
+              f"{store_s * 1000:>8.1f} ms  (pandas {pandas_s * 1000:.1f} ms)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the memory-mapped BTS column store.")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if the saved store is current")
+    parser.add_argument('--check', action='store_true', help="Compare group sums with pandas groupby")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+
+    start = time.time()
+    store = load_column_store(args.data_dir, store_dir, rebuild=args.rebuild)
+    path = column_store_path(store_dir)
+    size = sum(os.path.getsize(os.path.join(root, f)) for root, _, files in os.walk(path) for f in files)
+    print(f"✓ Column store: {len(store):,} rows, {size / 1024 / 1024:.1f} MB ({time.time() - start:.1f} s)")
+    print(f"  {path}")
+
+    start = time.perf_counter()
+    ColumnStore(path)
+    print(f"  Open: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+    if args.check:
+        bts_data = load_dataset('bts', columns=BTS_COLUMNS, raw_dir=args.data_dir, store_dir=store_dir)
+        add_state(bts_data, load_dimensions(args.data_dir, store_dir)['airports'])
+        check(store, bts_data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Additive BTS Cube
+=================
+The BTS outputs are all re-groupings of the same additive measures. This
+module sums them once into a base cube keyed by
+
+    year, month, carrier, carrier_name, airport, state
+
+and serves any coarser rollup or slice from it, so a new view or filter costs
+a group-by over the cube instead of another scan of the raw rows.
+
+Only additive measures are stored. Ratios (avg_delay, delay_rate, cancel_rate,
+*_delay_pct, ...) are computed from the rolled-up sums when they are read,
+which is what makes them correct at every level.
+
+Usage:
+    from cube import load_cube
+    cube = load_cube()                          # saved cube, or rebuilt when the BTS data is newer
+    cube.rollup(['state'], ratios=['avg_delay', 'delay_rate'])
+    cube.slice(year=(2015, 2020), carrier_name='Delta Air Lines Inc.').rollup(['year', 'month'])
+
+    python cube.py --rebuild    # (re)build and save the base cube
+"""
+
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from aggregates import MEASURES
+from dimensions import is_fresh, load_dimensions
+from enrich import DELAY_COLS, add_state
+from ingest import load_dataset, source_files
+from metrics import metric_of_sums
+from schema import BTS_CAUSE_COUNT_COLUMNS
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+DIMENSIONS = ['year', 'month', 'carrier', 'carrier_name', 'airport', 'state']
+
+# Additive measures. 'ontime' is clamped at zero per BTS row before summing
+# (as the dashboard does) and 'n_rows' counts the BTS rows behind each cell.
+CUBE_MEASURES = MEASURES + BTS_CAUSE_COUNT_COLUMNS + ['ontime', 'n_rows']
+
+BTS_COLUMNS = ['year', 'month', 'carrier', 'carrier_name', 'airport'] + MEASURES + BTS_CAUSE_COUNT_COLUMNS
+
+
+def _ratio(numerator, denominator, scale=1):
+    return (numerator.astype('float64') / denominator.astype('float64').where(denominator != 0)) * scale
+
+
+# Read-time ratios: name -> function of a rolled-up table (the shared
+# definitions are in metrics.py)
+RATIOS = {
+    'avg_delay': lambda t: metric_of_sums(t, 'avg_delay_per_flight'),
+    **{
+        name: (lambda t, name=name: metric_of_sums(t, name))
+        for name in ['delay_rate', 'cancel_rate', 'ontime_rate']
+    },
+    'ontime_pct': lambda t: _ratio(t['ontime'], t['arr_flights'], 100),
+    **{
+        f'{col}_pct': (lambda t, name=f'{col}_pct': metric_of_sums(t, name))
+        for col in DELAY_COLS
+    },
+}
+
+
+# ============================================================================
+# CUBE
+# ============================================================================
+
+class Cube:
+    """Base-level additive cube with slice and rollup."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    @property
+    def measures(self):
+        return [m for m in CUBE_MEASURES if m in self.table.columns]
+
+    def slice(self, **where):
+        """
+        Restrict the cube. Each keyword is a dimension and a value, a list/set
+        of values, or a (low, high) tuple for an inclusive range.
+        """
+        mask = pd.Series(True, index=self.table.index)
+        for dim, allowed in where.items():
+            if dim not in DIMENSIONS:
+                raise KeyError(f"unknown cube dimension {dim!r}")
+            column = self.table[dim]
+            if isinstance(allowed, tuple):
+                low, high = allowed
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+            elif isinstance(allowed, (list, set, frozenset)):
+                mask &= column.isin(list(allowed))
+            else:
+                mask &= column == allowed
+        return Cube(self.table[mask])
+
+    def rollup(self, by, measures=None, ratios=(), where=None):
+        """
+        Sum the measures up to the `by` dimensions (everything if empty) and add
+        the requested read-time ratios. Missing dimension values form their own
+        group. Returns a DataFrame.
+        """
+        cube = self.slice(**where) if where else self
+        measures = list(measures) if measures is not None else self.measures
+        # Ratios may read any measure, so sum them all when any are requested
+        source = self.measures if ratios else measures
+
+        if by:
+            table = cube.table.groupby(list(by), observed=True, dropna=False)[source].sum().reset_index()
+        else:
+            table = cube.table[source].sum().to_frame().T
+
+        for name in ratios:
+            table[name] = RATIOS[name](table)
+        return table[list(by) + measures + list(ratios)]
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.table.to_parquet(path, index=False)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+def build_cube(bts_data):
+    """Sum BTS rows (with 'state' already added) into the base cube."""
+    rows = bts_data.copy()
+    flights = rows[['arr_flights', 'arr_del15', 'arr_cancelled']].fillna(0)
+    rows['ontime'] = (flights['arr_flights'] - flights['arr_del15'] - flights['arr_cancelled']).clip(lower=0)
+    rows['n_rows'] = 1
+
+    dims = [d for d in DIMENSIONS if d in rows.columns]
+    measures = [m for m in CUBE_MEASURES if m in rows.columns]
+    table = rows.groupby(dims, observed=True, dropna=False, sort=False)[measures].sum().reset_index()
+
+    for dim in ('carrier', 'carrier_name', 'airport', 'state'):
+        if dim in table.columns:
+            table[dim] = table[dim].astype('category')
+    return Cube(table)
+
+
+def cube_path(store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'cube', 'base.parquet')
+
+
+def load_cube(data_dir=DATA_DIR, store_dir=STORE_DIR, rebuild=False):
+    """Load the saved base cube while it is newer than the BTS and airports sources; rebuild (and save) it otherwise."""
+    path = cube_path(store_dir)
+    sources = source_files('bts', data_dir, store_dir) + source_files('airports', data_dir, store_dir)
+    if not rebuild and is_fresh(path, sources):
+        return Cube.load(path)
+
+    bts_data = load_dataset('bts', columns=BTS_COLUMNS, raw_dir=data_dir, store_dir=store_dir)
+    airports = load_dimensions(data_dir, store_dir)['airports']
+
+    cube = build_cube(add_state(bts_data, airports))
+    cube.save(path)
+    return cube
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the additive BTS cube.")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if a saved cube exists")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+
+    start = time.time()
+    cube = load_cube(args.data_dir, store_dir, rebuild=args.rebuild)
+    totals = cube.rollup([], ratios=['avg_delay', 'delay_rate'])
+
+    print(f"✓ Cube: {len(cube):,} cells from {int(totals['n_rows'].iloc[0]):,} BTS rows "
+          f"({time.time() - start:.1f} s)")
+    print(f"  {cube_path(store_dir)}")
+    print(f"  Overall avg delay {totals['avg_delay'].iloc[0]:.2f} min, "
+          f"delay rate {totals['delay_rate'].iloc[0]:.2f}%")
+
+
+if __name__ == "__main__":
+    main()
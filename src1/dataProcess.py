@@ -11,471 +11,701 @@ Output files:
 4. temporal_delays.csv - Time series data for stream graph
 5. airport_performance.csv - Airport metrics for bubble chart
 6. reviews_processed.csv - Processed reviews with sentiment scores
+7. monthly_delay_sentiment.csv - Carrier-month delay rate vs review ratings
+8. review_carriers.csv - Review airline name -> BTS carrier matches (airline_resolver.py)
+9. rankings.json - Top/bottom 10 airports, carriers and states per metric (rankings.py)
+
+Usage:
+    python dataProcess.py [--data-dir DIR] [--out-dir DIR]
+
+    # Out-of-core: aggregate the BTS file chunk by chunk instead of loading it
+    # whole, so peak memory is bounded by --chunksize rather than by the
+    # number of years loaded. Produces the same outputs.
+    python dataProcess.py --streaming [--chunksize 500000]
+
+    # Steps 6-8 run as named stages (see STAGES and stages.py). A stage whose
+    # input files and code are unchanged since its last run is skipped and its
+    # cached outputs reused; independent stages run in a process pool, one
+    # worker per CPU by default (--workers 1 runs them in order).
+    python dataProcess.py sunburst_data carrier_metrics   # just these (and their inputs)
+    python dataProcess.py --list                          # which stages would run
+    python dataProcess.py --force                         # rerun everything
+
+    # Every run appends per-stage wall/CPU time, peak memory and row counts to
+    # <store-dir>/runs/runs.csv (and run-<id>.json); --profile also writes a
+    # cProfile (or pyinstrument) profile per stage
+    python dataProcess.py --profile cprofile [--trace-memory]
+
+    # JSON outputs are written compact, with .json.gz / .json.br siblings for
+    # the browser (see writers.py); --pretty-json indents them
+    python dataProcess.py --pretty-json
 """
 
-import pandas as pd
-import numpy as np
-import json
-from datetime import datetime
+import argparse
+import os
 import warnings
 warnings.filterwarnings('ignore')
 
-print("=" * 80)
-print("AIRPORT DELAY ANALYSIS - DATA PREPROCESSING")
-print("=" * 80)
+from airline_resolver import AirlineResolver, add_review_carrier, review_carriers
+from aggregates import finalize, group_mode, state_summary_dict, stream_partials, write_outputs
+from delay_sentiment import (
+    all_review_months, carrier_months, combine_carrier_months, monthly_delay_sentiment, review_months,
+)
+from dimensions import AIRPORT_COLUMNS, airport_dimension, dimension_path
+from enrich import (
+    CARRIER_MAPPING, add_airport_details, add_carrier_full_name, add_state, year_month_label,
+)
+from ingest import iter_dataset, load_dataset, source_files
+from instrument import PROFILERS, RunLog, count_rows, measure
+from metrics import METRICS, dominant_delay_type
+from rankings import build_rankings, rank_rows
+from sentiment import add_review_sentiment
+from stages import plan_stages, run_stages
+from sunburst import build_sunburst
+from writers import json_files, write_json
+
+# Adjust this path to where your raw CSVs are stored. If `python ingest.py` has
+# been run into STORE_DIR, the Parquet copies are read instead of the CSVs.
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+OUTPUT_DIR = '/mnt/user-data/outputs'
+
+# Rows per BTS chunk in --streaming mode
+CHUNKSIZE = 500_000
+
+# Only the columns this script uses are read from each source
+BTS_COLUMNS = [
+    'year', 'month', 'carrier', 'carrier_name', 'airport',
+    'arr_flights', 'arr_del15', 'arr_cancelled', 'arr_delay',
+    'carrier_delay', 'weather_delay', 'nas_delay', 'security_delay', 'late_aircraft_delay'
+]
+GEO_COLUMNS = AIRPORT_COLUMNS
+REVIEW_COLUMNS = ['airline_name', 'date', 'content', 'overall_rating', 'recommended']
+
 
 # ============================================================================
 # STEP 1: LOAD DATASETS
 # ============================================================================
-print("\n[1/8] Loading datasets...")
 
-# Load BTS delay data
-print("  • Loading BTS delay data...")
-# Adjust this path to where your BTS data is stored
-bts_data = pd.read_csv('/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public/Airline_Delay_Cause.csv')
-print(f"    Loaded {len(bts_data):,} delay records")
+def load_datasets(data_dir, store_dir, include_bts=True):
+    """Load the BTS (unless streaming), airport and review datasets."""
+    bts_data = None
+    if include_bts:
+        # Load BTS delay data
+        print("  • Loading BTS delay data...")
+        bts_data = load_dataset('bts', columns=BTS_COLUMNS, raw_dir=data_dir, store_dir=store_dir)
+        print(f"    Loaded {len(bts_data):,} delay records")
 
-# Load geographical data
-print("  • Loading airport geographic data...")
-geo_data = pd.read_csv('/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public/airports_geographic.csv')
-print(f"    Loaded {len(geo_data):,} airport records")
+    # Load geographical data
+    print("  • Loading airport geographic data...")
+    geo_data = load_dataset('airports', columns=GEO_COLUMNS, raw_dir=data_dir, store_dir=store_dir)
+    print(f"    Loaded {len(geo_data):,} airport records")
 
-# Load reviews data
-print("  • Loading Skytrax reviews...")
-reviews_data = pd.read_csv('/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public/skytrax_airline_reviews.csv')
-print(f"    Loaded {len(reviews_data):,} reviews")
-
-# ============================================================================
-# STEP 2: DATA QUALITY CHECK
-# ============================================================================
-print("\n[2/8] Data Quality Assessment...")
+    # Load reviews data
+    print("  • Loading Skytrax reviews...")
+    reviews_data = load_dataset('reviews', columns=REVIEW_COLUMNS, raw_dir=data_dir, store_dir=store_dir)
+    print(f"    Loaded {len(reviews_data):,} reviews")
 
-print("\n  BTS Delay Data:")
-print(f"    Date Range: {bts_data['year'].min()}-{bts_data['year'].max()}")
-print(f"    Unique Airports: {bts_data['airport'].nunique()}")
-print(f"    Unique Carriers: {bts_data['carrier'].nunique()}")
-print(f"    Missing Values: {bts_data.isnull().sum().sum()}")
+    return bts_data, geo_data, reviews_data
 
-print("\n  Geographic Data:")
-print(f"    Total Airports: {len(geo_data)}")
-print(f"    US Airports: {len(geo_data[geo_data['iso_country'] == 'US'])}")
-print(f"    With IATA codes: {geo_data['iata_code'].notna().sum()}")
-
-print("\n  Reviews Data:")
-print(f"    Date Range: {reviews_data['date'].min()} to {reviews_data['date'].max()}")
-print(f"    Unique Airlines: {reviews_data['airline_name'].nunique()}")
-print(f"    Reviews with ratings: {reviews_data['overall_rating'].notna().sum()}")
 
 # ============================================================================
-# STEP 3: CREATE AIRPORT-TO-STATE MAPPING
+# STEP 2: DATA QUALITY CHECK
 # ============================================================================
-print("\n[3/8] Creating airport-to-state mapping...")
 
-# Extract state codes from iso_region (format: US-XX)
-geo_data['state'] = geo_data['iso_region'].str.replace('US-', '')
+def data_quality_report(bts_data, geo_data, reviews_data):
+    if bts_data is not None:
+        print("\n  BTS Delay Data:")
+        print(f"    Date Range: {bts_data['year'].min()}-{bts_data['year'].max()}")
+        print(f"    Unique Airports: {bts_data['airport'].nunique()}")
+        print(f"    Unique Carriers: {bts_data['carrier'].nunique()}")
+        print(f"    Missing Values: {bts_data.isnull().sum().sum()}")
 
-# Create mapping dictionary: airport code -> state
-airport_to_state = geo_data[geo_data['iata_code'].notna()].set_index('iata_code')['state'].to_dict()
+    print("\n  Geographic Data:")
+    print(f"    Total Airports: {len(geo_data)}")
+    print(f"    US Airports: {len(geo_data[geo_data['iso_country'] == 'US'])}")
+    print(f"    With IATA codes: {geo_data['iata_code'].notna().sum()}")
 
-# Also create full info mapping
-airport_info = geo_data[geo_data['iata_code'].notna()].set_index('iata_code')[
-    ['name', 'latitude_deg', 'longitude_deg', 'state', 'municipality']
-].to_dict('index')
+    print("\n  Reviews Data:")
+    print(f"    Date Range: {reviews_data['date'].min()} to {reviews_data['date'].max()}")
+    print(f"    Unique Airlines: {reviews_data['airline_name'].nunique()}")
+    print(f"    Reviews with ratings: {reviews_data['overall_rating'].notna().sum()}")
 
-print(f"    Mapped {len(airport_to_state)} airports to states")
-
-# Add state to BTS data
-bts_data['state'] = bts_data['airport'].map(airport_to_state)
-print(f"    {bts_data['state'].notna().sum()} BTS records have state mappings")
 
 # ============================================================================
-# STEP 4: CARRIER NAME MAPPING
+# STEPS 3-5: MAPPINGS AND DERIVED METRICS
 # ============================================================================
-print("\n[4/8] Creating carrier name mappings...")
-
-# Common US carriers in BTS data
-carrier_mapping = {
-    'AA': 'American Airlines',
-    'AS': 'Alaska Airlines',
-    'B6': 'JetBlue Airways',
-    'DL': 'Delta Air Lines',
-    'F9': 'Frontier Airlines',
-    'G4': 'Allegiant Air',
-    'HA': 'Hawaiian Airlines',
-    'NK': 'Spirit Airlines',
-    'UA': 'United Airlines',
-    'WN': 'Southwest Airlines',
-    'YV': 'Mesa Airlines',
-    'YX': 'Republic Airline',
-    'G7': 'GoJet Airlines',
-}
 
-# Add full carrier names to BTS data
-bts_data['carrier_full_name'] = bts_data['carrier'].map(carrier_mapping).fillna(bts_data['carrier_name'])
+def map_airports_to_states(bts_data, geo_data, store_dir):
+    """Step 3. Returns the airports dimension (also saved to the store, see dimensions.py)."""
+    # Airport code -> state, plus name/coordinates for the bubble chart
+    airports = airport_dimension(geo_data)
+    airports.save(dimension_path('airports', store_dir))
 
-# Normalize review airline names for matching
-reviews_data['airline_normalized'] = reviews_data['airline_name'].str.lower().str.replace('-', ' ')
+    print(f"    Mapped {len(airports)} airports to states")
 
-print(f"    Mapped {len(carrier_mapping)} carriers")
+    # Add state to BTS data
+    if bts_data is not None:
+        add_state(bts_data, airports)
+        print(f"    {bts_data['state'].notna().sum()} BTS records have state mappings")
+
+    return airports
 
-# ============================================================================
-# STEP 5: CALCULATE DERIVED METRICS
-# ============================================================================
-print("\n[5/8] Calculating derived metrics...")
 
-# Calculate delay rates and percentages
-bts_data['delay_rate'] = (bts_data['arr_del15'] / bts_data['arr_flights'] * 100).fillna(0)
-bts_data['cancel_rate'] = (bts_data['arr_cancelled'] / bts_data['arr_flights'] * 100).fillna(0)
-bts_data['ontime_rate'] = 100 - bts_data['delay_rate']
+def map_carrier_names(bts_data, reviews_data, carrier_mapping=CARRIER_MAPPING):
+    """Step 4. Adds full carrier names to BTS rows and normalized airline names to reviews."""
+    # Add full carrier names to BTS data
+    if bts_data is not None:
+        add_carrier_full_name(bts_data, carrier_mapping)
 
-# Calculate average delay per flight
-bts_data['avg_delay_per_flight'] = (bts_data['arr_delay'] / bts_data['arr_flights']).fillna(0)
+    # Normalize review airline names for matching
+    reviews_data['airline_normalized'] = reviews_data['airline_name'].str.lower().str.replace('-', ' ')
 
-# Calculate delay composition percentages
-total_delay = (bts_data['carrier_delay'] + bts_data['weather_delay'] + 
-               bts_data['nas_delay'] + bts_data['security_delay'] + 
-               bts_data['late_aircraft_delay'])
+    print(f"    Mapped {len(carrier_mapping)} carriers")
 
-bts_data['carrier_delay_pct'] = (bts_data['carrier_delay'] / total_delay * 100).fillna(0)
-bts_data['weather_delay_pct'] = (bts_data['weather_delay'] / total_delay * 100).fillna(0)
-bts_data['nas_delay_pct'] = (bts_data['nas_delay'] / total_delay * 100).fillna(0)
-bts_data['security_delay_pct'] = (bts_data['security_delay'] / total_delay * 100).fillna(0)
-bts_data['late_aircraft_delay_pct'] = (bts_data['late_aircraft_delay'] / total_delay * 100).fillna(0)
 
-# Determine dominant delay type
-delay_cols = ['carrier_delay', 'weather_delay', 'nas_delay', 'security_delay', 'late_aircraft_delay']
-bts_data['dominant_delay_type'] = bts_data[delay_cols].idxmax(axis=1).str.replace('_delay', '')
+def derive_metrics(bts_data):
+    """
+    Step 5. Delay rates, delay composition and the dominant delay type are not
+    stored per row: stages compute them from sums, or per row on demand (metrics.py).
+    """
+    print(f"    ✓ {len(METRICS)} delay metrics and the dominant delay type defined (computed on demand)")
+    print(f"    ✓ Enriched BTS rows: {bts_data.memory_usage().sum() / 1024 / 1024:,.1f} MB")
 
-print("    ✓ Delay rates calculated")
-print("    ✓ Delay composition analyzed")
 
 # ============================================================================
 # STEP 6: GENERATE AGGREGATED DATASETS
 # ============================================================================
-print("\n[6/8] Generating aggregated datasets...")
-
-# -------------------------
-# 6.1: STATE SUMMARY (for Choropleth Map)
-# -------------------------
-print("\n  6.1: State-level summary...")
-
-state_summary = bts_data.groupby('state').agg({
-    'arr_flights': 'sum',
-    'arr_del15': 'sum',
-    'arr_delay': 'sum',
-    'arr_cancelled': 'sum',
-    'carrier_delay': 'sum',
-    'weather_delay': 'sum',
-    'nas_delay': 'sum',
-    'security_delay': 'sum',
-    'late_aircraft_delay': 'sum'
-}).reset_index()
-
-state_summary['avg_delay'] = state_summary['arr_delay'] / state_summary['arr_flights']
-state_summary['delay_rate'] = (state_summary['arr_del15'] / state_summary['arr_flights'] * 100)
-state_summary['cancel_rate'] = (state_summary['arr_cancelled'] / state_summary['arr_flights'] * 100)
-
-# Find worst airport per state
-worst_airport_per_state = bts_data.groupby(['state', 'airport']).agg({
-    'avg_delay_per_flight': 'mean'
-}).reset_index()
-worst_airport_per_state = worst_airport_per_state.loc[
-    worst_airport_per_state.groupby('state')['avg_delay_per_flight'].idxmax()
-]
 
-state_summary = state_summary.merge(
-    worst_airport_per_state[['state', 'airport']].rename(columns={'airport': 'worst_airport'}),
-    on='state',
-    how='left'
-)
+def build_ranking_index(bts_data, out_dir, pretty_json=False):
+    """6.0: Top-K / bottom-K airports, carriers and states per metric (see rankings.py). Returns the index."""
+    index = build_rankings(rank_rows(bts_data))
+    index.save(os.path.join(out_dir, 'rankings.json'), pretty=pretty_json)
+    print(f"    ✓ Created rankings.json (top and bottom {index.k} per metric and partition)")
+    return index
+
+
+def build_state_summary(bts_data, rankings, out_dir, pretty_json=False):
+    """6.1: State-level summary (for Choropleth Map)."""
+    state_summary = bts_data.groupby('state', observed=True).agg({
+        'arr_flights': 'sum',
+        'arr_del15': 'sum',
+        'arr_delay': 'sum',
+        'arr_cancelled': 'sum',
+        'carrier_delay': 'sum',
+        'weather_delay': 'sum',
+        'nas_delay': 'sum',
+        'security_delay': 'sum',
+        'late_aircraft_delay': 'sum'
+    }).reset_index()
+
+    state_summary['avg_delay'] = state_summary['arr_delay'] / state_summary['arr_flights']
+    state_summary['delay_rate'] = (state_summary['arr_del15'] / state_summary['arr_flights'] * 100)
+    state_summary['cancel_rate'] = (state_summary['arr_cancelled'] / state_summary['arr_flights'] * 100)
+
+    # Worst airport per state, from the ranking index (6.0)
+    worst_airports = rankings.leaders('airport', 'row_avg_delay', by='state')
+    state_summary['worst_airport'] = state_summary['state'].astype(object).map(worst_airports)
+
+    # Convert to dictionary for JSON
+    state_dict = state_summary_dict(state_summary)
+
+    write_json(state_dict, os.path.join(out_dir, 'state_summary.json'), pretty=pretty_json)
+
+    count_rows(len(state_dict))
+    print(f"    ✓ Created state_summary.json ({len(state_dict)} states)")
+
+
+def build_sunburst_data(bts_data, out_dir, pretty_json=False):
+    """6.2: Sunburst hierarchical data."""
+    # One grouped aggregation over (state, airport), then a single pass to build the tree
+    sunburst_root = build_sunburst(bts_data)
+
+    with measure('write_json'):
+        write_json(sunburst_root, os.path.join(out_dir, 'sunburst_data.json'), pretty=pretty_json)
+    count_rows(len(sunburst_root['children']))
+
+    print(f"    ✓ Created sunburst_data.json")
+
+
+def build_carrier_metrics(bts_data, out_dir):
+    """6.3: Carrier comparison metrics (for Parallel Coordinates). Returns the full metrics frame."""
+    carrier_metrics = bts_data.groupby('carrier_full_name').agg({
+        'arr_flights': 'sum',
+        'arr_delay': 'sum',
+        'arr_cancelled': 'sum',
+        'arr_del15': 'sum',
+        'carrier_delay': 'sum',
+        'weather_delay': 'sum',
+        'nas_delay': 'sum',
+        'late_aircraft_delay': 'sum'
+    }).reset_index()
+
+    carrier_metrics['avg_delay'] = carrier_metrics['arr_delay'] / carrier_metrics['arr_flights']
+    carrier_metrics['cancel_rate'] = (carrier_metrics['arr_cancelled'] / carrier_metrics['arr_flights'] * 100)
+    carrier_metrics['ontime_rate'] = 100 - ((carrier_metrics['arr_del15'] / carrier_metrics['arr_flights']) * 100)
+
+    # Calculate delay composition percentages
+    total_delay_carrier = (carrier_metrics['carrier_delay'] + carrier_metrics['weather_delay'] +
+                           carrier_metrics['nas_delay'] + carrier_metrics['late_aircraft_delay'])
+
+    carrier_metrics['carrier_delay_pct'] = (carrier_metrics['carrier_delay'] / total_delay_carrier * 100).fillna(0)
+    carrier_metrics['weather_delay_pct'] = (carrier_metrics['weather_delay'] / total_delay_carrier * 100).fillna(0)
+    carrier_metrics['nas_delay_pct'] = (carrier_metrics['nas_delay'] / total_delay_carrier * 100).fillna(0)
+
+    # Add review ratings (we'll calculate this in step 7)
+    carrier_metrics['avg_rating'] = 0  # Placeholder
+
+    # Select columns for output
+    carrier_output = carrier_metrics[[
+        'carrier_full_name', 'arr_flights', 'avg_delay', 'cancel_rate',
+        'weather_delay_pct', 'carrier_delay_pct', 'nas_delay_pct', 'ontime_rate'
+    ]].copy()
+
+    carrier_output.columns = [
+        'carrier', 'total_flights', 'avg_delay_min', 'cancel_rate_pct',
+        'weather_pct', 'carrier_pct', 'nas_pct', 'ontime_pct'
+    ]
+
+    carrier_output.to_csv(os.path.join(out_dir, 'carrier_metrics.csv'), index=False)
+    count_rows(len(carrier_output))
+    print(f"    ✓ Created carrier_metrics.csv ({len(carrier_output)} carriers)")
+
+    return carrier_metrics
+
+
+def build_temporal_delays(bts_data, out_dir):
+    """6.4: Temporal delay patterns (for Stream Graph)."""
+    # Grouped by the period label without adding it to the shared rows
+    temporal_delays = bts_data.groupby(year_month_label(bts_data)).agg({
+        'carrier_delay': 'sum',
+        'weather_delay': 'sum',
+        'nas_delay': 'sum',
+        'security_delay': 'sum',
+        'late_aircraft_delay': 'sum',
+        'arr_flights': 'sum'
+    }).reset_index()
+
+    temporal_delays = temporal_delays.sort_values('year_month')
+
+    temporal_delays.to_csv(os.path.join(out_dir, 'temporal_delays.csv'), index=False)
+    count_rows(len(temporal_delays))
+    print(f"    ✓ Created temporal_delays.csv ({len(temporal_delays)} time periods)")
+
+
+def build_airport_performance(bts_data, airports, out_dir):
+    """6.5: Airport performance metrics (for Bubble Chart)."""
+    grouped = bts_data.groupby('airport', observed=True)
+    airport_performance = grouped.agg({
+        'arr_flights': 'sum',
+        'arr_delay': 'sum',
+        'arr_cancelled': 'sum',
+        'state': 'first',
+    }).reset_index()
+    # Most frequent per-row dominant delay type, counted per airport in one pass
+    airport_performance['dominant_delay_type'] = group_mode(
+        grouped.ngroup(), dominant_delay_type(bts_data), grouped.ngroups
+    )
+
+    airport_performance['avg_delay'] = airport_performance['arr_delay'] / airport_performance['arr_flights']
+
+    # Add airport names and coordinates
+    add_airport_details(airport_performance, airports)
+
+    # Filter to airports with significant traffic (>1000 flights)
+    airport_performance = airport_performance[airport_performance['arr_flights'] > 1000]
+
+    airport_output = airport_performance[[
+        'airport', 'airport_name', 'state', 'arr_flights', 'avg_delay',
+        'arr_cancelled', 'dominant_delay_type', 'latitude', 'longitude'
+    ]].copy()
+
+    airport_output.columns = [
+        'airport_code', 'airport_name', 'state', 'total_flights', 'avg_delay_min',
+        'total_cancelled', 'dominant_delay_type', 'latitude', 'longitude'
+    ]
+
+    airport_output.to_csv(os.path.join(out_dir, 'airport_performance.csv'), index=False)
+    count_rows(len(airport_output))
+    print(f"    ✓ Created airport_performance.csv ({len(airport_output)} airports)")
+
+
+def _collect_carrier_months(chunks, months):
+    # Carrier-month sums of each raw chunk, gathered on the way to the partials
+    for chunk in chunks:
+        months.append(carrier_months(chunk))
+        yield chunk
+
+
+def stream_bts_outputs(data_dir, store_dir, airports, out_dir, chunksize=CHUNKSIZE, pretty_json=False):
+    """
+    Steps 3-6 and 8 for --streaming: enrich and aggregate the BTS rows one chunk
+    at a time into mergeable partials (see aggregates.py), then derive every BTS
+    output from the partials. Returns the carrier-month sums for step 7.1.
+    """
+    chunks = iter_dataset('bts', columns=BTS_COLUMNS, chunksize=chunksize,
+                          raw_dir=data_dir, store_dir=store_dir)
+    months = []
+    partials = stream_partials(_collect_carrier_months(chunks, months), airports)
+    print(f"    Aggregated {int(partials['airport']['n_rows'].sum()):,} delay records "
+          f"in chunks of {chunksize:,}")
+
+    outputs = finalize(partials, airports)
+    write_outputs(outputs, out_dir, pretty_json)
+
+    print(f"    ✓ Created state_summary.json ({len(outputs['state_summary.json'])} states)")
+    print(f"    ✓ Created sunburst_data.json")
+    print(f"    ✓ Created carrier_metrics.csv ({len(outputs['carrier_metrics.csv'])} carriers)")
+    print(f"    ✓ Created temporal_delays.csv ({len(outputs['temporal_delays.csv'])} time periods)")
+    print(f"    ✓ Created airport_performance.csv ({len(outputs['airport_performance.csv'])} airports)")
+    print(f"    ✓ Created summary_stats.json")
+    print(f"    ✓ Created rankings.json")
+
+    return combine_carrier_months(months)
 
-# Convert to dictionary for JSON
-state_dict = {}
-for _, row in state_summary.iterrows():
-    if pd.notna(row['state']):
-        state_dict[row['state']] = {
-            'total_flights': int(row['arr_flights']),
-            'avg_delay': round(float(row['avg_delay']), 2),
-            'delay_rate': round(float(row['delay_rate']), 2),
-            'cancel_rate': round(float(row['cancel_rate']), 2),
-            'worst_airport': str(row['worst_airport']) if pd.notna(row['worst_airport']) else None,
-            'total_delays': int(row['arr_del15'])
-        }
-
-with open('/mnt/user-data/outputs/state_summary.json', 'w') as f:
-    json.dump(state_dict, f, indent=2)
-
-print(f"    ✓ Created state_summary.json ({len(state_dict)} states)")
-
-# -------------------------
-# 6.2: SUNBURST DATA (Hierarchical)
-# -------------------------
-print("\n  6.2: Sunburst hierarchical data...")
-
-def create_sunburst_node(name, value, children=None):
-    node = {"name": name, "value": value}
-    if children:
-        node["children"] = children
-    return node
-
-# Group by state and airport, then by delay type
-sunburst_data = []
-
-for state in bts_data['state'].dropna().unique():
-    state_data = bts_data[bts_data['state'] == state]
-    
-    # Get airports in this state
-    airport_children = []
-    for airport in state_data['airport'].unique():
-        airport_data = state_data[state_data['airport'] == airport]
-        
-        # Calculate delay type breakdown for this airport
-        delay_types = []
-        total_carrier = airport_data['carrier_delay'].sum()
-        total_weather = airport_data['weather_delay'].sum()
-        total_nas = airport_data['nas_delay'].sum()
-        total_security = airport_data['security_delay'].sum()
-        total_late = airport_data['late_aircraft_delay'].sum()
-        
-        if total_carrier > 0:
-            delay_types.append(create_sunburst_node("Carrier", int(total_carrier)))
-        if total_weather > 0:
-            delay_types.append(create_sunburst_node("Weather", int(total_weather)))
-        if total_nas > 0:
-            delay_types.append(create_sunburst_node("NAS", int(total_nas)))
-        if total_security > 0:
-            delay_types.append(create_sunburst_node("Security", int(total_security)))
-        if total_late > 0:
-            delay_types.append(create_sunburst_node("Late Aircraft", int(total_late)))
-        
-        if delay_types:
-            airport_node = create_sunburst_node(
-                airport,
-                int(airport_data['arr_delay'].sum()),
-                delay_types
-            )
-            airport_children.append(airport_node)
-    
-    if airport_children:
-        state_node = create_sunburst_node(
-            state,
-            int(state_data['arr_delay'].sum()),
-            airport_children
-        )
-        sunburst_data.append(state_node)
-
-sunburst_root = create_sunburst_node("USA", 0, sunburst_data)
-
-with open('/mnt/user-data/outputs/sunburst_data.json', 'w') as f:
-    json.dump(sunburst_root, f, indent=2)
-
-print(f"    ✓ Created sunburst_data.json")
-
-# -------------------------
-# 6.3: CARRIER METRICS (for Parallel Coordinates)
-# -------------------------
-print("\n  6.3: Carrier comparison metrics...")
-
-carrier_metrics = bts_data.groupby('carrier_full_name').agg({
-    'arr_flights': 'sum',
-    'arr_delay': 'sum',
-    'arr_cancelled': 'sum',
-    'arr_del15': 'sum',
-    'carrier_delay': 'sum',
-    'weather_delay': 'sum',
-    'nas_delay': 'sum',
-    'late_aircraft_delay': 'sum'
-}).reset_index()
-
-carrier_metrics['avg_delay'] = carrier_metrics['arr_delay'] / carrier_metrics['arr_flights']
-carrier_metrics['cancel_rate'] = (carrier_metrics['arr_cancelled'] / carrier_metrics['arr_flights'] * 100)
-carrier_metrics['ontime_rate'] = 100 - ((carrier_metrics['arr_del15'] / carrier_metrics['arr_flights']) * 100)
-
-# Calculate delay composition percentages
-total_delay_carrier = (carrier_metrics['carrier_delay'] + carrier_metrics['weather_delay'] + 
-                       carrier_metrics['nas_delay'] + carrier_metrics['late_aircraft_delay'])
-
-carrier_metrics['carrier_delay_pct'] = (carrier_metrics['carrier_delay'] / total_delay_carrier * 100).fillna(0)
-carrier_metrics['weather_delay_pct'] = (carrier_metrics['weather_delay'] / total_delay_carrier * 100).fillna(0)
-carrier_metrics['nas_delay_pct'] = (carrier_metrics['nas_delay'] / total_delay_carrier * 100).fillna(0)
-
-# Add review ratings (we'll calculate this in step 7)
-carrier_metrics['avg_rating'] = 0  # Placeholder
-
-# Select columns for output
-carrier_output = carrier_metrics[[
-    'carrier_full_name', 'arr_flights', 'avg_delay', 'cancel_rate',
-    'weather_delay_pct', 'carrier_delay_pct', 'nas_delay_pct', 'ontime_rate'
-]].copy()
-
-carrier_output.columns = [
-    'carrier', 'total_flights', 'avg_delay_min', 'cancel_rate_pct',
-    'weather_pct', 'carrier_pct', 'nas_pct', 'ontime_pct'
-]
 
-carrier_output.to_csv('/mnt/user-data/outputs/carrier_metrics.csv', index=False)
-print(f"    ✓ Created carrier_metrics.csv ({len(carrier_output)} carriers)")
-
-# -------------------------
-# 6.4: TEMPORAL DELAYS (for Stream Graph)
-# -------------------------
-print("\n  6.4: Temporal delay patterns...")
-
-# Create year-month column
-bts_data['year_month'] = bts_data['year'].astype(str) + '-' + bts_data['month'].astype(str).str.zfill(2)
-
-temporal_delays = bts_data.groupby('year_month').agg({
-    'carrier_delay': 'sum',
-    'weather_delay': 'sum',
-    'nas_delay': 'sum',
-    'security_delay': 'sum',
-    'late_aircraft_delay': 'sum',
-    'arr_flights': 'sum'
-}).reset_index()
-
-temporal_delays = temporal_delays.sort_values('year_month')
-
-temporal_delays.to_csv('/mnt/user-data/outputs/temporal_delays.csv', index=False)
-print(f"    ✓ Created temporal_delays.csv ({len(temporal_delays)} time periods)")
-
-# -------------------------
-# 6.5: AIRPORT PERFORMANCE (for Bubble Chart)
-# -------------------------
-print("\n  6.5: Airport performance metrics...")
-
-airport_performance = bts_data.groupby('airport').agg({
-    'arr_flights': 'sum',
-    'arr_delay': 'sum',
-    'arr_cancelled': 'sum',
-    'state': 'first',
-    'dominant_delay_type': lambda x: x.mode()[0] if len(x.mode()) > 0 else 'unknown'
-}).reset_index()
-
-airport_performance['avg_delay'] = airport_performance['arr_delay'] / airport_performance['arr_flights']
-
-# Add airport names and coordinates
-airport_performance['airport_name'] = airport_performance['airport'].map(
-    lambda x: airport_info.get(x, {}).get('name', x) if x in airport_info else x
-)
-airport_performance['latitude'] = airport_performance['airport'].map(
-    lambda x: airport_info.get(x, {}).get('latitude_deg', None) if x in airport_info else None
-)
-airport_performance['longitude'] = airport_performance['airport'].map(
-    lambda x: airport_info.get(x, {}).get('longitude_deg', None) if x in airport_info else None
-)
+# ============================================================================
+# STEP 7: PROCESS REVIEWS (with Sentiment Analysis)
+# ============================================================================
 
-# Filter to airports with significant traffic (>1000 flights)
-airport_performance = airport_performance[airport_performance['arr_flights'] > 1000]
+def process_reviews(reviews_data, bts_carriers, carrier_mapping, out_dir, scorer='rating'):
+    """
+    Step 7. bts_carriers is any frame with BTS's carrier / carrier_name
+    columns; their names are matched against the review airline names.
+    """
+    # Sentiment score (-1 to 1) and delay mentions, computed column-wise
+    with measure('sentiment_scoring', rows_in=len(reviews_data)):
+        add_review_sentiment(reviews_data, scorer)
 
-airport_output = airport_performance[[
-    'airport', 'airport_name', 'state', 'arr_flights', 'avg_delay',
-    'arr_cancelled', 'dominant_delay_type', 'latitude', 'longitude'
-]].copy()
+    # Match airline names to carrier codes once per distinct name
+    with measure('airline_matching', rows_in=len(reviews_data)):
+        resolver = AirlineResolver.from_carriers(bts_carriers, carrier_mapping)
+        add_review_carrier(reviews_data, resolver)
+        matches = review_carriers(reviews_data, resolver)
+        matches.to_csv(os.path.join(out_dir, 'review_carriers.csv'), index=False)
 
-airport_output.columns = [
-    'airport_code', 'airport_name', 'state', 'total_flights', 'avg_delay_min',
-    'total_cancelled', 'dominant_delay_type', 'latitude', 'longitude'
-]
+    # Extract US airline reviews only
+    us_reviews = reviews_data[reviews_data['carrier_code'].notna()]
 
-airport_output.to_csv('/mnt/user-data/outputs/airport_performance.csv', index=False)
-print(f"    ✓ Created airport_performance.csv ({len(airport_output)} airports)")
+    print(f"    Found {len(us_reviews)} US airline reviews")
+    print(f"    {us_reviews['mentions_delay'].sum()} mention delays")
 
-# ============================================================================
-# STEP 7: PROCESS REVIEWS (with Sentiment Analysis)
-# ============================================================================
-print("\n[7/8] Processing reviews...")
-
-# Simple sentiment analysis based on ratings
-def calculate_sentiment(row):
-    """Calculate sentiment score from -1 (negative) to 1 (positive)"""
-    if pd.isna(row['overall_rating']):
-        return 0
-    
-    # Normalize rating (1-10) to sentiment (-1 to 1)
-    # Rating 1-5 = negative, 6-8 = neutral/positive, 9-10 = very positive
-    rating = float(row['overall_rating'])
-    if rating <= 5:
-        return (rating - 5) / 5  # Maps 1->-0.8, 5->0
-    else:
-        return (rating - 5) / 5  # Maps 6->0.2, 10->1
+    # Aggregate by airline
+    review_summary = us_reviews.groupby('airline_name', observed=True).agg({
+        'overall_rating': 'mean',
+        'sentiment_score': 'mean',
+        'mentions_delay': 'sum',
+        'recommended': lambda x: (x == '1').sum() / len(x) * 100
+    }).reset_index()
 
-reviews_data['sentiment_score'] = reviews_data.apply(calculate_sentiment, axis=1)
+    review_summary.columns = ['airline', 'avg_rating', 'avg_sentiment', 'delay_mentions', 'recommend_pct']
 
-# Check if review mentions delays
-reviews_data['mentions_delay'] = reviews_data['content'].fillna('').str.lower().str.contains(
-    'delay|late|wait|held|stuck|cancel', regex=True
-)
+    review_summary.to_csv(os.path.join(out_dir, 'reviews_summary.csv'), index=False)
+    count_rows(len(review_summary))
+    print(f"    ✓ Created reviews_summary.csv")
+    print(f"    ✓ Created review_carriers.csv ({matches['carrier'].notna().sum()} of {len(matches)} airline names matched)")
 
-# Extract US airline reviews only
-us_airlines = list(carrier_mapping.values())
-us_reviews = reviews_data[reviews_data['airline_name'].isin([
-    'alaska-airlines', 'allegiant-air', 'american-airlines', 'delta-air-lines',
-    'frontier-airlines', 'hawaiian-airlines', 'jetblue-airways', 'southwest-airlines',
-    'spirit-airlines', 'united-airlines'
-])]
 
-print(f"    Found {len(us_reviews)} US airline reviews")
-print(f"    {us_reviews['mentions_delay'].sum()} mention delays")
+def write_monthly_sentiment(bts_months, reviews_data, out_dir):
+    resolver = AirlineResolver.from_carriers(bts_months)
+    monthly = monthly_delay_sentiment(bts_months, review_months(reviews_data, resolver),
+                                      all_review_months(reviews_data))
 
-# Aggregate by airline
-review_summary = us_reviews.groupby('airline_name').agg({
-    'overall_rating': 'mean',
-    'sentiment_score': 'mean',
-    'mentions_delay': 'sum',
-    'recommended': lambda x: (x == '1').sum() / len(x) * 100
-}).reset_index()
+    monthly.to_csv(os.path.join(out_dir, 'monthly_delay_sentiment.csv'), index=False)
+    count_rows(len(monthly))
+    print(f"    ✓ Created monthly_delay_sentiment.csv ({len(monthly)} carrier-months)")
 
-review_summary.columns = ['airline', 'avg_rating', 'avg_sentiment', 'delay_mentions', 'recommend_pct']
 
-review_summary.to_csv('/mnt/user-data/outputs/reviews_summary.csv', index=False)
-print(f"    ✓ Created reviews_summary.csv")
+def build_monthly_sentiment(bts_data, reviews_data, out_dir):
+    """7.1: Carrier-month delay rate vs review ratings (for the Monthly Delay vs Sentiment chart)."""
+    write_monthly_sentiment(carrier_months(bts_data), reviews_data, out_dir)
+
 
 # ============================================================================
 # STEP 8: GENERATE SUMMARY STATISTICS
 # ============================================================================
-print("\n[8/8] Generating summary statistics...")
-
-summary_stats = {
-    "dataset_overview": {
-        "bts_records": len(bts_data),
-        "airports": bts_data['airport'].nunique(),
-        "carriers": bts_data['carrier'].nunique(),
-        "states": bts_data['state'].nunique(),
-        "years": f"{bts_data['year'].min()}-{bts_data['year'].max()}",
-        "total_flights": int(bts_data['arr_flights'].sum()),
-        "total_delays": int(bts_data['arr_del15'].sum()),
-        "total_cancellations": int(bts_data['arr_cancelled'].sum())
+
+def build_summary_stats(bts_data, rankings, out_dir, pretty_json=False):
+    summary_stats = {
+        "dataset_overview": {
+            "bts_records": len(bts_data),
+            "airports": bts_data['airport'].nunique(),
+            "carriers": bts_data['carrier'].nunique(),
+            "states": bts_data['state'].nunique(),
+            "years": f"{bts_data['year'].min()}-{bts_data['year'].max()}",
+            "total_flights": int(bts_data['arr_flights'].sum()),
+            "total_delays": int(bts_data['arr_del15'].sum()),
+            "total_cancellations": int(bts_data['arr_cancelled'].sum())
+        },
+        "top_delay_causes": {
+            "weather": int(bts_data['weather_delay'].sum()),
+            "carrier": int(bts_data['carrier_delay'].sum()),
+            "nas": int(bts_data['nas_delay'].sum()),
+            "late_aircraft": int(bts_data['late_aircraft_delay'].sum()),
+            "security": int(bts_data['security_delay'].sum())
+        },
+        "worst_airports": dict(rankings.top('airport', 'row_avg_delay', 10)),
+        "best_carriers": [
+            {'carrier_full_name': name, 'avg_delay': value} for name, value in rankings.bottom('carrier', 'avg_delay', 5)
+        ]
+    }
+
+    write_json(summary_stats, os.path.join(out_dir, 'summary_stats.json'), pretty=pretty_json)
+
+
+# ============================================================================
+# STAGE GRAPH (steps 6-8)
+# ============================================================================
+
+# Each stage reads the enriched inputs and writes its own output files. An
+# input naming another stage receives that stage's return value, so
+# state_summary and summary_stats wait for rankings; everything else can run at
+# the same time. 'code' lists modules (beyond the stage function) whose changes should
+# rerun the stage.
+STAGES = {
+    'rankings': {
+        'title': '6.0: Ranking index',
+        'fn': build_ranking_index,
+        'inputs': ['bts_data', 'out_dir', 'pretty_json'],
+        'outputs': ['rankings.json'],
+        'code': ['rankings', 'metrics', 'writers'],
+    },
+    'state_summary': {
+        'title': '6.1: State-level summary',
+        'fn': build_state_summary,
+        'inputs': ['bts_data', 'rankings', 'out_dir', 'pretty_json'],
+        'outputs': json_files('state_summary.json'),
+        'code': ['aggregates', 'writers'],
+    },
+    'sunburst_data': {
+        'title': '6.2: Sunburst hierarchical data',
+        'fn': build_sunburst_data,
+        'inputs': ['bts_data', 'out_dir', 'pretty_json'],
+        'outputs': json_files('sunburst_data.json'),
+        'code': ['sunburst', 'writers'],
+    },
+    'carrier_metrics': {
+        'title': '6.3: Carrier comparison metrics',
+        'fn': build_carrier_metrics,
+        'inputs': ['bts_data', 'out_dir'],
+        'outputs': ['carrier_metrics.csv'],
+    },
+    'temporal_delays': {
+        'title': '6.4: Temporal delay patterns',
+        'fn': build_temporal_delays,
+        'inputs': ['bts_data', 'out_dir'],
+        'outputs': ['temporal_delays.csv'],
+        'code': ['enrich'],
+    },
+    'airport_performance': {
+        'title': '6.5: Airport performance metrics',
+        'fn': build_airport_performance,
+        'inputs': ['bts_data', 'airports', 'out_dir'],
+        'outputs': ['airport_performance.csv'],
+        'code': ['aggregates', 'dimensions', 'enrich', 'metrics'],
+    },
+    'reviews_summary': {
+        'title': '7: Processing reviews',
+        'fn': process_reviews,
+        'inputs': ['reviews_data', 'bts_data', 'carrier_mapping', 'out_dir'],
+        'outputs': ['reviews_summary.csv', 'review_carriers.csv'],
+        'code': ['sentiment', 'airline_resolver', 'dimensions'],
     },
-    "top_delay_causes": {
-        "weather": int(bts_data['weather_delay'].sum()),
-        "carrier": int(bts_data['carrier_delay'].sum()),
-        "nas": int(bts_data['nas_delay'].sum()),
-        "late_aircraft": int(bts_data['late_aircraft_delay'].sum()),
-        "security": int(bts_data['security_delay'].sum())
+    'monthly_sentiment': {
+        'title': '7.1: Monthly delay vs sentiment',
+        'fn': build_monthly_sentiment,
+        'inputs': ['bts_data', 'reviews_data', 'out_dir'],
+        'outputs': ['monthly_delay_sentiment.csv'],
+        'code': ['delay_sentiment', 'airline_resolver', 'sentiment', 'dimensions'],
+    },
+    'summary_stats': {
+        'title': '8: Generating summary statistics',
+        'fn': build_summary_stats,
+        'inputs': ['bts_data', 'rankings', 'out_dir', 'pretty_json'],
+        'outputs': json_files('summary_stats.json'),
+        'code': ['rankings', 'writers'],
     },
-    "worst_airports": bts_data.groupby('airport').agg({
-        'avg_delay_per_flight': 'mean'
-    }).nlargest(10, 'avg_delay_per_flight').to_dict()['avg_delay_per_flight'],
-    "best_carriers": carrier_metrics.nsmallest(5, 'avg_delay')[['carrier_full_name', 'avg_delay']].to_dict('records')
 }
 
-with open('/mnt/user-data/outputs/summary_stats.json', 'w') as f:
-    json.dump(summary_stats, f, indent=2)
 
-print("\n" + "=" * 80)
-print("✓ DATA PREPROCESSING COMPLETE!")
-print("=" * 80)
-print("\nGenerated files in /outputs:")
-print("  1. state_summary.json - State-level aggregates")
-print("  2. sunburst_data.json - Hierarchical delay breakdown")
-print("  3. carrier_metrics.csv - Carrier comparison metrics")
-print("  4. temporal_delays.csv - Time series data")
-print("  5. airport_performance.csv - Airport metrics")
-print("  6. reviews_summary.csv - Review analysis")
-print("  7. summary_stats.json - Overall statistics")
-print("\nReady for D3.js visualization!")
-print("=" * 80)
+def data_inputs(data_dir, store_dir):
+    """The stages' data inputs, with the source files and code (steps 1-5) each is built from."""
+    def files(*keys):
+        return [path for key in keys for path in source_files(key, data_dir, store_dir)]
+
+    # The columns load_datasets() reads are part of its code
+    columns = {'bts': BTS_COLUMNS, 'airports': GEO_COLUMNS, 'reviews': REVIEW_COLUMNS}
+
+    return {
+        'bts_data': {
+            'files': files('bts', 'airports'),
+            'code': [load_datasets, columns, map_airports_to_states, map_carrier_names, derive_metrics,
+                     'dimensions', 'enrich', 'metrics', 'ingest', 'schema'],
+        },
+        'reviews_data': {
+            'files': files('reviews'),
+            'code': [load_datasets, columns, map_carrier_names, 'ingest'],
+        },
+        'airports': {
+            'files': files('airports'),
+            'code': [load_datasets, columns, map_airports_to_states, 'dimensions', 'ingest'],
+        },
+    }
+
+
+def load_inputs(data_dir, store_dir):
+    """Steps 1-5: load, check and enrich the data inputs. Returns {name: value}."""
+    print("\n[1/8] Loading datasets...")
+    with measure('load_datasets'):
+        bts_data, geo_data, reviews_data = load_datasets(data_dir, store_dir)
+        count_rows(len(bts_data) + len(geo_data) + len(reviews_data))
+
+    print("\n[2/8] Data Quality Assessment...")
+    with measure('data_quality_report'):
+        data_quality_report(bts_data, geo_data, reviews_data)
+
+    print("\n[3/8] Creating airport-to-state mapping...")
+    with measure('map_airports_to_states', rows_in=len(bts_data)):
+        airports = map_airports_to_states(bts_data, geo_data, store_dir)
 
+    print("\n[4/8] Creating carrier name mappings...")
+    with measure('map_carrier_names', rows_in=len(bts_data) + len(reviews_data)):
+        map_carrier_names(bts_data, reviews_data, CARRIER_MAPPING)
 
+    print("\n[5/8] Calculating derived metrics...")
+    with measure('derive_metrics', rows_in=len(bts_data)):
+        derive_metrics(bts_data)
 
+    print("\n[6-8/8] Generating aggregated datasets, reviews and summary statistics...")
+    return {'bts_data': bts_data, 'reviews_data': reviews_data, 'airports': airports}
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the D3.js visualization datasets.")
+    parser.add_argument('stages', nargs='*', help=f"Stages to build: {', '.join(STAGES)} (default: all)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    parser.add_argument('--out-dir', default=OUTPUT_DIR)
+    parser.add_argument('--cache-dir', default=None, help="Stage cache (default: <store-dir>/stages)")
+    parser.add_argument('--force', action='store_true', help="Rerun the stages even if they are unchanged")
+    parser.add_argument('--list', action='store_true', help="Show which stages would run, then exit")
+    parser.add_argument('--log-dir', default=None, help="Run logs (default: <store-dir>/runs)")
+    parser.add_argument('--profile', choices=PROFILERS, default=None,
+                        help="Also write a profile per stage to <log-dir>/profiles/<run id>/")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="Record peak traced allocations per stage (tracemalloc; slower)")
+    parser.add_argument('--streaming', action='store_true',
+                        help="Aggregate the BTS data chunk by chunk instead of loading it whole")
+    parser.add_argument('--chunksize', type=int, default=CHUNKSIZE,
+                        help=f"Rows per BTS chunk with --streaming (default: {CHUNKSIZE:,})")
+    parser.add_argument('--pretty-json', action='store_true',
+                        help="Indent the JSON outputs (larger files; compact by default)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="Processes for steps 6-8 (default: one per CPU; 1 runs them in order)")
+    args = parser.parse_args()
+
+    unknown = sorted(set(args.stages) - set(STAGES))
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+    if args.streaming and args.stages:
+        parser.error("--streaming always builds every output")
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+    cache_dir = args.cache_dir or os.path.join(store_dir, 'stages')
+    out_dir = args.out_dir
+    os.makedirs(out_dir, exist_ok=True)
+
+    data = data_inputs(args.data_dir, store_dir)
+    params = {'carrier_mapping': CARRIER_MAPPING, 'pretty_json': args.pretty_json}
+
+    if args.list:
+        order, prints, cached = plan_stages(STAGES, data, params, cache_dir, args.stages, args.force)
+        for name in order:
+            print(f"  {name:<20} {prints[name]}  {'unchanged' if name in cached else 'will run'}")
+        return
+
+    log_dir = args.log_dir or os.path.join(store_dir, 'runs')
+    log = RunLog(mode='streaming' if args.streaming else 'stages', stages=args.stages, workers=args.workers)
+    measure_options = {
+        'trace_memory': args.trace_memory,
+        'profiler': args.profile,
+        'profile_dir': os.path.join(log_dir, 'profiles', log.run_id),
+    }
+
+    print("=" * 80)
+    print("AIRPORT DELAY ANALYSIS - DATA PREPROCESSING")
+    print("=" * 80)
+
+    if args.streaming:
+        with measure('load_inputs', **measure_options) as record:
+            print("\n[1/8] Loading datasets...")
+            _, geo_data, reviews_data = load_datasets(args.data_dir, store_dir, include_bts=False)
+
+            print("\n[2/8] Data Quality Assessment...")
+            data_quality_report(None, geo_data, reviews_data)
+        log.add(record)
+
+        print("\n[3-6/8] Streaming BTS aggregation...")
+        with measure('stream_bts_outputs', **measure_options) as record:
+            airports = map_airports_to_states(None, geo_data, store_dir)
+            map_carrier_names(None, reviews_data)
+            bts_months = stream_bts_outputs(args.data_dir, store_dir, airports, out_dir,
+                                            args.chunksize, args.pretty_json)
+        log.add(record)
+
+        print("\n[7/8] Processing reviews...")
+        with measure('reviews_summary', rows_in=len(reviews_data), **measure_options) as record:
+            process_reviews(reviews_data, bts_months, CARRIER_MAPPING, out_dir)
+        log.add(record)
+
+        print("\n[7.1/8] Monthly delay vs sentiment...")
+        with measure('monthly_sentiment', rows_in=len(reviews_data), **measure_options) as record:
+            write_monthly_sentiment(bts_months, reviews_data, out_dir)
+        log.add(record)
+
+        print("\n[8/8] Summary statistics written with the BTS outputs")
+    else:
+        # Steps 1-5 only run if some stage has to
+        print("\nChecking stages for changes...")
+        run_stages(
+            STAGES,
+            data=data,
+            load=lambda: load_inputs(args.data_dir, store_dir),
+            params=params,
+            out_dir=out_dir,
+            cache_dir=cache_dir,
+            only=args.stages,
+            force=args.force,
+            workers=args.workers,
+            log=log,
+            measure_options=measure_options,
+        )
 
+    print("\nStage timings:")
+    print(log.summary())
+    print(f"  Run log: {log.write(log_dir)}")
+
+    print("\n" + "=" * 80)
+    print("✓ DATA PREPROCESSING COMPLETE!")
+    print("=" * 80)
+    print(f"\nGenerated files in {out_dir}:")
+    print("  1. state_summary.json - State-level aggregates")
+    print("  2. sunburst_data.json - Hierarchical delay breakdown")
+    print("  3. carrier_metrics.csv - Carrier comparison metrics")
+    print("  4. temporal_delays.csv - Time series data")
+    print("  5. airport_performance.csv - Airport metrics")
+    print("  6. reviews_summary.csv - Review analysis")
+    print("  7. summary_stats.json - Overall statistics")
+    print("  8. monthly_delay_sentiment.csv - Monthly delay vs sentiment")
+    print("  9. review_carriers.csv - Review airline to carrier matches")
+    print("  10. rankings.json - Top/bottom airports, carriers and states per metric")
+    print("\nReady for D3.js visualization!")
+    print("=" * 80)
+
+
+if __name__ == "__main__":
+    main()
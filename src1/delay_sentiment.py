@@ -0,0 +1,143 @@
+"""
+Monthly Delay vs Sentiment
+==========================
+The (carrier, month) fact table behind the Monthlydelayvssentiment chart: BTS
+arrivals and delayed arrivals next to the Skytrax reviews of the same carrier
+in the same month, so the browser loads a few hundred rows instead of the raw
+delay and review CSVs.
+
+    year_month, year, month    the period; rows are sorted by period, then carrier
+    carrier, carrier_name      BTS carrier code and BTS's own carrier name
+    arr_flights, arr_del15     summed over the carrier's airports
+    delay_rate                 arr_del15 / arr_flights * 100
+    review_count               reviews of the carrier dated in the month
+    rated_reviews, avg_rating  reviews with a 1-10 rating, and their mean
+    delay_mentions             reviews whose text mentions a delay
+
+Both sides are grouped to (carrier, year, month) and joined with one outer
+merge; months with flights but no reviews (or the other way round) keep their
+row with zero counts. The chart re-aggregates across carriers and years with
+sums and rated_reviews-weighted means.
+
+Only reviews dated in REVIEW_YEARS are counted. Each month also gets an
+ALL_AIRLINES row (no flights) counting every review, matched to a BTS carrier
+or not, which the chart's rating line uses when no carrier is selected.
+
+Usage:
+    from airline_resolver import AirlineResolver
+    from delay_sentiment import carrier_months, monthly_delay_sentiment, review_months
+    months = carrier_months(bts_data)
+    resolver = AirlineResolver.from_carriers(months)
+    monthly = monthly_delay_sentiment(months, review_months(reviews_data, resolver),
+                                      all_review_months(reviews_data))
+"""
+
+import pandas as pd
+
+from airline_resolver import AirlineResolver
+from dimensions import carrier_dimension
+from sentiment import mentions_delay
+
+MONTH_KEYS = ['carrier', 'year', 'month']
+DELAY_MEASURES = ['arr_flights', 'arr_del15']
+REVIEW_MEASURES = ['review_count', 'rated_reviews', 'delay_mentions']
+
+# The years the dashboard covers; reviews dated outside them are not counted
+REVIEW_YEARS = (2015, 2025)
+
+# Carrier code and name of the rows counting every review
+ALL_AIRLINES = 'ALL'
+ALL_AIRLINES_NAME = 'All airlines'
+
+OUTPUT_COLUMNS = [
+    'year_month', 'year', 'month', 'carrier', 'carrier_name',
+    'arr_flights', 'arr_del15', 'delay_rate',
+    'review_count', 'rated_reviews', 'avg_rating', 'delay_mentions',
+]
+
+
+def _month_keys(frame):
+    # Plain codes and int64 periods, so both sides (and chunks) merge cleanly
+    return frame.astype({'carrier': object, 'year': 'int64', 'month': 'int64'})
+
+
+def carrier_months(bts_data):
+    """(carrier, year, month) sums of arrivals and delayed arrivals, with BTS's carrier name."""
+    grouped = bts_data.groupby(MONTH_KEYS, observed=True)
+    months = grouped[DELAY_MEASURES].sum()
+    months['carrier_name'] = grouped['carrier_name'].first().astype(object)
+    return _month_keys(months.reset_index())
+
+
+def combine_carrier_months(parts):
+    """Add up the carrier_months() of several chunks of BTS rows."""
+    stacked = pd.concat(parts, ignore_index=True)
+    grouped = stacked.groupby(MONTH_KEYS)
+    months = grouped[DELAY_MEASURES].sum()
+    months['carrier_name'] = grouped['carrier_name'].first()
+    return months.reset_index()
+
+
+def _review_months(reviews_data, carriers, years):
+    """Group reviews (each credited to carriers[i]) dated in years to (carrier, year, month)."""
+    dates = pd.to_datetime(reviews_data['date'], errors='coerce')
+    rating = pd.to_numeric(reviews_data['overall_rating'], errors='coerce')
+    reviews = pd.DataFrame({
+        'carrier': carriers,
+        'year': dates.dt.year.to_numpy(),
+        'month': dates.dt.month.to_numpy(),
+        'rating': rating.where((rating > 0) & (rating <= 10)).to_numpy(),
+        'mentions_delay': mentions_delay(reviews_data['content']).to_numpy(),
+    }).dropna(subset=MONTH_KEYS)
+    reviews = reviews[reviews['year'].between(*years)]
+
+    months = reviews.groupby(MONTH_KEYS).agg(
+        review_count=('mentions_delay', 'size'),
+        rated_reviews=('rating', 'count'),
+        avg_rating=('rating', 'mean'),
+        delay_mentions=('mentions_delay', 'sum'),
+    )
+    return _month_keys(months.reset_index())
+
+
+def review_months(reviews_data, resolver=None, years=REVIEW_YEARS):
+    """
+    (carrier, year, month) review counts, mean 1-10 rating and delay mentions
+    of the reviews the resolver matches to a carrier (see airline_resolver.py).
+    """
+    resolver = resolver or AirlineResolver.from_carriers()
+    carriers = resolver.resolve(reviews_data['airline_name'])['carrier'].to_numpy()
+    return _review_months(reviews_data, carriers, years)
+
+
+def all_review_months(reviews_data, years=REVIEW_YEARS):
+    """review_months() of every review, under the ALL_AIRLINES carrier."""
+    return _review_months(reviews_data, ALL_AIRLINES, years)
+
+
+def monthly_delay_sentiment(carrier_months, review_months, all_review_months=None):
+    """
+    Join the two (carrier, year, month) tables into the fact table
+    (OUTPUT_COLUMNS), with the all_review_months() rows if given.
+    """
+    monthly = carrier_months.merge(review_months, on=MONTH_KEYS, how='outer')
+
+    # Review-only rows take the carrier's BTS name from its other months, or
+    # the readable name when the carrier has no flights at all
+    names = monthly.groupby('carrier')['carrier_name'].transform('first')
+    fallback = carrier_dimension().lookup(monthly['carrier'], 'name', default=monthly['carrier'])
+    monthly['carrier_name'] = names.fillna(fallback)
+
+    monthly[DELAY_MEASURES + REVIEW_MEASURES] = monthly[DELAY_MEASURES + REVIEW_MEASURES].fillna(0)
+    monthly[REVIEW_MEASURES] = monthly[REVIEW_MEASURES].astype('int64')
+    flights = monthly['arr_flights'].where(monthly['arr_flights'] > 0)
+    monthly['delay_rate'] = monthly['arr_del15'] / flights * 100
+
+    if all_review_months is not None:
+        everyone = all_review_months.assign(carrier_name=ALL_AIRLINES_NAME)
+        everyone[DELAY_MEASURES] = 0.0
+        monthly = pd.concat([monthly, everyone], ignore_index=True)
+
+    monthly['year_month'] = monthly['year'].astype(str) + '-' + monthly['month'].astype(str).str.zfill(2)
+    monthly = monthly.sort_values(['year', 'month', 'carrier'], kind='stable')
+    return monthly[OUTPUT_COLUMNS].reset_index(drop=True)
@@ -0,0 +1,242 @@
+"""
+Cleaned Dimension Tables
+========================
+The airport, carrier and review-airline lookups every script needs, cleaned
+once and kept as small indexed tables:
+
+    airports - one row per IATA code (stripped, upper-cased; the last row wins
+               for duplicates): name, municipality, iso_country, state (from
+               iso_region 'US-XX'), latitude_deg, longitude_deg, elevation_ft, type
+    carriers - BTS carrier code -> readable name and Skytrax review slug
+    airlines - Skytrax review slug ('delta-air-lines') -> carrier code and name
+
+Lookups are vectorized: each distinct key is resolved against the index once
+(for categorical keys, once per category) and the attribute is gathered with a
+single take, instead of a Python lambda per row.
+
+Saved as <store_dir>/dimensions/<name>.parquet. load_dimensions() reuses the
+saved airports table while it is newer than the airports source, and rebuilds
+(and re-saves) it otherwise.
+
+Usage:
+    from dimensions import load_dimensions
+    airports = load_dimensions(data_dir, store_dir)['airports']
+    bts_data['state'] = airports.lookup(bts_data['airport'], 'state')
+    names = airports.lookup(codes, 'name', default=codes)     # unknown codes keep the code
+    geo = airports.join(codes, {'lat': 'latitude_deg', 'lon': 'longitude_deg'})
+
+    python dimensions.py --rebuild    # (re)build and save every table
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import load_dataset, source_files
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+# Common US carriers in BTS data
+CARRIER_MAPPING = {
+    'AA': 'American Airlines',
+    'AS': 'Alaska Airlines',
+    'B6': 'JetBlue Airways',
+    'DL': 'Delta Air Lines',
+    'F9': 'Frontier Airlines',
+    'G4': 'Allegiant Air',
+    'HA': 'Hawaiian Airlines',
+    'NK': 'Spirit Airlines',
+    'UA': 'United Airlines',
+    'WN': 'Southwest Airlines',
+    'YV': 'Mesa Airlines',
+    'YX': 'Republic Airline',
+    'G7': 'GoJet Airlines',
+}
+
+# Skytrax airline_name slugs of the US carriers
+REVIEW_AIRLINES = {
+    'american-airlines': 'AA',
+    'delta-air-lines': 'DL',
+    'united-airlines': 'UA',
+    'southwest-airlines': 'WN',
+    'alaska-airlines': 'AS',
+    'jetblue-airways': 'B6',
+    'spirit-airlines': 'NK',
+    'frontier-airlines': 'F9',
+    'allegiant-air': 'G4',
+    'hawaiian-airlines': 'HA',
+}
+
+AIRPORT_COLUMNS = [
+    'iata_code', 'name', 'municipality', 'iso_country', 'iso_region',
+    'latitude_deg', 'longitude_deg', 'elevation_ft', 'type',
+]
+
+DIMENSION_NAMES = ['airports', 'carriers', 'airlines']
+
+
+class Dimension:
+    """A lookup table with a unique code index and vectorized code -> attribute lookups."""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __contains__(self, code):
+        return code in self.table.index
+
+    def positions(self, keys):
+        """Row position of each key in the table, -1 where it is missing."""
+        keys = keys if isinstance(keys, pd.Series) else pd.Series(keys)
+        if isinstance(keys.dtype, pd.CategoricalDtype):
+            # Resolve each category once, then expand by the codes
+            found = self.table.index.get_indexer(keys.cat.categories)
+            codes = keys.cat.codes.to_numpy()
+            return np.where(codes >= 0, found[codes], -1)
+        return self.table.index.get_indexer(keys)
+
+    def _take(self, positions, attribute, default=None):
+        values = pd.api.extensions.take(self.table[attribute].to_numpy(), positions, allow_fill=True)
+        if default is not None:
+            default = default.to_numpy(dtype=object) if isinstance(default, pd.Series) else default
+            values = np.where(positions < 0, default, values)
+        return values
+
+    def lookup(self, keys, attribute, default=None):
+        """
+        The attribute for each key (NaN for keys not in the table, or `default`:
+        a scalar or an array aligned with the keys). Returns a Series on the
+        keys' index.
+        """
+        index = keys.index if isinstance(keys, pd.Series) else None
+        return pd.Series(self._take(self.positions(keys), attribute, default), index=index, name=attribute)
+
+    def join(self, keys, columns, defaults=None):
+        """
+        Several attributes at once ({output column: attribute}) as a DataFrame on
+        the keys' index, resolving the keys only once. `defaults` gives the fill
+        for unknown keys per output column, as in lookup().
+        """
+        positions = self.positions(keys)
+        defaults = defaults or {}
+        index = keys.index if isinstance(keys, pd.Series) else None
+        return pd.DataFrame({
+            column: self._take(positions, attribute, defaults.get(column))
+            for column, attribute in columns.items()
+        }, index=index)
+
+    def subset(self, mask):
+        """The dimension restricted to the rows where mask holds."""
+        return Dimension(self.table[mask])
+
+    def to_dict(self, attribute):
+        return self.table[attribute].to_dict()
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.table.to_parquet(path)
+
+    @classmethod
+    def load(cls, path):
+        return cls(pd.read_parquet(path))
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def airport_dimension(geo_data):
+    """The airports table from airports_geographic.csv rows (any subset of AIRPORT_COLUMNS)."""
+    geo_data = geo_data[[col for col in AIRPORT_COLUMNS if col in geo_data.columns]]
+    codes = geo_data['iata_code'].astype('string').str.strip().str.upper()
+    geo_data = geo_data.assign(code=codes)[codes.notna() & (codes != '')]
+
+    table = geo_data.drop(columns=['iata_code']).drop_duplicates('code', keep='last').set_index('code')
+    table['state'] = table['iso_region'].astype(object).str.replace('US-', '')
+    return Dimension(table.drop(columns=['iso_region']))
+
+
+def carrier_dimension(carrier_mapping=CARRIER_MAPPING, review_airlines=REVIEW_AIRLINES):
+    slugs = {code: slug for slug, code in review_airlines.items()}
+    table = pd.DataFrame({
+        'name': pd.Series(carrier_mapping, dtype=object),
+        'review_airline': pd.Series({code: slugs.get(code) for code in carrier_mapping}, dtype=object),
+    })
+    table.index.name = 'code'
+    return Dimension(table)
+
+
+def airline_dimension(review_airlines=REVIEW_AIRLINES, carrier_mapping=CARRIER_MAPPING):
+    table = pd.DataFrame({
+        'carrier': pd.Series(review_airlines, dtype=object),
+        'name': pd.Series({slug: carrier_mapping.get(code) for slug, code in review_airlines.items()},
+                          dtype=object),
+    })
+    table.index.name = 'airline_name'
+    return Dimension(table)
+
+
+# ============================================================================
+# SAVE / LOAD
+# ============================================================================
+
+def dimension_path(name, store_dir=STORE_DIR):
+    return os.path.join(store_dir, 'dimensions', f'{name}.parquet')
+
+
+def is_fresh(path, sources):
+    """True if path exists and is no older than every source file."""
+    if not os.path.exists(path):
+        return False
+    saved = os.path.getmtime(path)
+    return all(os.path.exists(source) and os.path.getmtime(source) <= saved for source in sources)
+
+
+def load_dimensions(data_dir=DATA_DIR, store_dir=STORE_DIR, rebuild=False):
+    """
+    {name: Dimension}. The airports table is read from the store while it is
+    newer than the airports source; otherwise every table is rebuilt and saved.
+    """
+    dimensions = {'carriers': carrier_dimension(), 'airlines': airline_dimension()}
+
+    path = dimension_path('airports', store_dir)
+    if not rebuild and is_fresh(path, source_files('airports', data_dir, store_dir)):
+        dimensions['airports'] = Dimension.load(path)
+        return dimensions
+
+    geo_data = load_dataset('airports', columns=AIRPORT_COLUMNS, raw_dir=data_dir, store_dir=store_dir)
+    dimensions['airports'] = airport_dimension(geo_data)
+    for name, dimension in dimensions.items():
+        dimension.save(dimension_path(name, store_dir))
+    return dimensions
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the cleaned airport and carrier dimension tables.")
+    parser.add_argument('--rebuild', action='store_true', help="Rebuild even if the saved tables are current")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+
+    start = time.time()
+    dimensions = load_dimensions(args.data_dir, store_dir, rebuild=args.rebuild)
+    for name in DIMENSION_NAMES:
+        print(f"  ✓ {name:<10} {len(dimensions[name]):>8,} rows  {dimension_path(name, store_dir)}")
+    print(f"\n✓ Done in {time.time() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
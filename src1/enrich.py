@@ -0,0 +1,59 @@
+"""
+BTS Enrichment Helpers
+======================
+Steps 3-4 of dataProcess.py as reusable functions (airport -> state lookups
+and full carrier names), plus the period label the monthly outputs are grouped
+by. Shared by the full pipeline and the incremental / streaming aggregation
+paths so every path enriches rows the same way. The derived delay ratios are
+not added per row; see metrics.py.
+"""
+
+from dimensions import CARRIER_MAPPING
+
+DELAY_COLS = ['carrier_delay', 'weather_delay', 'nas_delay', 'security_delay', 'late_aircraft_delay']
+
+
+def add_state(bts_data, airports):
+    """Add the airport's state (from the airports dimension) to each BTS row."""
+    bts_data['state'] = airports.lookup(bts_data['airport'], 'state')
+    return bts_data
+
+
+AIRPORT_DETAILS = {'airport_name': 'name', 'latitude': 'latitude_deg', 'longitude': 'longitude_deg'}
+
+
+def add_airport_details(frame, airports):
+    """Add airport_name (the code itself if unknown), latitude and longitude for frame['airport']."""
+    details = airports.join(frame['airport'], AIRPORT_DETAILS, defaults={'airport_name': frame['airport']})
+    for column in details.columns:
+        frame[column] = details[column]
+    return frame
+
+
+def add_carrier_full_name(bts_data, carrier_mapping=CARRIER_MAPPING):
+    """Add a readable carrier name, falling back to BTS's own carrier_name."""
+    bts_data['carrier_full_name'] = (
+        bts_data['carrier'].astype(object).map(carrier_mapping)
+        .fillna(bts_data['carrier_name'].astype(object))
+    )
+    return bts_data
+
+
+def year_month_label(bts_data):
+    """The 'YYYY-MM' period label of each row."""
+    label = bts_data['year'].astype(str) + '-' + bts_data['month'].astype(str).str.zfill(2)
+    return label.rename('year_month')
+
+
+def add_year_month(bts_data):
+    """Add a 'YYYY-MM' period label."""
+    bts_data['year_month'] = year_month_label(bts_data)
+    return bts_data
+
+
+def enrich_bts(bts_data, airports, carrier_mapping=CARRIER_MAPPING):
+    """Apply every per-row enrichment (dataProcess.py steps 3-4, plus the period label) in one call."""
+    add_state(bts_data, airports)
+    add_carrier_full_name(bts_data, carrier_mapping)
+    add_year_month(bts_data)
+    return bts_data
@@ -0,0 +1,82 @@
+"""
+Incremental BTS Refresh
+=======================
+Keeps additive partial aggregates (see aggregates.py) for every (year, month)
+already processed. When BTS publishes new months, only the new rows are read
+and enriched; their partials replace any earlier copy of the same months, and
+the state, sunburst, carrier, temporal, airport and summary outputs are
+re-derived from the merged partials without rescanning the old history.
+
+Usage:
+    # One-off: build partials from the full history (Parquet store or CSV)
+    python incremental.py --rebuild
+
+    # Monthly: merge a newly downloaded BTS extract
+    python incremental.py new_months.csv [more.csv ...]
+"""
+
+import argparse
+import os
+import time
+
+from aggregates import (
+    finalize, load_partials, partial_aggregates, partial_months, replace_months,
+    save_partials, stream_partials, write_outputs,
+)
+from dataProcess import BTS_COLUMNS
+from dimensions import load_dimensions
+from enrich import enrich_bts
+from ingest import iter_dataset
+from schema import load_bts
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+PARTIALS_DIR = os.path.join(STORE_DIR, 'partials')
+OUTPUT_DIR = '/mnt/user-data/outputs'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge new BTS months into the saved partial aggregates.")
+    parser.add_argument('new_files', nargs='*', help="CSV extracts with the newly published months")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Rebuild the partials from the full BTS history")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    parser.add_argument('--partials-dir', default=None, help="Default: <store-dir>/partials")
+    parser.add_argument('--out-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+    partials_dir = args.partials_dir or os.path.join(store_dir, 'partials')
+
+    start = time.time()
+    airports = load_dimensions(args.data_dir, store_dir)['airports']
+
+    partials = None if args.rebuild else load_partials(partials_dir)
+
+    if partials is None:
+        if args.new_files and not args.rebuild:
+            parser.error(f"no partials in {partials_dir}; run with --rebuild first")
+        print("Building partials from the full BTS history...")
+        chunks = iter_dataset('bts', columns=BTS_COLUMNS, raw_dir=args.data_dir, store_dir=store_dir)
+        partials = stream_partials(chunks, airports)
+        print(f"  ✓ {int(partials['airport']['n_rows'].sum()):,} rows -> {len(partial_months(partials))} months")
+
+    for path in args.new_files:
+        new_rows = enrich_bts(load_bts(path, columns=BTS_COLUMNS), airports)
+        new_partials = partial_aggregates(new_rows)
+        partials = replace_months(partials, new_partials)
+        print(f"  ✓ Merged {path}: {len(new_rows):,} rows, months {', '.join(partial_months(new_partials))}")
+
+    save_partials(partials, partials_dir)
+    write_outputs(finalize(partials, airports), args.out_dir)
+
+    months = partial_months(partials)
+    print(f"\n✓ Outputs refreshed for {months[0]} .. {months[-1]} in {time.time() - start:.1f} s")
+    print(f"  Partials: {partials_dir}")
+    print(f"  Outputs:  {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""
+Raw CSV -> Parquet Ingest
+=========================
+Converts each raw CSV (BTS delays, airports, weather, Skytrax reviews) once into
+a typed Parquet dataset, partitioned where it pays off (BTS by year, weather by
+station). Downstream scripts then read only the columns and partitions they need
+instead of re-parsing the full CSVs on every run.
+
+Store layout:
+    <store_dir>/bts/year=2019/part-0.parquet
+    <store_dir>/airports/part-0.parquet
+    <store_dir>/weather/station=ATL/part-0.parquet
+    <store_dir>/reviews/part-0.parquet
+
+The store defaults to <raw-dir>/store, where dataProcess.py and the other
+scripts look for it (<data-dir>/store).
+
+Usage:
+    python ingest.py --raw-dir data/raw [--store-dir data/raw/store] [bts weather ...]
+
+    from ingest import load_dataset
+    bts = load_dataset('bts', columns=['year', 'airport', 'arr_delay'], years=[2019, 2020])
+
+Requires pyarrow.
+"""
+
+import argparse
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from schema import BTS_DTYPES, FLIGHTS_DTYPES
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RAW_DIR = os.path.join(PROJECT_DIR, 'data', 'raw')
+STORE_DIR = os.path.join(RAW_DIR, 'store')
+
+# Inches stored for a trace of precipitation, reported as 'T' (as weather_fetch.py)
+TRACE_AMOUNT = 0.0001
+
+# Raw sources: CSV filename, read_csv options and partition columns
+SOURCES = {
+    'bts': {
+        'filename': 'Airline_Delay_Cause.csv',
+        'dtype': BTS_DTYPES,
+        'partition_cols': ['year'],
+    },
+    'flights': {
+        # Flight-level on-time data used by files/JOIN_EXAMPLES.py
+        'filename': 'bts_airline_delays.csv',
+        'dtype': FLIGHTS_DTYPES,
+        'parse_dates': ['FlightDate'],
+        'partition_cols': [],
+    },
+    'airports': {
+        'filename': 'airports_geographic.csv',
+        'dtype': {
+            'type': 'category',
+            'iso_country': 'category',
+            'iso_region': 'category',
+            'iata_code': 'string',
+        },
+        'partition_cols': [],
+    },
+    'weather': {
+        'filename': 'weather_all_airports.csv',
+        'dtype': {'station': 'category'},
+        'parse_dates': ['valid'],
+        'na_values': ['M'],
+        'trace_cols': ['p01i'],
+        'partition_cols': ['station'],
+    },
+    'reviews': {
+        'filename': 'skytrax_airline_reviews.csv',
+        'dtype': {'airline_name': 'category'},
+        'partition_cols': [],
+    },
+}
+
+
+def _require_pyarrow():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ImportError("The Parquet store needs pyarrow: pip install pyarrow") from e
+    return pq
+
+
+def dataset_path(key, store_dir=STORE_DIR):
+    """Return the directory holding the Parquet dataset for a source."""
+    return os.path.join(store_dir, key)
+
+
+def has_dataset(key, store_dir=STORE_DIR):
+    """True if the source has already been ingested into the store."""
+    return os.path.isdir(dataset_path(key, store_dir))
+
+
+def _store_dir(raw_dir, store_dir):
+    # The store of a raw directory is <raw_dir>/store unless given
+    return store_dir if store_dir is not None else os.path.join(raw_dir, 'store')
+
+
+def _in_order(df, columns):
+    # read_csv(usecols=...) keeps file order and Parquet keeps the requested
+    # order; return the requested order from either
+    return df if columns is None else df[list(columns)]
+
+
+# ============================================================================
+# INGEST
+# ============================================================================
+
+def _csv_options(key, columns=None):
+    """read_csv options for a source, restricted to the given columns."""
+    source = SOURCES[key]
+    options = {k: source[k] for k in ('dtype', 'parse_dates', 'na_values') if k in source}
+    if columns is not None:
+        options['usecols'] = columns
+        options['dtype'] = {c: t for c, t in source['dtype'].items() if c in columns}
+        options['parse_dates'] = [c for c in source.get('parse_dates', []) if c in columns]
+    return options
+
+
+def _fill_traces(key, df):
+    # 'T' (a trace) counts as TRACE_AMOUNT, so precipitation sums include it
+    for col in SOURCES[key].get('trace_cols', []):
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col].replace('T', str(TRACE_AMOUNT))).astype('float64')
+    return df
+
+
+def read_raw(key, raw_dir=RAW_DIR, columns=None):
+    """Read a raw CSV with the source's dtypes."""
+    path = os.path.join(raw_dir, SOURCES[key]['filename'])
+    return _fill_traces(key, pd.read_csv(path, **_csv_options(key, columns)))
+
+
+def ingest(key, raw_dir=RAW_DIR, store_dir=None):
+    """Convert one raw CSV into its Parquet dataset, replacing any previous copy."""
+    pq = _require_pyarrow()
+    import pyarrow as pa
+
+    store_dir = _store_dir(raw_dir, store_dir)
+
+    df = read_raw(key, raw_dir)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    path = dataset_path(key, store_dir)
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+
+    partition_cols = SOURCES[key]['partition_cols']
+    if partition_cols:
+        pq.write_to_dataset(table, path, partition_cols=partition_cols,
+                            basename_template='part-{i}.parquet')
+    else:
+        os.makedirs(path)
+        pq.write_table(table, os.path.join(path, 'part-0.parquet'))
+
+    return len(df)
+
+
+# ============================================================================
+# READ
+# ============================================================================
+
+def _restore_partition_dtypes(key, df):
+    dtype = SOURCES[key]['dtype']
+    for col in SOURCES[key]['partition_cols']:
+        if col in df.columns and col in dtype and dtype[col] != 'category':
+            df[col] = df[col].astype(dtype[col])
+    return df
+
+
+def read_dataset(key, columns=None, filters=None, store_dir=STORE_DIR):
+    """
+    Read a Parquet dataset, optionally restricted to some columns and to the
+    partitions matching pyarrow-style filters, e.g. [('year', 'in', [2019, 2020])].
+    """
+    pq = _require_pyarrow()
+    table = pq.read_table(dataset_path(key, store_dir), columns=columns, filters=filters)
+    # Partition keys come back as dictionary-encoded columns; restore the raw dtype
+    return _restore_partition_dtypes(key, table.to_pandas())
+
+
+def read_bts(columns=None, years=None, store_dir=STORE_DIR):
+    """Read BTS delay records, only touching the requested year partitions."""
+    filters = [('year', 'in', list(years))] if years is not None else None
+    return read_dataset('bts', columns=columns, filters=filters, store_dir=store_dir)
+
+
+def iter_dataset(key, columns=None, chunksize=500_000, raw_dir=RAW_DIR, store_dir=None):
+    """
+    Yield a source as DataFrames of at most `chunksize` rows, from the Parquet
+    store if it has been ingested, otherwise from the raw CSV. Only one chunk is
+    held in memory at a time.
+    """
+    store_dir = _store_dir(raw_dir, store_dir)
+    if has_dataset(key, store_dir):
+        _require_pyarrow()
+        import pyarrow.dataset as ds
+
+        dataset = ds.dataset(dataset_path(key, store_dir), format='parquet', partitioning='hive')
+        for batch in dataset.to_batches(columns=columns, batch_size=chunksize):
+            if batch.num_rows:
+                yield _in_order(_restore_partition_dtypes(key, batch.to_pandas()), columns)
+        return
+
+    path = os.path.join(raw_dir, SOURCES[key]['filename'])
+    with pd.read_csv(path, chunksize=chunksize, **_csv_options(key, columns)) as reader:
+        for chunk in reader:
+            yield _in_order(_fill_traces(key, chunk), columns)
+
+
+def source_files(key, raw_dir=RAW_DIR, store_dir=None):
+    """The files load_dataset() reads for a source: its Parquet parts, or the raw CSV."""
+    store_dir = _store_dir(raw_dir, store_dir)
+    if has_dataset(key, store_dir):
+        return sorted(
+            os.path.join(root, name)
+            for root, _, names in os.walk(dataset_path(key, store_dir))
+            for name in names if name.endswith('.parquet')
+        )
+    return [os.path.join(raw_dir, SOURCES[key]['filename'])]
+
+
+def load_dataset(key, columns=None, years=None, raw_dir=RAW_DIR, store_dir=None):
+    """
+    Load a source from the Parquet store if it has been ingested, otherwise fall
+    back to parsing the raw CSV (with the same dtypes). Columns come back in the
+    order requested, from either.
+    """
+    store_dir = _store_dir(raw_dir, store_dir)
+    if has_dataset(key, store_dir):
+        if key == 'bts':
+            return _in_order(read_bts(columns=columns, years=years, store_dir=store_dir), columns)
+        return _in_order(read_dataset(key, columns=columns, store_dir=store_dir), columns)
+
+    df = _in_order(read_raw(key, raw_dir, columns=columns), columns)
+    if years is not None:
+        df = df[df['year'].isin(list(years))].reset_index(drop=True)
+    return df
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert raw CSVs into the Parquet store.")
+    parser.add_argument('sources', nargs='*',
+                        help=f"Sources to ingest: {', '.join(SOURCES)} (default: all whose CSV exists)")
+    parser.add_argument('--raw-dir', default=RAW_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <raw-dir>/store)")
+    args = parser.parse_args()
+
+    store_dir = _store_dir(args.raw_dir, args.store_dir)
+
+    unknown = sorted(set(args.sources) - set(SOURCES))
+    if unknown:
+        parser.error(f"unknown source(s): {', '.join(unknown)}")
+
+    keys = args.sources or [
+        key for key, source in SOURCES.items()
+        if os.path.exists(os.path.join(args.raw_dir, source['filename']))
+    ]
+
+    print(f"Ingesting into {store_dir}")
+    for key in keys:
+        start = time.time()
+        rows = ingest(key, args.raw_dir, store_dir)
+        print(f"  ✓ {key:<10} {rows:>12,} rows  ({time.time() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
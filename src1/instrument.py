@@ -0,0 +1,250 @@
+"""
+Pipeline Instrumentation
+========================
+Measures wall time, CPU time, peak memory and row counts for pipeline stages
+and the steps inside them, and writes them to a run log so runs can be
+compared after each data drop.
+
+    with measure('sunburst_data', rows_in=len(bts_data)) as record:
+        with measure('tree'):           # nested steps land in record['steps']
+            ...
+        count_rows(len(tree))           # rows_out of the innermost open measurement
+
+Each record holds:
+    wall_s, cpu_s          elapsed and process CPU seconds
+    rss_peak_mb            the process's peak resident memory after the step
+    rss_growth_mb          how far the step raised that peak (0 if an earlier
+                           step had already reached it)
+    alloc_peak_mb          peak traced allocation during the step, with
+                           trace_memory=True (tracemalloc; slows allocation-heavy code)
+    rows_in, rows_out
+
+Run logs (see RunLog.write):
+    <log_dir>/run-<run_id>.json     every record of one run, steps nested
+    <log_dir>/runs.csv              one row per stage and step, appended per run
+
+Profiles: pass profiler='cprofile' (or 'pyinstrument' if it is installed) to
+measure() to also write <profile_dir>/<name>.prof (or .html).
+
+Top-level scripts such as files/JOIN_EXAMPLES.py use Sections instead:
+
+    sections = Sections()
+    sections.section('join_geo')
+    ...
+    sections.section('join_weather')    # closes join_geo
+    ...
+    sections.end()                      # records are in sections.log
+"""
+
+import cProfile
+import csv
+import json
+import os
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+PROFILERS = ['cprofile', 'pyinstrument']
+
+CSV_FIELDS = [
+    'run_id', 'stage', 'step', 'status', 'wall_s', 'cpu_s',
+    'rss_peak_mb', 'rss_growth_mb', 'alloc_peak_mb', 'rows_in', 'rows_out',
+]
+
+# Measurements currently open in this process, innermost last
+_OPEN = []
+
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _pyinstrument():
+    try:
+        import pyinstrument
+    except ImportError:
+        return None
+    return pyinstrument
+
+
+@contextmanager
+def _profile(name, profiler, profile_dir):
+    if profiler is None:
+        yield
+        return
+    os.makedirs(profile_dir, exist_ok=True)
+
+    if profiler == 'pyinstrument':
+        pyinstrument = _pyinstrument()
+        if pyinstrument is None:
+            raise ImportError("--profile pyinstrument needs pyinstrument: pip install pyinstrument")
+        session = pyinstrument.Profiler()
+        session.start()
+        try:
+            yield
+        finally:
+            session.stop()
+            with open(os.path.join(profile_dir, f'{name}.html'), 'w') as f:
+                f.write(session.output_html())
+    else:
+        session = cProfile.Profile()
+        session.enable()
+        try:
+            yield
+        finally:
+            session.disable()
+            session.dump_stats(os.path.join(profile_dir, f'{name}.prof'))
+
+
+@contextmanager
+def measure(name, rows_in=None, trace_memory=False, profiler=None, profile_dir='profiles'):
+    """
+    Time and measure a block. Yields its record, which is complete on exit; a
+    measurement opened inside another one is added to the outer record's steps.
+    """
+    record = {'name': name, 'rows_in': rows_in, 'rows_out': None, 'steps': []}
+    parent = _OPEN[-1] if _OPEN else None
+
+    tracing = trace_memory and not tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.start()
+    elif tracemalloc.is_tracing():
+        # Nested in a traced measurement: remember the outer peak so far, then
+        # restart the peak for this step
+        if parent is not None:
+            parent['_alloc_peak'] = max(parent.get('_alloc_peak', 0), tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    rss_before = peak_rss_mb()
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    _OPEN.append(record)
+    try:
+        with _profile(name, profiler, profile_dir):
+            yield record
+    finally:
+        _OPEN.pop()
+        record['wall_s'] = round(time.perf_counter() - wall_start, 4)
+        record['cpu_s'] = round(time.process_time() - cpu_start, 4)
+
+        rss_after = peak_rss_mb()
+        record['rss_peak_mb'] = round(rss_after, 1) if rss_after is not None else None
+        record['rss_growth_mb'] = round(rss_after - rss_before, 1) if rss_after is not None else None
+
+        record['alloc_peak_mb'] = None
+        if tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], record.pop('_alloc_peak', 0))
+            record['alloc_peak_mb'] = round(peak / (1024 * 1024), 1)
+        if tracing:
+            tracemalloc.stop()
+
+        if parent is not None:
+            parent['steps'].append(record)
+
+
+def count_rows(rows_out):
+    """Set rows_out on the innermost open measurement (no-op outside one)."""
+    if _OPEN:
+        _OPEN[-1]['rows_out'] = int(rows_out)
+
+
+class RunLog:
+    """Collects the stage records of one pipeline run and writes them out."""
+
+    def __init__(self, run_id=None, **meta):
+        self.run_id = run_id or datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+        self.meta = meta
+        self.stages = []
+
+    def add(self, record, status='ran'):
+        self.stages.append({**record, 'status': status})
+
+    def skipped(self, name):
+        self.stages.append({'name': name, 'status': 'cached', 'steps': []})
+
+    def rows(self):
+        """Flat CSV rows: one per stage, then one per nested step ('stage/step')."""
+        rows = []
+
+        def add(record, stage, step, status):
+            rows.append({
+                'run_id': self.run_id, 'stage': stage, 'step': step, 'status': status,
+                **{field: record.get(field) for field in CSV_FIELDS[4:]},
+            })
+            for child in record['steps']:
+                add(child, stage, f"{step}/{child['name']}" if step else child['name'], status)
+
+        for record in self.stages:
+            add(record, record['name'], '', record['status'])
+        return rows
+
+    def write(self, log_dir):
+        """Write run-<run_id>.json and append to runs.csv. Returns the JSON path."""
+        os.makedirs(log_dir, exist_ok=True)
+        json_path = os.path.join(log_dir, f'run-{self.run_id}.json')
+        with open(json_path, 'w') as f:
+            json.dump({'run_id': self.run_id, **self.meta, 'stages': self.stages}, f, indent=2)
+
+        csv_path = os.path.join(log_dir, 'runs.csv')
+        new_file = not os.path.exists(csv_path)
+        with open(csv_path, 'a', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerows(self.rows())
+        return json_path
+
+    def summary(self):
+        """Printable one-line-per-stage table."""
+        lines = [f"  {'stage':<22}{'wall s':>9}{'cpu s':>9}{'peak MB':>10}{'rows in':>12}{'rows out':>10}"]
+        for record in self.stages:
+            if record['status'] == 'cached':
+                lines.append(f"  {record['name']:<22}{'cached':>9}")
+                continue
+            lines.append(
+                f"  {record['name']:<22}{record['wall_s']:>9.2f}{record['cpu_s']:>9.2f}"
+                f"{_fmt(record['rss_peak_mb']):>10}{_fmt(record['rows_in']):>12}{_fmt(record['rows_out']):>10}"
+            )
+        return '\n'.join(lines)
+
+
+class Sections:
+    """
+    Section timer for top-level scripts, where wrapping every block in a with
+    statement would re-indent the whole file: section(name) closes the open
+    section and measures the next one, end() closes the last.
+    """
+
+    def __init__(self, log=None, **measure_options):
+        self.log = log or RunLog()
+        self.measure_options = measure_options
+        self._open = None
+
+    def section(self, name):
+        self.end()
+        self._open = measure(name, **self.measure_options)
+        self._record = self._open.__enter__()
+
+    def end(self):
+        if self._open is not None:
+            self._open.__exit__(None, None, None)
+            self.log.add(self._record)
+            self._open = None
+
+
+def _fmt(value):
+    if value is None:
+        return '-'
+    return f"{value:,.0f}" if isinstance(value, (int, float)) else str(value)
@@ -0,0 +1,136 @@
+"""
+Derived Delay Metrics
+=====================
+The BTS delay ratios declared once, and computed where they are needed
+instead of being stored on every BTS row:
+
+    delay_rate                arr_del15 / arr_flights * 100
+    cancel_rate               arr_cancelled / arr_flights * 100
+    ontime_rate               100 - delay_rate
+    avg_delay_per_flight      arr_delay / arr_flights
+    weather_delay_per_flight  weather_delay / arr_flights
+    <cause>_delay_pct         <cause>_delay / total cause minutes * 100 (five causes)
+    dominant_delay_type       the cause with the most minutes ('carrier', 'weather', ...)
+
+Two ways to compute them:
+    - from summed measures (metric_of_sums): a ratio of sums for any rolled-up
+      table, with NaN where the denominator is 0 (see cube.py)
+    - per row, on demand (row_metric / row_metrics): one NumPy pass over the
+      measure columns, float32 by default, undefined ratios as 0 as the
+      pipeline always reported them. Nothing is added to the BTS frame.
+
+dominant_delay_type is a categorical (one byte per row) in sorted type order,
+missing for rows with no cause minutes reported; ties go to the first cause
+in DELAY_COLS, as idxmax does.
+
+Usage:
+    from metrics import dominant_delay_type, metric_of_sums, row_metric, row_metrics
+    row_metric(bts_data, 'avg_delay_per_flight', dtype='float64')   # ndarray, one value per row
+    row_metrics(bts_data, ['delay_rate', 'weather_delay_pct'])       # float32 DataFrame view
+    metric_of_sums(state_sums, 'delay_rate')                         # Series
+"""
+
+import numpy as np
+import pandas as pd
+
+from enrich import DELAY_COLS
+
+# name: {numerator, denominator (a column, or a list of columns added together),
+#        scale, offset}; value = offset + scale * numerator / denominator
+METRICS = {
+    'delay_rate': {'numerator': 'arr_del15', 'denominator': 'arr_flights', 'scale': 100},
+    'cancel_rate': {'numerator': 'arr_cancelled', 'denominator': 'arr_flights', 'scale': 100},
+    'ontime_rate': {'numerator': 'arr_del15', 'denominator': 'arr_flights', 'scale': -100, 'offset': 100},
+    'avg_delay_per_flight': {'numerator': 'arr_delay', 'denominator': 'arr_flights'},
+    'weather_delay_per_flight': {'numerator': 'weather_delay', 'denominator': 'arr_flights'},
+    **{
+        f'{col}_pct': {'numerator': col, 'denominator': DELAY_COLS, 'scale': 100}
+        for col in DELAY_COLS
+    },
+}
+
+# Sorted, so that group modes break ties as Series.mode() does (see aggregates.py)
+DELAY_TYPES = sorted(col.replace('_delay', '') for col in DELAY_COLS)
+
+
+def _spec(name):
+    if name not in METRICS:
+        raise KeyError(f"unknown derived metric {name!r}")
+    return METRICS[name]
+
+
+def _columns(denominator):
+    return denominator if isinstance(denominator, list) else [denominator]
+
+
+# ============================================================================
+# AGGREGATE LEVEL
+# ============================================================================
+
+def metric_of_sums(table, name):
+    """A metric from a table of summed measures, NaN where the denominator is 0."""
+    spec = _spec(name)
+    denominator = sum(table[col].astype('float64') for col in _columns(spec['denominator']))
+    ratio = table[spec['numerator']].astype('float64') / denominator.where(denominator != 0) * spec.get('scale', 1)
+    return spec['offset'] + ratio if 'offset' in spec else ratio
+
+
+# ============================================================================
+# ROW LEVEL (on demand)
+# ============================================================================
+
+class _Columns:
+    """Measure columns as float64 arrays (missing -> NaN), each converted once."""
+
+    def __init__(self, bts_data):
+        self.bts_data = bts_data
+        self.arrays = {}
+
+    def __getitem__(self, col):
+        if col not in self.arrays:
+            self.arrays[col] = pd.to_numeric(self.bts_data[col], errors='coerce').to_numpy(
+                'float64', na_value=np.nan
+            )
+        return self.arrays[col]
+
+    def total(self, columns):
+        key = tuple(columns)
+        if key not in self.arrays:
+            self.arrays[key] = sum(self[col] for col in columns) if len(columns) > 1 else self[columns[0]]
+        return self.arrays[key]
+
+
+def _row_values(columns, name, dtype):
+    spec = _spec(name)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = columns[spec['numerator']] / columns.total(_columns(spec['denominator']))
+    ratio = np.where(np.isnan(ratio), 0.0, ratio) * spec.get('scale', 1)
+    if 'offset' in spec:
+        ratio = spec['offset'] + ratio
+    return ratio.astype(dtype, copy=False)
+
+
+def row_metric(bts_data, name, dtype='float32'):
+    """One metric per BTS row as an array (0 where undefined); nothing is stored on the frame."""
+    return _row_values(_Columns(bts_data), name, dtype)
+
+
+def row_metrics(bts_data, names=None, dtype='float32'):
+    """A row-level DataFrame view of several metrics (all by default), sharing column conversions."""
+    columns = _Columns(bts_data)
+    names = list(METRICS) if names is None else list(names)
+    return pd.DataFrame({name: _row_values(columns, name, dtype) for name in names}, index=bts_data.index)
+
+
+def dominant_delay_type(bts_data):
+    """Categorical Series: the cause with the most minutes per row, missing if none were reported."""
+    columns = _Columns(bts_data)
+    minutes = np.column_stack([columns[col] for col in DELAY_COLS])
+    reported = ~np.isnan(minutes).all(axis=1)
+    first_max = np.where(np.isnan(minutes), -np.inf, minutes).argmax(axis=1)
+
+    # Position of each DELAY_COLS cause in the sorted DELAY_TYPES
+    sorted_codes = np.array([DELAY_TYPES.index(col.replace('_delay', '')) for col in DELAY_COLS], dtype=np.int8)
+    codes = np.where(reported, sorted_codes[first_max], -1).astype(np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=DELAY_TYPES), index=bts_data.index,
+                     name='dominant_delay_type')
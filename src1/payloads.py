@@ -0,0 +1,324 @@
+"""
+Dashboard Payload Builder
+=========================
+Pre-aggregates the BTS delay data into one compact payload per dashboard chart,
+so the browser loads a few KB per chart instead of the raw Airline_Delay_Cause.csv
+and airports_geographic.csv.
+
+Each payload holds one or more facets: rollups of the base cube (cube.py) to
+the grain the chart draws in its default view, e.g. the stream graph's
+(year, month, state) delay minutes or the choropleth's (year, state, airport)
+traffic plus the (year, state, carrier) pairs it counts carriers from. Tables
+are stored column-wise: repeated strings are dictionary-encoded and numbers
+are plain integer arrays.
+
+A chart filtered by carrier or airport needs a finer grain than its facets.
+Those views come from the query service (query_service.py), grouped by the
+payload's 'filtered' keys; <name>_filtered holds the same rows at the full
+(keys + filter dimensions) grain for when the service is not running, and is
+only downloaded then.
+
+    <out_dir>/manifest.json
+    <out_dir>/choropleth.<version>.json             (+ .json.gz, .json.br)
+    <out_dir>/choropleth_filtered.<version>.json    ...
+
+The version is a hash of the payload content, so file names change whenever the
+data does and the payload files can be cached forever; only manifest.json needs
+revalidating. The front end reads them with loadPayload() and
+loadFilteredRows() in sprintFinal/src/utils/dataCache.js.
+
+Usage:
+    python payloads.py --out-dir ../sprintFinal/public/payloads
+
+The .br copies need the optional brotli package (pip install brotli).
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from cube import BTS_COLUMNS, build_cube
+from dimensions import load_dimensions
+from enrich import DELAY_COLS, add_state
+from ingest import load_dataset
+from writers import compressed, compressed_suffixes, dumps, write_bytes
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+OUTPUT_DIR = '/mnt/user-data/outputs/payloads'
+
+# Bump when the payload layout changes in a way the front end must know about
+PAYLOAD_SCHEMA_VERSION = 2
+
+# Manifest entry key of each compressed sibling
+SUFFIX_ENTRIES = {'.gz': 'gzip', '.br': 'brotli'}
+
+# Name suffix of the fallback payload for filtered views
+FILTERED = '_filtered'
+
+TRAFFIC = ['arr_flights', 'arr_delay', 'arr_del15', 'arr_cancelled']
+
+# Per chart: its facets ({name: (keys, measures)}), whether rows without a state
+# are dropped, which airport details it needs and, for charts that filter by
+# carrier or airport, the rows a filtered view needs: grouped by 'keys', summing
+# 'measures', with the 'filters' dimensions applied
+PAYLOADS = {
+    'choropleth': {
+        'facets': {
+            'airports': (['year', 'state', 'airport'], TRAFFIC),
+            'carriers': (['year', 'state', 'carrier_name'], []),
+        },
+        'require_state': True,
+        'airport_fields': [],
+        'filtered': {
+            'keys': ['year', 'state', 'carrier_name', 'airport'],
+            'measures': TRAFFIC,
+            'filters': ['carrier_name', 'airport'],
+        },
+    },
+    'sunburst': {
+        'facets': {
+            'airports': (['year', 'state', 'airport'], DELAY_COLS),
+        },
+        'require_state': True,
+        'airport_fields': ['name'],
+        'filtered': {
+            'keys': ['year', 'state', 'airport'],
+            'measures': DELAY_COLS,
+            'filters': ['carrier_name'],
+        },
+    },
+    'parallel': {
+        'facets': {
+            'carriers': (['year', 'state', 'carrier_name'], TRAFFIC + ['ontime'] + DELAY_COLS),
+        },
+        'require_state': False,
+        'airport_fields': [],
+    },
+    'stream': {
+        'facets': {
+            'states': (['year', 'month', 'state'], DELAY_COLS),
+        },
+        'require_state': False,
+        'airport_fields': [],
+    },
+    'bubble': {
+        'facets': {
+            'airports': (['year', 'airport'], TRAFFIC + DELAY_COLS),
+        },
+        'require_state': False,
+        'airport_fields': ['name', 'state', 'lat', 'lon'],
+        # The airports a carrier serves, to keep only those bubbles
+        'filtered': {
+            'keys': ['year', 'airport'],
+            'measures': ['arr_flights'],
+            'filters': ['carrier_name'],
+        },
+    },
+}
+
+
+# ============================================================================
+# BUILD PAYLOADS
+# ============================================================================
+
+def encode_columns(frame):
+    """
+    Column-wise encoding: strings become indexes into a per-column dictionary
+    (-1 for missing), numbers become integer lists (missing -> 0).
+    """
+    columns, dictionaries = {}, {}
+    for col in frame.columns:
+        values = frame[col]
+        if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+            columns[col] = values.fillna(0).round().astype('int64').tolist()
+        else:
+            codes, uniques = pd.factorize(values.astype(object), sort=True)
+            columns[col] = codes.tolist()
+            dictionaries[col] = [str(u) for u in uniques]
+    return columns, dictionaries
+
+
+def airport_details(codes, airports, fields):
+    """{code: {field: value}} for the airports present in a payload."""
+    source = {'name': 'name', 'state': 'state', 'lat': 'latitude_deg', 'lon': 'longitude_deg'}
+    known = airports.table.reindex([code for code in codes if code in airports])
+    details = {}
+    for code, info in known[list(source.values())].to_dict('index').items():
+        details[code] = {
+            field: (round(float(info[source[field]]), 4) if field in ('lat', 'lon') else info[source[field]])
+            for field in fields
+            if pd.notna(info[source[field]])
+        }
+    return details
+
+
+def filtered_keys(spec):
+    """Keys of the <name>_filtered fallback: the filtered view's keys plus its filter dimensions."""
+    filtered = spec['filtered']
+    return filtered['keys'] + [dim for dim in filtered['filters'] if dim not in filtered['keys']]
+
+
+def build_payload(name, cube, airports):
+    """
+    Roll the base cube up into one chart's payload dictionary, or into its
+    filtered-view fallback for '<chart>_filtered'.
+    """
+    if name.endswith(FILTERED):
+        spec = PAYLOADS[name[:-len(FILTERED)]]
+        facets = {'filtered': (filtered_keys(spec), spec['filtered']['measures'])}
+    else:
+        spec = PAYLOADS[name]
+        facets = spec['facets']
+
+    tables, codes = {}, set()
+    for facet, (keys, measures) in facets.items():
+        grouped = cube.rollup(keys, measures)
+        if spec['require_state'] and 'state' in keys:
+            grouped = grouped[grouped['state'].notna()]
+        columns, dictionaries = encode_columns(grouped)
+        tables[facet] = {'rows': len(grouped), 'columns': columns, 'dictionaries': dictionaries}
+        if 'airport' in keys:
+            codes.update(grouped['airport'].dropna().astype(object).unique())
+
+    payload = {
+        'name': name,
+        'schema_version': PAYLOAD_SCHEMA_VERSION,
+        'rows': sum(table['rows'] for table in tables.values()),
+        'tables': tables,
+    }
+    if spec['airport_fields'] and not name.endswith(FILTERED):
+        payload['airports'] = airport_details(sorted(codes), airports, spec['airport_fields'])
+    return payload
+
+
+def payload_names(names=None):
+    """The payload files to build for some charts (all by default), fallbacks included."""
+    built = []
+    for name in names or PAYLOADS:
+        built.append(name)
+        if 'filtered' in PAYLOADS[name]:
+            built.append(name + FILTERED)
+    return built
+
+
+# ============================================================================
+# WRITE PAYLOADS
+# ============================================================================
+
+def write_payload(payload, out_dir):
+    """
+    Write a payload as <name>.<version>.json plus compressed siblings.
+    Returns its manifest entry.
+    """
+    body = dumps(payload, sort_keys=True)
+    version = hashlib.sha256(body).hexdigest()[:12]
+    filename = f"{payload['name']}.{version}.json"
+
+    entry = {
+        'file': filename,
+        'version': version,
+        'schema_version': payload['schema_version'],
+        'rows': payload['rows'],
+        'bytes': len(body),
+    }
+
+    encoded = {filename: body}
+    for suffix, data in compressed(body).items():
+        encoded[filename + suffix] = data
+        entry[SUFFIX_ENTRIES[suffix]] = filename + suffix
+        entry[SUFFIX_ENTRIES[suffix] + '_bytes'] = len(data)
+
+    for name, data in encoded.items():
+        path = os.path.join(out_dir, name)
+        if not os.path.exists(path):
+            write_bytes(path, data)
+
+    # How the front end fetches this chart's filtered views
+    spec = PAYLOADS.get(payload['name'], {})
+    if 'filtered' in spec:
+        entry['filtered'] = {**spec['filtered'], 'payload': payload['name'] + FILTERED}
+
+    return entry
+
+
+def write_manifest(entries, out_dir):
+    """Write manifest.json and remove payload versions it no longer lists."""
+    manifest = {
+        'schema_version': PAYLOAD_SCHEMA_VERSION,
+        'generated': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'payloads': entries,
+    }
+    tmp_path = os.path.join(out_dir, 'manifest.json.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, os.path.join(out_dir, 'manifest.json'))
+
+    # <name>.<version>.json[.gz|.br] files from earlier versions
+    current = {entry['file'] for entry in entries.values()}
+    for filename in os.listdir(out_dir):
+        payload_file = filename[:filename.find('.json') + len('.json')]
+        chart = filename.split('.')[0].removesuffix(FILTERED)
+        if chart in PAYLOADS and payload_file not in current:
+            os.remove(os.path.join(out_dir, filename))
+
+    return manifest
+
+
+def build_payloads(bts_data, airports, out_dir, names=None):
+    """Build, write and list every payload (or just `names`). Returns the manifest."""
+    os.makedirs(out_dir, exist_ok=True)
+    cube = build_cube(add_state(bts_data, airports))
+
+    manifest_path = os.path.join(out_dir, 'manifest.json')
+    entries = {}
+    if names and os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            entries = json.load(f).get('payloads', {})
+
+    for name in payload_names(names):
+        entries[name] = write_payload(build_payload(name, cube, airports), out_dir)
+
+    return write_manifest(entries, out_dir)
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the per-chart dashboard payloads.")
+    parser.add_argument('payloads', nargs='*', help=f"Payloads to build: {', '.join(PAYLOADS)} (default: all)")
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    parser.add_argument('--out-dir', default=OUTPUT_DIR)
+    args = parser.parse_args()
+
+    unknown = sorted(set(args.payloads) - set(PAYLOADS))
+    if unknown:
+        parser.error(f"unknown payload(s): {', '.join(unknown)}")
+
+    store_dir = args.store_dir or os.path.join(args.data_dir, 'store')
+
+    start = time.time()
+    bts_data = load_dataset('bts', columns=BTS_COLUMNS, raw_dir=args.data_dir, store_dir=store_dir)
+    airports = load_dimensions(args.data_dir, store_dir)['airports']
+
+    manifest = build_payloads(bts_data, airports, args.out_dir, args.payloads)
+
+    if '.br' not in compressed_suffixes():
+        print("⚠️  brotli is not installed; only .gz copies were written (pip install brotli)")
+    for name, entry in manifest['payloads'].items():
+        print(f"  ✓ {entry['file']}: {entry['rows']:,} rows, {entry['bytes'] / 1024:.1f} KB "
+              f"({entry['gzip_bytes'] / 1024:.1f} KB gzip)")
+    print(f"\n✓ {len(manifest['payloads'])} payload(s) in {args.out_dir} ({time.time() - start:.1f} s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,337 @@
+"""
+Local Aggregation Query Service
+===============================
+Small HTTP service over the processed BTS store that answers the dashboard's
+filtered group-by queries, e.g. "delay minutes by state for one carrier in
+2015-2020", so the browser no longer scans every raw row on each interaction.
+
+At startup the base cube (see cube.py) is rolled up into two cuboids:
+    monthly - (year, month, carrier_name, airport, state)
+    yearly  - (year, carrier_name, airport, state)
+plus one pair per delay type holding only the rows where that cause occurred
+(what the dashboard's delay-type filter selects). Dimensions are stored as
+integer codes, so a query is a few vectorized masks and one bincount per
+measure over the smallest cuboid that can answer it. Ratios such as
+delay_rate or avg_delay can be requested as measures; they are computed from
+the summed measures of each group.
+
+Queries for plain BTS measures without a delay_type (the dashboard's KPI
+totals, for example) are summed from the memory-mapped column store
+(colstore.py) instead, which every service process shares through the page
+cache. Their responses report "cuboid": "columns".
+
+Endpoints (JSON responses):
+    GET /health
+    GET /dimensions
+        Distinct values of every dimension
+    GET /query?group_by=state&measure=arr_delay&measure=arr_flights
+              &carrier_name=Delta%20Air%20Lines%20Inc.&year_start=2015&year_end=2020
+        Filters: year_start, year_end, and any dimension (repeat to allow
+        several values), plus delay_type (carrier, weather, nas, security,
+        late_aircraft). Measures: any cube measure or ratio.
+
+Errors are JSON too ({"error": ...}): 400 for a malformed query, 404 for an
+unknown endpoint, 500 (with the traceback on the server's stderr) otherwise.
+
+Usage:
+    python query_service.py [--port 8765] [--data-dir DIR] [--store-dir DIR]
+"""
+
+import argparse
+import json
+import os
+import time
+import traceback
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+from aggregates import MEASURES
+from colstore import load_column_store
+from cube import CUBE_MEASURES, RATIOS, Cube, load_cube
+from schema import BTS_CAUSE_COUNT_COLUMNS
+
+# Adjust these paths to match dataProcess.py
+DATA_DIR = '/Users/preddy/Desktop/DataVisualization/DV_PROJECT/public'
+STORE_DIR = os.path.join(DATA_DIR, 'store')
+
+HOST = '127.0.0.1'
+PORT = 8765
+
+DIMENSIONS = ['year', 'month', 'carrier_name', 'airport', 'state']
+DELAY_TYPES = ['carrier', 'weather', 'nas', 'security', 'late_aircraft']
+
+# Cuboids from the smallest up; a query uses the first one holding all its dimensions
+CUBOID_DIMENSIONS = {
+    'yearly': ['year', 'carrier_name', 'airport', 'state'],
+    'monthly': DIMENSIONS,
+}
+
+
+class QueryError(ValueError):
+    """A malformed query; reported to the client as HTTP 400."""
+
+
+# ============================================================================
+# CUBOIDS
+# ============================================================================
+
+class Cuboid:
+    """One rollup of the cube: integer-coded dimensions plus summed measures."""
+
+    def __init__(self, cube, dimensions):
+        grouped = cube.rollup(dimensions)
+
+        self.dimensions = dimensions
+        self.size = len(grouped)
+        self.codes, self.labels = {}, {}
+        for dim in dimensions:
+            codes, uniques = pd.factorize(grouped[dim].astype(object), sort=True)
+            self.codes[dim] = codes
+            self.labels[dim] = [_to_json(u) for u in uniques]
+
+        self.measures = {m: grouped[m].fillna(0).to_numpy('float64') for m in CUBE_MEASURES}
+
+    def mask(self, filters):
+        """
+        Boolean row mask for [(dimension, allowed label set or (low, high) range)];
+        every constraint must hold.
+        """
+        mask = np.ones(self.size, dtype=bool)
+        for dim, allowed in filters:
+            labels = self.labels[dim]
+            if isinstance(allowed, tuple):
+                low, high = allowed
+                keep = [i for i, label in enumerate(labels)
+                        if label is not None and (low is None or label >= low) and (high is None or label <= high)]
+            else:
+                keep = [i for i, label in enumerate(labels) if label in allowed]
+            mask &= np.isin(self.codes[dim], keep)
+        return mask
+
+    def group(self, group_by, measures, mask):
+        """
+        Sum the measures over the masked rows, grouped by the given dimensions.
+        Ratio measures are computed from each group's sums.
+        """
+        columns = {}
+        if group_by:
+            # Missing labels are coded -1; give them the code after the last
+            # label, so groups come in label order with missing last, as the
+            # column store returns them
+            codes = [np.where(self.codes[dim][mask] < 0, len(self.labels[dim]), self.codes[dim][mask])
+                     for dim in group_by]
+            shape = [len(self.labels[dim]) + 1 for dim in group_by]
+            keys, inverse = np.unique(np.ravel_multi_index(codes, shape), return_inverse=True)
+
+            for dim, dim_codes in zip(group_by, np.unravel_index(keys, shape)):
+                labels = self.labels[dim] + [None]
+                columns[dim] = [labels[code] for code in dim_codes]
+        else:
+            keys, inverse = np.zeros(1), np.zeros(int(mask.sum()), dtype=np.intp)
+
+        ratios = [m for m in measures if m in RATIOS]
+        summed = CUBE_MEASURES if ratios else measures
+        sums = pd.DataFrame({
+            m: np.bincount(inverse, weights=self.measures[m][mask], minlength=len(keys))
+            for m in summed
+        })
+        for m in measures:
+            if m in RATIOS:
+                columns[m] = [None if np.isnan(v) else round(float(v), 4) for v in RATIOS[m](sums)]
+            else:
+                columns[m] = [_measure_value(m, value) for value in sums[m]]
+        return columns
+
+
+def _to_json(value):
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _measure_value(measure, value):
+    # Cause counts are apportioned fractions; everything else is a whole number
+    return round(float(value), 2) if measure in BTS_CAUSE_COUNT_COLUMNS else int(round(value))
+
+
+def column_group(store, group_by, measures, filters):
+    """Cuboid.group's columns for the same query, summed over the column store's rows."""
+    where = {}
+    for dim, allowed in filters:
+        if isinstance(allowed, tuple):
+            low, high = allowed
+            allowed = {label for label in store.labels[dim]
+                       if label is not None and (low is None or label >= low) and (high is None or label <= high)}
+        # Several constraints on one dimension (year and a year range) must all hold
+        where[dim] = where[dim] & set(allowed) if dim in where else set(allowed)
+
+    sums = store.group_sum(group_by, measures, where=where)
+    columns = {dim: [_to_json(label) for label in sums[dim]] for dim in group_by}
+    for m in measures:
+        columns[m] = [_measure_value(m, value) for value in sums[m]]
+    return columns
+
+
+def build_cuboids(cube):
+    """Return {(delay_type or None, cuboid name): Cuboid}."""
+    # BTS has one row per (year, month, carrier, airport), so base cube cells
+    # are single BTS rows and the delay-type filter can be applied per cell
+    subsets = {None: cube}
+    for delay_type in DELAY_TYPES:
+        subsets[delay_type] = Cube(cube.table[cube.table[f'{delay_type}_ct'].fillna(0) > 0])
+
+    return {
+        (delay_type, name): Cuboid(subset, dimensions)
+        for delay_type, subset in subsets.items()
+        for name, dimensions in CUBOID_DIMENSIONS.items()
+    }
+
+
+# ============================================================================
+# QUERIES
+# ============================================================================
+
+class QueryService:
+    """Parses dashboard queries and answers them from the pre-built cuboids or the column store."""
+
+    def __init__(self, cube, column_store=None):
+        self.cuboids = build_cuboids(cube)
+        self.column_store = column_store
+        self.rows = int(cube.table['n_rows'].sum())
+        self.run = lru_cache(maxsize=1024)(self._run)
+
+    def dimensions(self):
+        return {dim: self.cuboids[(None, 'monthly')].labels[dim] for dim in DIMENSIONS}
+
+    def query(self, params):
+        """Answer a query given parsed query-string parameters ({name: [values]})."""
+        group_by = tuple(params.get('group_by', []))
+        measures = tuple(params.get('measure', [])) or tuple(MEASURES)
+        delay_type = params.get('delay_type', [None])[-1]
+
+        unknown = [d for d in group_by if d not in DIMENSIONS]
+        unknown += [m for m in measures if m not in CUBE_MEASURES and m not in RATIOS]
+        unknown += [p for p in params if p not in ('group_by', 'measure', 'delay_type', 'year_start', 'year_end')
+                    and p not in DIMENSIONS]
+        if unknown:
+            raise QueryError(f"unknown dimension, measure or parameter: {', '.join(unknown)}")
+        if delay_type is not None and delay_type not in DELAY_TYPES:
+            raise QueryError(f"delay_type must be one of {', '.join(DELAY_TYPES)}")
+
+        filters = []
+        for dim in DIMENSIONS:
+            if dim in params:
+                values = params[dim]
+                if dim in ('year', 'month'):
+                    values = [_parse_int(dim, v) for v in values]
+                filters.append((dim, frozenset(values)))
+        if 'year_start' in params or 'year_end' in params:
+            low = _parse_int('year_start', params['year_start'][-1]) if 'year_start' in params else None
+            high = _parse_int('year_end', params['year_end'][-1]) if 'year_end' in params else None
+            filters.append(('year', (low, high)))
+
+        return self.run(group_by, measures, tuple(filters), delay_type)
+
+    def _from_columns(self, measures, delay_type):
+        # The column store holds the BTS measures only: no cause counts, 'ontime' or ratios
+        return (self.column_store is not None and delay_type is None
+                and all(m in self.column_store.measures for m in measures))
+
+    def _run(self, group_by, measures, filters, delay_type):
+        start = time.perf_counter()
+        if self._from_columns(measures, delay_type):
+            name = 'columns'
+            columns = column_group(self.column_store, list(group_by), list(measures), filters)
+        else:
+            needed = set(group_by) | {dim for dim, _ in filters}
+            name = next(name for name, dims in CUBOID_DIMENSIONS.items() if needed <= set(dims))
+            cuboid = self.cuboids[(delay_type, name)]
+            columns = cuboid.group(list(group_by), list(measures), cuboid.mask(filters))
+
+        return {
+            'group_by': list(group_by),
+            'cuboid': name,
+            'rows': len(next(iter(columns.values()))),
+            'columns': columns,
+            'elapsed_ms': round((time.perf_counter() - start) * 1000, 2),
+        }
+
+
+def _parse_int(name, value):
+    try:
+        return int(value)
+    except ValueError:
+        raise QueryError(f"{name} must be an integer, got {value!r}") from None
+
+
+# ============================================================================
+# HTTP
+# ============================================================================
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            try:
+                if url.path == '/health':
+                    self._send(200, {'status': 'ok', 'rows': service.rows})
+                elif url.path == '/dimensions':
+                    self._send(200, service.dimensions())
+                elif url.path == '/query':
+                    self._send(200, service.query(parse_qs(url.query)))
+                else:
+                    self._send(404, {'error': f"unknown endpoint {url.path}"})
+            except QueryError as e:
+                self._send(400, {'error': str(e)})
+            except Exception as e:
+                traceback.print_exc()
+                self._send(500, {'error': f"{type(e).__name__}: {e}"})
+
+        def _send(self, status, body):
+            data = json.dumps(body, separators=(',', ':')).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(data)))
+            # The Vite dev server runs on another port
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def load_service(data_dir=DATA_DIR, store_dir=STORE_DIR):
+    return QueryService(load_cube(data_dir, store_dir), load_column_store(data_dir, store_dir))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve filtered BTS aggregations over HTTP.")
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--port', type=int, default=PORT)
+    parser.add_argument('--data-dir', default=DATA_DIR)
+    parser.add_argument('--store-dir', default=None, help="Parquet store (default: <data-dir>/store)")
+    args = parser.parse_args()
+
+    start = time.time()
+    service = load_service(args.data_dir, args.store_dir or os.path.join(args.data_dir, 'store'))
+    print(f"✓ Built cuboids over {service.rows:,} BTS rows in {time.time() - start:.1f} s")
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+    print(f"Serving on http://{args.host}:{args.port} (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
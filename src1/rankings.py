@@ -0,0 +1,237 @@
+"""
+Ranking Index
+=============
+Top-K and bottom-K airports, carriers and states per metric and partition,
+built once from the aggregation pass, so questions such as "the 10 worst
+airports in TX in 2019 by weather delay" are a dictionary lookup instead of
+a groupby and sort over the full aggregates.
+
+    entity     key                  partitions
+    airport    airport              all, state, year, state + year
+    carrier    carrier_full_name    all, year
+    state      state                all, year
+
+Carriers are not partitioned by state: the streaming partials keep carrier
+and airport sums in separate tables (see aggregates.py).
+
+Metrics are ratios of additive sums, taken per entity within a partition
+with metrics.metric_of_sums:
+    avg_delay        avg_delay_per_flight (arr_delay / arr_flights)
+    delay_rate       delay_rate
+    cancel_rate      cancel_rate
+    weather_delay    weather_delay_per_flight (weather delay minutes per flight)
+plus one row mean:
+    row_avg_delay    mean of the BTS rows' avg_delay_per_flight (airports and
+                     states; summary_stats' worst_airports)
+
+'top' keeps the K highest values (worst first), 'bottom' the K lowest (best
+first). Equal values keep entity order, as nlargest / nsmallest / idxmax do.
+Entities without a value (no flights) are left out.
+
+The index is built from BTS rows (dataProcess.py) or from the streaming
+partials (aggregates.py) and saved as <out_dir>/rankings.json:
+    {"k": 10, "rankings": {entity: {metric: {partition: {"top": [[key, value], ...], "bottom": [...]}}}}}
+with partitions labelled 'all', 'state=TX', 'year=2019', 'state=TX,year=2019'.
+
+Usage:
+    from rankings import RankingIndex, build_rankings, rank_rows
+    index = build_rankings(rank_rows(bts_data))
+    index.top('airport', 'weather_delay', 10, state='TX', year=2019)   # [(airport, value), ...]
+    index.bottom('carrier', 'avg_delay', 5)
+    RankingIndex.load(os.path.join(out_dir, 'rankings.json'))
+"""
+
+import json
+
+from metrics import metric_of_sums, row_metric
+from writers import write_json
+
+K = 10
+
+# Ranked metric: the metrics.METRICS entry it is computed with
+RANKED_METRICS = {
+    'avg_delay': 'avg_delay_per_flight',
+    'delay_rate': 'delay_rate',
+    'cancel_rate': 'cancel_rate',
+    'weather_delay': 'weather_delay_per_flight',
+}
+
+# Ranked row mean: the per-row metric it averages (from ROW_SUMS, airports only)
+ROW_MEANS = {'row_avg_delay': 'avg_delay_per_flight'}
+
+# entity: (key column, {partition: sums table it is ranked from})
+ENTITIES = {
+    'airport': ('airport', {(): 'airport', ('state',): 'airport',
+                            ('year',): 'airport_year', ('state', 'year'): 'airport_year'}),
+    'carrier': ('carrier_full_name', {(): 'carrier', ('year',): 'carrier_year'}),
+    'state': ('state', {(): 'airport', ('year',): 'airport_year'}),
+}
+
+# Sums tables: the source rows summed once per grain. Airports and carriers
+# are each one row of their table, so their metrics are the same ratios a
+# groupby over the rows would give.
+GRAINS = {
+    'airport': ('airport', ['state', 'airport']),
+    'airport_year': ('airport', ['year', 'state', 'airport']),
+    'carrier': ('carrier', ['carrier_full_name']),
+    'carrier_year': ('carrier', ['year', 'carrier_full_name']),
+}
+
+SUMS = ['arr_flights', 'arr_del15', 'arr_delay', 'arr_cancelled', 'weather_delay']
+ROW_SUMS = ['avg_delay_per_flight_sum', 'n_rows']
+
+
+def partition_label(columns, values):
+    """'all', or 'state=TX,year=2019' for the partition columns and their values."""
+    if not columns:
+        return 'all'
+    return ','.join(f'{col}={value}' for col, value in zip(columns, values))
+
+
+# ============================================================================
+# BUILD
+# ============================================================================
+
+def rank_rows(bts_data):
+    """{'airport': rows, 'carrier': rows} to rank from enriched BTS rows (one row each)."""
+    carrier = bts_data[['year', 'carrier_full_name'] + SUMS].assign(
+        carrier_full_name=bts_data['carrier_full_name'].astype('category'),
+    )
+    # Row means for airports only, as the streaming partials keep them (rank_partials)
+    airport = bts_data[['year', 'state', 'airport'] + SUMS].assign(
+        state=bts_data['state'].astype('category'),
+        avg_delay_per_flight_sum=row_metric(bts_data, 'avg_delay_per_flight', dtype='float64'),
+        n_rows=1,
+    )
+    return {'airport': airport, 'carrier': carrier}
+
+
+def rank_partials(partials):
+    """{'airport': rows, 'carrier': rows} to rank from the streaming partials, with year from year_month."""
+    airport = partials['airport'][['year_month', 'state', 'airport'] + SUMS + ROW_SUMS]
+    carrier = partials['carrier'][['year_month', 'carrier_full_name'] + SUMS]
+    return {
+        name: table.assign(year=table['year_month'].str[:4].astype(int))
+        for name, table in (('airport', airport), ('carrier', carrier))
+    }
+
+
+def grain_sums(sources):
+    """{grain: sums table} of the source rows (see GRAINS)."""
+    tables = {}
+    for grain, (source, keys) in GRAINS.items():
+        rows = sources[source]
+        sums = [col for col in SUMS + ROW_SUMS if col in rows.columns]
+        tables[grain] = rows.groupby(keys, observed=True, dropna=False)[sums].sum().reset_index()
+    return tables
+
+
+def _ranked(values, key, partition, ascending, k):
+    # A stable sort keeps the groupby's entity order among ties
+    ordered = values.reset_index()
+    if partition:
+        ordered = ordered.sort_values(
+            partition + ['value'], ascending=[True] * len(partition) + [ascending], kind='stable'
+        ).groupby(partition, sort=False).head(k)
+        labels = ordered[partition[0]].astype(str).radd(f'{partition[0]}=')
+        for col in partition[1:]:
+            labels = labels + f',{col}=' + ordered[col].astype(str)
+        labels = labels.tolist()
+    else:
+        ordered = ordered.sort_values('value', ascending=ascending, kind='stable').head(k)
+        labels = ['all'] * len(ordered)
+
+    ranked = {}
+    for label, entity, value in zip(labels, ordered[key].tolist(), ordered['value'].tolist()):
+        ranked.setdefault(label, []).append([entity, value])
+    return ranked
+
+
+def rank_table(table, key, partition, k=K):
+    """{metric: {partition label: {'top': [...], 'bottom': [...]}}} for one entity and partition."""
+    sums = [col for col in SUMS + ROW_SUMS if col in table.columns]
+    table = table.groupby(partition + [key], observed=True)[sums].sum()
+
+    metrics = {metric: metric_of_sums(table, name) for metric, name in RANKED_METRICS.items()}
+    for metric, name in ROW_MEANS.items():
+        if f'{name}_sum' in table.columns:
+            metrics[metric] = table[f'{name}_sum'] / table['n_rows']
+
+    result = {}
+    for metric, values in metrics.items():
+        values = values.dropna().rename('value')
+        top = _ranked(values, key, partition, False, k)
+        bottom = _ranked(values, key, partition, True, k)
+        result[metric] = {label: {'top': top[label], 'bottom': bottom[label]} for label in top}
+    return result
+
+
+def build_rankings(sources, k=K):
+    """The RankingIndex of every entity, metric and partition (sources from rank_rows / rank_partials)."""
+    tables = grain_sums(sources)
+    rankings = {}
+    for entity, (key, partitions) in ENTITIES.items():
+        rankings[entity] = {}
+        for partition, grain in partitions.items():
+            for metric, ranked in rank_table(tables[grain], key, list(partition), k).items():
+                rankings[entity].setdefault(metric, {}).update(ranked)
+    return RankingIndex(rankings, k)
+
+
+# ============================================================================
+# QUERY
+# ============================================================================
+
+class RankingIndex:
+    """Precomputed top-K / bottom-K lists, looked up by entity, metric and partition."""
+
+    def __init__(self, rankings, k=K):
+        self.rankings = rankings
+        self.k = k
+
+    def ranked(self, entity, metric, order, n=None, **partition):
+        """[(key, value)] of one list: order is 'top' (highest first) or 'bottom' (lowest first)."""
+        if entity not in ENTITIES:
+            raise KeyError(f"unknown ranking entity {entity!r}")
+        if metric not in self.rankings[entity]:
+            raise KeyError(f"no {metric!r} ranking for {entity}")
+        columns = [cols for cols in ENTITIES[entity][1] if set(cols) == set(partition)]
+        if not columns:
+            raise KeyError(f"{entity} rankings are not partitioned by {sorted(partition)}")
+        n = self.k if n is None else n
+        if n > self.k:
+            raise ValueError(f"the index keeps {self.k} entries per list, not {n}")
+
+        label = partition_label(columns[0], [partition[col] for col in columns[0]])
+        entries = self.rankings[entity][metric].get(label, {}).get(order, [])
+        return [tuple(entry) for entry in entries[:n]]
+
+    def top(self, entity, metric, n=None, **partition):
+        """The n entities with the highest metric (the worst, for delays), e.g. state='TX', year=2019."""
+        return self.ranked(entity, metric, 'top', n, **partition)
+
+    def bottom(self, entity, metric, n=None, **partition):
+        """The n entities with the lowest metric (the best, for delays)."""
+        return self.ranked(entity, metric, 'bottom', n, **partition)
+
+    def leaders(self, entity, metric, by, order='top'):
+        """{partition value: first entity} over the single-column partition `by` (e.g. worst airport per state)."""
+        prefix = f'{by}='
+        leaders = {}
+        for label, lists in self.rankings[entity][metric].items():
+            if label.startswith(prefix) and ',' not in label and lists[order]:
+                leaders[label[len(prefix):]] = lists[order][0][0]
+        return leaders
+
+    def to_dict(self):
+        return {'k': self.k, 'rankings': self.rankings}
+
+    def save(self, path, pretty=False):
+        """Write rankings.json. It is read by the pipeline and tools, not the browser: no .gz / .br."""
+        return write_json(self.to_dict(), path, pretty=pretty, compress=False)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            saved = json.load(f)
+        return cls(saved['rankings'], saved['k'])
@@ -0,0 +1,73 @@
+"""
+BTS Delay Record Schema
+=======================
+Compact dtypes for Airline_Delay_Cause.csv, shared by every loader.
+
+    carrier, carrier_name, airport, airport_name   -> category
+    year / month                                   -> int16 / int8
+    whole-number counts and delay minutes          -> nullable Int32 (sums upcast to Int64)
+    fractional *_ct cause counts                   -> float32
+
+Compared to the default object/float64 frame this cuts resident memory several-fold.
+FLIGHTS_DTYPES does the same for the flight-level on-time file read by JOIN_EXAMPLES.py.
+
+Usage:
+    from schema import load_bts
+    bts = load_bts('Airline_Delay_Cause.csv', columns=['year', 'airport', 'arr_delay'])
+"""
+
+import pandas as pd
+
+BTS_KEY_COLUMNS = ['year', 'month', 'carrier', 'carrier_name', 'airport', 'airport_name']
+
+# Whole-number measures (flights, cancellations, delay minutes)
+BTS_COUNT_COLUMNS = [
+    'arr_flights', 'arr_del15', 'arr_cancelled', 'arr_diverted',
+    'arr_delay', 'carrier_delay', 'weather_delay', 'nas_delay',
+    'security_delay', 'late_aircraft_delay',
+]
+
+# Delayed-flight counts apportioned across causes, so they carry fractions
+BTS_CAUSE_COUNT_COLUMNS = ['carrier_ct', 'weather_ct', 'nas_ct', 'security_ct', 'late_aircraft_ct']
+
+BTS_DTYPES = {
+    'year': 'int16',
+    'month': 'int8',
+    'carrier': 'category',
+    'carrier_name': 'category',
+    'airport': 'category',
+    'airport_name': 'category',
+    **{col: 'Int32' for col in BTS_COUNT_COLUMNS},
+    **{col: 'float32' for col in BTS_CAUSE_COUNT_COLUMNS},
+}
+
+
+# Flight-level on-time records (bts_airline_delays.csv, used by JOIN_EXAMPLES.py)
+FLIGHT_DELAY_COLUMNS = [
+    'DepDelay', 'ArrDelay', 'CarrierDelay', 'WeatherDelay',
+    'NASDelay', 'SecurityDelay', 'LateAircraftDelay',
+]
+
+FLIGHTS_DTYPES = {
+    'Origin': 'category',
+    'Dest': 'category',
+    'Carrier': 'category',
+    **{col: 'float32' for col in FLIGHT_DELAY_COLUMNS},
+}
+
+
+def bts_dtypes(columns=None):
+    """Return the BTS dtype mapping, restricted to the given columns."""
+    if columns is None:
+        return dict(BTS_DTYPES)
+    return {col: dtype for col, dtype in BTS_DTYPES.items() if col in columns}
+
+
+def apply_bts_schema(df):
+    """Cast an already-loaded BTS frame to the compact dtypes."""
+    return df.astype(bts_dtypes(df.columns))
+
+
+def load_bts(path, columns=None, **read_csv_kwargs):
+    """Read Airline_Delay_Cause.csv with the compact dtypes."""
+    return pd.read_csv(path, usecols=columns, dtype=bts_dtypes(columns), **read_csv_kwargs)
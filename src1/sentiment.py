@@ -0,0 +1,59 @@
+"""
+Review Sentiment Scoring
+========================
+Vectorized replacement for the per-review apply() in dataProcess.py step 7.
+
+- Sentiment scorers are registered by name in SCORERS. Each one takes the whole
+  reviews frame and returns a Series of scores in [-1, 1] computed with column
+  operations, never a Python call per review. The default 'rating' scorer maps
+  overall_rating (1-10) onto that range; a lexicon-based text scorer can be
+  added later with @register_scorer('lexicon').
+- Delay mentions are found with one compiled, case-insensitive regex pass over
+  the content column.
+
+Usage:
+    from sentiment import add_review_sentiment
+    add_review_sentiment(reviews_data)                    # rating-based
+    add_review_sentiment(reviews_data, scorer='lexicon')  # once registered
+"""
+
+import re
+
+import pandas as pd
+
+DELAY_KEYWORDS = ['delay', 'late', 'wait', 'held', 'stuck', 'cancel']
+DELAY_PATTERN = re.compile('|'.join(DELAY_KEYWORDS), re.IGNORECASE)
+
+SCORERS = {}
+
+
+def register_scorer(name):
+    """Register a vectorized scorer: fn(reviews DataFrame) -> Series of scores in [-1, 1]."""
+    def decorator(fn):
+        SCORERS[name] = fn
+        return fn
+    return decorator
+
+
+@register_scorer('rating')
+def rating_sentiment(reviews):
+    """
+    Normalize overall_rating (1-10) to sentiment (-1 to 1): 1 -> -0.8, 5 -> 0,
+    10 -> 1. Reviews without a rating score 0.
+    """
+    rating = pd.to_numeric(reviews['overall_rating'], errors='coerce')
+    return ((rating - 5) / 5).fillna(0)
+
+
+def mentions_delay(content):
+    """True where the review text mentions a delay, late arrival, wait or cancellation."""
+    return content.astype(object).str.contains(DELAY_PATTERN, na=False)
+
+
+def add_review_sentiment(reviews_data, scorer='rating'):
+    """Add 'sentiment_score' (from the named scorer) and 'mentions_delay' columns."""
+    if scorer not in SCORERS:
+        raise ValueError(f"unknown sentiment scorer {scorer!r}; registered: {', '.join(SCORERS)}")
+    reviews_data['sentiment_score'] = SCORERS[scorer](reviews_data)
+    reviews_data['mentions_delay'] = mentions_delay(reviews_data['content'])
+    return reviews_data
@@ -0,0 +1,442 @@
+"""
+Stage Runner
+============
+Runs a pipeline's named stages in dependency order, skipping the ones whose
+inputs and code have not changed since their last run and executing the rest
+side by side in a process pool.
+
+A stage is a function, the names of its inputs and the files it writes to
+out_dir. An input is one of
+    - another stage, whose return value is passed in (so it runs first)
+    - a data input (e.g. the enriched bts_data), loaded only if some stage
+      actually has to run, and declared with the source files and code it is
+      built from
+    - a parameter (e.g. carrier_mapping), a plain value
+    - 'out_dir'
+
+    STAGES = {
+        'rankings': {'fn': build_ranking_index, 'inputs': ['bts_data', 'out_dir'],
+                     'outputs': ['rankings.json']},
+        'summary_stats': {'fn': build_summary_stats, 'inputs': ['bts_data', 'rankings', 'out_dir'],
+                          'outputs': ['summary_stats.json']},
+    }
+
+Caching: each stage gets a fingerprint from the hashes of its data inputs'
+files, the source of its function (and of any modules, functions or constant
+values listed in its 'code'),
+its parameter values and the fingerprints of the stages it depends on. After a
+run, the stage's outputs and return value are copied to
+<cache_dir>/<stage>/. A stage whose fingerprint matches is not run: its outputs
+are restored into out_dir if they are missing or were changed there.
+
+Instrumentation: every stage that runs (and the load() of the data inputs) is
+wrapped in instrument.measure(), so wall/CPU time, peak memory and row counts
+land in the RunLog passed as `log`; cached stages are logged as such.
+
+Data frames handed to workers are not pickled per task. They are written once
+as uncompressed Arrow IPC files (in /dev/shm where available) and each worker
+memory-maps them on first use, so all workers read the same pages.
+
+Usage:
+    from stages import run_stages
+    run_stages(STAGES, data=DATA, load=load_inputs, params={...}, out_dir=out_dir,
+               cache_dir=cache_dir, only=['sunburst_data'], workers=8)
+"""
+
+import hashlib
+import importlib
+import inspect
+import json
+import os
+import pickle
+import shutil
+import tempfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timezone
+
+import pandas as pd
+import pyarrow as pa
+
+from instrument import count_rows, measure
+
+CHUNK_SIZE = 1024 * 1024
+
+# Frames shared with the workers: name -> Arrow file path, and the frames
+# already mapped in this worker
+_SHARED_PATHS = {}
+_WORKER_FRAMES = {}
+
+
+# ============================================================================
+# DEPENDENCY GRAPH
+# ============================================================================
+
+def dependencies(stages, name):
+    """The stages whose results `name` takes as inputs."""
+    return [inp for inp in stages[name]['inputs'] if inp in stages]
+
+
+def stage_order(stages, only=None):
+    """
+    Stage names in an order that runs every stage after the stages it depends
+    on. With `only`, just those stages and what they depend on.
+    """
+    unknown = sorted(set(only or []) - set(stages))
+    if unknown:
+        raise ValueError(f"unknown stage(s): {', '.join(unknown)}")
+
+    order, visiting = [], set()
+
+    def visit(name, path):
+        if name in order:
+            return
+        if name in visiting:
+            raise ValueError(f"stage dependency cycle: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in dependencies(stages, name):
+            visit(dep, path + [name])
+        visiting.discard(name)
+        order.append(name)
+
+    for name in only or stages:
+        visit(name, [])
+    return order
+
+
+def _missing_inputs(stages, data, params):
+    available = set(stages) | set(data) | set(params) | {'out_dir'}
+    return sorted({inp for spec in stages.values() for inp in spec['inputs'] if inp not in available})
+
+
+# ============================================================================
+# FINGERPRINTS
+# ============================================================================
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileHashes:
+    """SHA-256 of input files, remembered by (size, mtime) so unchanged files are not re-read."""
+
+    def __init__(self, path=None):
+        self.path = path
+        self.known = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.known = json.load(f)
+
+    def __call__(self, path):
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        entry = self.known.get(path)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            entry = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': _hash_file(path)}
+            self.known[path] = entry
+        return entry['sha256']
+
+    def save(self):
+        if self.path:
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(self.known, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+
+
+def code_digest(items):
+    """
+    Hash the source of functions and of modules (given by name), and the value
+    of anything else (e.g. a column list a function reads).
+    """
+    digest = hashlib.sha256()
+    for item in items:
+        if callable(item):
+            digest.update(inspect.getsource(item).encode('utf-8'))
+        elif isinstance(item, str):
+            with open(importlib.import_module(item).__file__, 'rb') as f:
+                digest.update(f.read())
+        else:
+            digest.update(json.dumps(item, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def fingerprints(stages, order, data, params, file_hashes):
+    """{stage name: fingerprint} for the stages in order."""
+    data_digests = {
+        name: {
+            'files': [file_hashes(path) for path in spec.get('files', [])],
+            'code': code_digest(spec.get('code', [])),
+        }
+        for name, spec in data.items()
+    }
+
+    result = {}
+    for name in order:
+        spec = stages[name]
+        inputs = spec['inputs']
+        description = {
+            'code': code_digest([spec['fn']] + spec.get('code', [])),
+            'data': {inp: data_digests[inp] for inp in inputs if inp in data},
+            'params': {inp: params[inp] for inp in inputs if inp in params},
+            'deps': {dep: result[dep] for dep in dependencies(stages, name)},
+        }
+        body = json.dumps(description, sort_keys=True, default=str).encode('utf-8')
+        result[name] = hashlib.sha256(body).hexdigest()[:16]
+    return result
+
+
+# ============================================================================
+# STAGE CACHE
+# ============================================================================
+
+def _record_path(cache_dir, name):
+    return os.path.join(cache_dir, name, 'record.json')
+
+
+def cached_record(cache_dir, name, fingerprint):
+    """The cache record for a stage if it was last run with this fingerprint, else None."""
+    path = _record_path(cache_dir, name)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        record = json.load(f)
+    if record['fingerprint'] != fingerprint:
+        return None
+    stage_dir = os.path.dirname(path)
+    if not all(os.path.exists(os.path.join(stage_dir, output)) for output in record['outputs']):
+        return None
+    if record['has_result'] and not os.path.exists(os.path.join(stage_dir, 'result.pkl')):
+        return None
+    return record
+
+
+def restore_outputs(cache_dir, name, record, out_dir):
+    """Copy cached outputs back into out_dir where they are missing or differ. Returns the count."""
+    restored = 0
+    for output, sha256 in record['outputs'].items():
+        path = os.path.join(out_dir, output)
+        if not os.path.exists(path) or _hash_file(path) != sha256:
+            shutil.copyfile(os.path.join(cache_dir, name, output), path)
+            restored += 1
+    return restored
+
+
+def cached_result(cache_dir, name):
+    path = os.path.join(cache_dir, name, 'result.pkl')
+    if not os.path.exists(path):
+        return None
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def save_stage(cache_dir, name, fingerprint, spec, result, out_dir, seconds):
+    """Copy a finished stage's outputs and return value into the cache and record its fingerprint."""
+    stage_dir = os.path.join(cache_dir, name)
+    if os.path.isdir(stage_dir):
+        shutil.rmtree(stage_dir)
+    os.makedirs(stage_dir)
+
+    outputs = {}
+    for output in spec.get('outputs', []):
+        path = os.path.join(out_dir, output)
+        # Optional outputs (e.g. .br without brotli installed) may not exist
+        if not os.path.exists(path):
+            continue
+        shutil.copyfile(path, os.path.join(stage_dir, output))
+        outputs[output] = _hash_file(path)
+
+    if result is not None:
+        with open(os.path.join(stage_dir, 'result.pkl'), 'wb') as f:
+            pickle.dump(result, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    record = {
+        'fingerprint': fingerprint,
+        'outputs': outputs,
+        'has_result': result is not None,
+        'seconds': round(seconds, 3),
+        'finished': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+    }
+    # Written last: an interrupted save leaves no record, so the stage reruns
+    with open(_record_path(cache_dir, name), 'w') as f:
+        json.dump(record, f, indent=2)
+
+
+def plan_stages(stages, data, params, cache_dir=None, only=None, force=False):
+    """
+    Decide what a run would do. Returns (order, fingerprints, cached) where
+    cached maps the stages that can be skipped to their cache records.
+    """
+    missing = _missing_inputs(stages, data, params)
+    if missing:
+        raise ValueError(f"unknown stage input(s): {', '.join(missing)}")
+
+    order = stage_order(stages, only)
+    file_hashes = FileHashes(os.path.join(cache_dir, 'file_hashes.json') if cache_dir else None)
+    prints = fingerprints(stages, order, data, params, file_hashes)
+
+    cached = {}
+    if cache_dir and not force:
+        for name in order:
+            record = cached_record(cache_dir, name, prints[name])
+            if record is not None:
+                cached[name] = record
+
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        file_hashes.save()
+    return order, prints, cached
+
+
+# ============================================================================
+# SHARED FRAMES
+# ============================================================================
+
+def share_frames(frames, tmp_dir):
+    """Write each frame as an Arrow IPC file in tmp_dir. Returns {name: path}."""
+    paths = {}
+    for name, frame in frames.items():
+        path = os.path.join(tmp_dir, f'{name}.arrow')
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        paths[name] = path
+    return paths
+
+
+def _init_worker(paths):
+    _SHARED_PATHS.clear()
+    _SHARED_PATHS.update(paths)
+    _WORKER_FRAMES.clear()
+
+
+def _shared_frame(name):
+    """Memory-map a shared frame (once per worker)."""
+    if name not in _WORKER_FRAMES:
+        with pa.memory_map(_SHARED_PATHS[name], 'r') as source:
+            table = pa.ipc.open_file(source).read_all()
+        _WORKER_FRAMES[name] = table.to_pandas(split_blocks=True)
+    return _WORKER_FRAMES[name]
+
+
+def _call_stage(name, fn, args, measure_options):
+    """Run one stage under measure(). Returns (result, record)."""
+    rows_in = sum(len(arg) for arg in args if isinstance(arg, pd.DataFrame))
+    with measure(name, rows_in=rows_in, **measure_options) as record:
+        result = fn(*args)
+        if isinstance(result, pd.DataFrame) and record['rows_out'] is None:
+            count_rows(len(result))
+    return result, record
+
+
+def _run_in_worker(name, fn, inputs, values, measure_options):
+    """Pool task: resolve the shared frames among the inputs, then run the stage."""
+    args = [values[inp] if inp in values else _shared_frame(inp) for inp in inputs]
+    return _call_stage(name, fn, args, measure_options)
+
+
+# ============================================================================
+# RUN STAGES
+# ============================================================================
+
+def run_stages(stages, data, load, params, out_dir, cache_dir=None, only=None, force=False, workers=None,
+               log=None, measure_options=None):
+    """
+    Run the stages (or just `only` and their dependencies) and return
+    {stage name: return value} for the stages that ran.
+
+    load() is called at most once, and only if some stage has to run; it
+    returns {name: value} for the data inputs. Without a cache_dir every
+    selected stage runs. With workers=1 stages run one by one in this process,
+    otherwise independent stages run in a pool of `workers` processes
+    (default: one per CPU). Stage measurements go to `log` (an
+    instrument.RunLog); measure_options are passed on to instrument.measure().
+    """
+    measure_options = measure_options or {}
+    order, prints, cached = plan_stages(stages, data, params, cache_dir, only, force)
+
+    for name in order:
+        if name in cached:
+            restored = restore_outputs(cache_dir, name, cached[name], out_dir)
+            note = f", {restored} output(s) restored" if restored else ""
+            print(f"    ✓ {name} unchanged (cached{note})")
+            if log is not None:
+                log.skipped(name)
+
+    to_run = [name for name in order if name not in cached]
+    if not to_run:
+        return {}
+
+    # Return values of skipped stages that a stage still to run depends on
+    results = {
+        dep: cached_result(cache_dir, dep)
+        for name in to_run for dep in dependencies(stages, name) if dep in cached
+    }
+    with measure('load_inputs', **measure_options) as record:
+        values = {**load(), **params, 'out_dir': out_dir}
+    if log is not None:
+        log.add(record)
+
+    def finished(name, result, record):
+        results[name] = result
+        if cache_dir:
+            save_stage(cache_dir, name, prints[name], stages[name], result, out_dir, record['wall_s'])
+        if log is not None:
+            log.add(record)
+
+    workers = min(workers or os.cpu_count() or 1, len(to_run))
+    if workers <= 1:
+        _run_serial(stages, to_run, values, results, finished, measure_options)
+    else:
+        frames = {name: value for name, value in values.items() if isinstance(value, pd.DataFrame)}
+        context = {name: value for name, value in values.items() if name not in frames}
+
+        # Shared memory where the platform has it, so the Arrow files never hit disk
+        tmp_dir = tempfile.mkdtemp(prefix='stages-', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+        try:
+            paths = share_frames(frames, tmp_dir)
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,)) as pool:
+                _run_parallel(stages, to_run, context, results, finished, pool, measure_options)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return {name: results[name] for name in to_run}
+
+
+def _announce(stages, name):
+    print(f"\n  {stages[name].get('title', name)}...")
+
+
+def _run_serial(stages, to_run, values, results, finished, measure_options):
+    for name in to_run:
+        _announce(stages, name)
+        spec = stages[name]
+        args = [results[inp] if inp in results else values[inp] for inp in spec['inputs']]
+        finished(name, *_call_stage(name, spec['fn'], args, measure_options))
+
+
+def _run_parallel(stages, to_run, context, results, finished, pool, measure_options):
+    running = {}
+    pending = list(to_run)
+
+    while pending or running:
+        # Submit every stage whose dependencies have finished
+        for name in [n for n in pending if all(dep in results for dep in dependencies(stages, n))]:
+            spec = stages[name]
+            values = {inp: results[inp] if inp in results else context[inp]
+                      for inp in spec['inputs'] if inp in results or inp in context}
+            _announce(stages, name)
+            running[pool.submit(_run_in_worker, name, spec['fn'], spec['inputs'], values, measure_options)] = name
+            pending.remove(name)
+
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            name = running.pop(future)
+            result, record = future.result()
+            finished(name, result, record)
+            print(f"    ✓ {name} finished ({record['wall_s']:.1f} s)")
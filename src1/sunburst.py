@@ -0,0 +1,120 @@
+"""
+Sunburst Hierarchy Builder
+==========================
+Builds the USA -> state -> airport -> delay type tree used by the sunburst chart.
+
+build_sunburst() does one grouped aggregation over (state, airport) and the five
+delay columns, then assembles the nested {"name", "value", "children"} tree in a
+single pass over the grouped rows. build_sunburst_loop() is the original
+per-state / per-airport filtering loop, kept as the reference implementation for
+benchmarking and output comparison.
+
+Usage:
+    from sunburst import build_sunburst
+    sunburst_root = build_sunburst(bts_data)
+
+The grouped aggregation and the tree pass are timed as the 'group' and 'tree'
+steps of the enclosing instrument.measure() (see instrument.py).
+"""
+
+from instrument import count_rows, measure
+
+# (column, label) pairs in the order the delay-type leaves appear in the tree
+DELAY_TYPES = [
+    ('carrier_delay', 'Carrier'),
+    ('weather_delay', 'Weather'),
+    ('nas_delay', 'NAS'),
+    ('security_delay', 'Security'),
+    ('late_aircraft_delay', 'Late Aircraft'),
+]
+
+DELAY_COLS = [col for col, _ in DELAY_TYPES]
+
+
+def create_sunburst_node(name, value, children=None):
+    node = {"name": name, "value": value}
+    if children:
+        node["children"] = children
+    return node
+
+
+def build_sunburst(bts_data):
+    """
+    Build the sunburst tree from BTS rows that already carry a 'state' column.
+
+    States and airports keep their order of first appearance in bts_data, so the
+    result serializes byte-for-byte the same as build_sunburst_loop().
+    """
+    with measure('group', rows_in=len(bts_data)):
+        rows = bts_data[bts_data['state'].notna()]
+
+        state_totals = rows.groupby('state', sort=False, observed=True)['arr_delay'].sum()
+        airport_totals = rows.groupby(['state', 'airport'], sort=False, observed=True)[
+            DELAY_COLS + ['arr_delay']
+        ].sum()
+        count_rows(len(airport_totals))
+
+    with measure('tree', rows_in=len(airport_totals)):
+        # Pairs come out in first-appearance order, so inserting into a dict keyed by
+        # state preserves both the state order and the airport order within a state.
+        airports_by_state = {}
+        for (state, airport), *totals in airport_totals.itertuples(name=None):
+            airport_children = airports_by_state.setdefault(state, [])
+            delay_types = [
+                create_sunburst_node(label, int(total))
+                for (_, label), total in zip(DELAY_TYPES, totals)
+                if total > 0
+            ]
+            if delay_types:
+                airport_children.append(
+                    create_sunburst_node(airport, int(totals[-1]), delay_types)
+                )
+
+        sunburst_data = [
+            create_sunburst_node(state, int(state_totals[state]), airport_children)
+            for state, airport_children in airports_by_state.items()
+            if airport_children
+        ]
+        count_rows(len(sunburst_data))
+
+    return create_sunburst_node("USA", 0, sunburst_data)
+
+
+def build_sunburst_loop(bts_data):
+    """
+    Reference implementation: filter bts_data once per state and once per airport.
+    """
+    sunburst_data = []
+
+    for state in bts_data['state'].dropna().unique():
+        state_data = bts_data[bts_data['state'] == state]
+
+        # Get airports in this state
+        airport_children = []
+        for airport in state_data['airport'].unique():
+            airport_data = state_data[state_data['airport'] == airport]
+
+            # Calculate delay type breakdown for this airport
+            delay_types = []
+            for col, label in DELAY_TYPES:
+                total = airport_data[col].sum()
+                if total > 0:
+                    delay_types.append(create_sunburst_node(label, int(total)))
+
+            if delay_types:
+                airport_node = create_sunburst_node(
+                    airport,
+                    int(airport_data['arr_delay'].sum()),
+                    delay_types
+                )
+                airport_children.append(airport_node)
+
+        if airport_children:
+            state_node = create_sunburst_node(
+                state,
+                int(state_data['arr_delay'].sum()),
+                airport_children
+            )
+            sunburst_data.append(state_node)
+
+    return create_sunburst_node("USA", 0, sunburst_data)
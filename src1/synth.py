@@ -0,0 +1,456 @@
+"""
+Synthetic Dataset Generator
+===========================
+Writes reproducible stand-ins for the raw inputs, with the same file names and
+columns as the real downloads, so the pipeline can be run and benchmarked
+without them:
+
+    Airline_Delay_Cause.csv       one row per (year, month, carrier, airport)
+    airports_geographic.csv       every BTS airport (a few left unmapped) plus
+                                  IATA-less and foreign airports
+    weather_all_airports.csv      hourly ASOS observations, with 'M' / 'T' markers
+    bts_airline_delays.csv        flight-level records (files/JOIN_EXAMPLES.py)
+    skytrax_airline_reviews.csv   reviews for the US carriers and a few others
+
+Sizes come from a named scale; 1x approximates the real files (~400k BTS rows)
+and each step up multiplies every file by about ten:
+
+    tiny   2 years,   5 carriers,   40 airports   (~3k BTS rows, for quick checks)
+    1x     20 years,  17 carriers,  360 airports  (~400k)
+    10x    50 years,  34 carriers,  1000 airports (~4M)
+    100x   100 years, 85 carriers,  2500 airports (~40M)
+
+The same scale and seed always produce identical files.
+
+Usage:
+    python synth.py --scale 1x --out-dir ../data/bench/1x/raw [--seed 0]
+    python synth.py --scale 1x --airports 800 --carriers 30 --out-dir ...
+
+    from synth import SCALES, make_bts, write_datasets
+"""
+
+import argparse
+import os
+import time
+
+import numpy as np
+import pandas as pd
+
+from ingest import SOURCES
+
+SCALES = {
+    'tiny': {'years': 2, 'carriers': 5, 'airports': 40, 'served': 30,
+             'stations': 4, 'flights': 5_000, 'reviews': 2_000},
+    '1x': {'years': 20, 'carriers': 17, 'airports': 360, 'served': 100,
+           'stations': 8, 'flights': 75_000, 'reviews': 41_000},
+    '10x': {'years': 50, 'carriers': 34, 'airports': 1_000, 'served': 200,
+            'stations': 80, 'flights': 750_000, 'reviews': 410_000},
+    '100x': {'years': 100, 'carriers': 85, 'airports': 2_500, 'served': 400,
+             'stations': 800, 'flights': 7_500_000, 'reviews': 4_100_000},
+}
+
+LAST_YEAR = 2024
+
+# Weather and flight-level data cover the last two years
+DETAIL_START, DETAIL_END = '2023-01-01', '2024-12-31 23:00'
+
+# Real BTS carriers first; larger scales add made-up ones
+CARRIERS = [
+    ('AA', 'American Airlines Inc.'), ('DL', 'Delta Air Lines Inc.'),
+    ('UA', 'United Air Lines Inc.'), ('WN', 'Southwest Airlines Co.'),
+    ('AS', 'Alaska Airlines Inc.'), ('B6', 'JetBlue Airways'),
+    ('NK', 'Spirit Air Lines'), ('F9', 'Frontier Airlines Inc.'),
+    ('G4', 'Allegiant Air'), ('HA', 'Hawaiian Airlines Inc.'),
+    ('OO', 'SkyWest Airlines Inc.'), ('MQ', 'Envoy Air'),
+    ('9E', 'Endeavor Air Inc.'), ('OH', 'PSA Airlines Inc.'),
+    ('YX', 'Republic Airline'), ('YV', 'Mesa Airlines Inc.'),
+    ('G7', 'GoJet Airlines LLC d/b/a United Express'),
+]
+
+REVIEW_AIRLINES = {
+    'AA': 'american-airlines', 'DL': 'delta-air-lines', 'UA': 'united-airlines',
+    'WN': 'southwest-airlines', 'AS': 'alaska-airlines', 'B6': 'jetblue-airways',
+    'NK': 'spirit-airlines', 'F9': 'frontier-airlines', 'G4': 'allegiant-air',
+    'HA': 'hawaiian-airlines',
+}
+FOREIGN_AIRLINES = ['british-airways', 'air-canada', 'lufthansa', 'emirates']
+
+STATES = [
+    'AL', 'AK', 'AZ', 'AR', 'CA', 'CO', 'CT', 'DE', 'FL', 'GA', 'HI', 'ID', 'IL', 'IN', 'IA',
+    'KS', 'KY', 'LA', 'ME', 'MD', 'MA', 'MI', 'MN', 'MS', 'MO', 'MT', 'NE', 'NV', 'NH', 'NJ',
+    'NM', 'NY', 'NC', 'ND', 'OH', 'OK', 'OR', 'PA', 'RI', 'SC', 'SD', 'TN', 'TX', 'UT', 'VT',
+    'VA', 'WA', 'WV', 'WI', 'WY',
+]
+
+REVIEW_PHRASES = {
+    'delay': ['Flight was delayed 3 hours.', 'We left late and missed the connection.',
+              'Long wait at the gate, crew held us on the tarmac.', 'Cancelled with no notice.'],
+    'neutral': ['Seat was fine.', 'Average service.', 'Boarding was orderly.',
+                'Food was okay.', 'Crew were friendly.', 'Nothing special to report.'],
+}
+
+
+def _codes(n, length=3):
+    """n distinct upper-case codes: AAA, AAB, ..."""
+    letters = np.array(list('ABCDEFGHIJKLMNOPQRSTUVWXYZ'))
+    index = np.arange(n)
+    columns = [letters[(index // 26 ** k) % 26] for k in reversed(range(length))]
+    return [''.join(chars) for chars in zip(*columns)]
+
+
+def make_carriers(n):
+    """[(code, name)] for n carriers, the real ones first."""
+    carriers = CARRIERS[:n]
+    for i in range(len(carriers), n):
+        carriers.append((f'Z{i:02d}', f'Synthetic Air {i:02d} Inc.'))
+    return carriers
+
+
+def make_airports(n, rng):
+    """
+    One row per synthetic airport: code, name, state, coordinates and a traffic
+    weight (a few hubs carry most flights, as in the real data).
+    """
+    codes = _codes(n)
+    return pd.DataFrame({
+        'code': codes,
+        'name': [f'{code} International Airport' for code in codes],
+        'state': rng.choice(STATES, size=n),
+        'latitude_deg': rng.uniform(25, 49, size=n).round(4),
+        'longitude_deg': rng.uniform(-124, -67, size=n).round(4),
+        'elevation_ft': rng.integers(0, 6000, size=n),
+        'weight': rng.pareto(1.2, size=n) + 0.1,
+    })
+
+
+# ============================================================================
+# BTS DELAY CAUSES (Airline_Delay_Cause.csv)
+# ============================================================================
+
+def make_bts(airports, carriers, years, served, rng):
+    """
+    Airline_Delay_Cause.csv rows: each carrier serves `served` airports every
+    month of `years` years. Counts are consistent (delayed and cancelled flights
+    never exceed arrivals, cause counts and minutes add up to the totals) and
+    about 1% of rows have blank measures, as in the real file.
+    """
+    n_airports = len(airports)
+    served = min(served, n_airports)
+    probabilities = (airports['weight'] / airports['weight'].sum()).to_numpy()
+
+    pairs = np.array([
+        (c, a) for c in range(len(carriers))
+        for a in np.sort(rng.choice(n_airports, size=served, replace=False, p=probabilities))
+    ])
+    months = np.array([(y, m) for y in range(LAST_YEAR - years + 1, LAST_YEAR + 1) for m in range(1, 13)])
+
+    n = len(months) * len(pairs)
+    month_idx = np.repeat(np.arange(len(months)), len(pairs))
+    pair_idx = np.tile(np.arange(len(pairs)), len(months))
+    carrier_idx, airport_idx = pairs[pair_idx, 0], pairs[pair_idx, 1]
+
+    codes = np.array([code for code, _ in carriers])
+    names = np.array([name for _, name in carriers])
+    airport_codes = airports['code'].to_numpy()
+    # BTS style: "City, ST: Airport Name"
+    airport_names = (airports['code'].str.title() + ' City, ' + airports['state'] + ': ' + airports['name']).to_numpy()
+
+    scale = 20 + 2000 * airports['weight'].to_numpy()[airport_idx] / airports['weight'].max()
+    flights = rng.poisson(scale).astype('int64') + 1
+    del15 = rng.binomial(flights, rng.uniform(0.08, 0.3, size=n))
+    cancelled = rng.binomial(flights - del15, 0.015)
+    diverted = rng.binomial(flights - del15 - cancelled, 0.002)
+
+    # Share of delayed flights and minutes per cause (carrier, weather, nas, security, late aircraft)
+    shares = rng.dirichlet([3, 0.6, 3, 0.05, 3.5], size=n)
+    minutes = np.round(del15 * rng.gamma(4, 16, size=n)).astype('int64')
+    cause_minutes = np.floor(shares * minutes[:, None]).astype('int64')
+    cause_minutes[:, 4] += minutes - cause_minutes.sum(axis=1)
+
+    bts = pd.DataFrame({
+        'year': months[month_idx, 0],
+        'month': months[month_idx, 1],
+        'carrier': codes[carrier_idx],
+        'carrier_name': names[carrier_idx],
+        'airport': airport_codes[airport_idx],
+        'airport_name': airport_names[airport_idx],
+        'arr_flights': flights,
+        'arr_del15': del15,
+        **{f'{cause}_ct': (shares[:, i] * del15).round(2)
+           for i, cause in enumerate(['carrier', 'weather', 'nas', 'security', 'late_aircraft'])},
+        'arr_cancelled': cancelled,
+        'arr_diverted': diverted,
+        'arr_delay': minutes,
+        **{f'{cause}_delay': cause_minutes[:, i]
+           for i, cause in enumerate(['carrier', 'weather', 'nas', 'security', 'late_aircraft'])},
+    })
+
+    # Months with no reported operations have blank measures
+    blank = rng.random(n) < 0.01
+    measures = [col for col in bts.columns if col not in ('year', 'month', 'carrier', 'carrier_name',
+                                                          'airport', 'airport_name')]
+    for col in measures:
+        values = bts[col].astype('Float64' if col.endswith('_ct') else 'Int64')
+        values[blank] = pd.NA
+        bts[col] = values
+    return bts
+
+
+# ============================================================================
+# AIRPORTS, WEATHER, FLIGHTS, REVIEWS
+# ============================================================================
+
+def make_geo(airports, rng):
+    """
+    airports_geographic.csv: the BTS airports (2% left out, so some BTS rows
+    have no state), four times as many small US airports without an IATA code,
+    and a few foreign airports.
+    """
+    mapped = airports[rng.random(len(airports)) >= 0.02]
+    us = pd.DataFrame({
+        'ident': 'K' + mapped['code'],
+        'type': np.where(mapped['weight'] > 1, 'large_airport', 'medium_airport'),
+        'name': mapped['name'],
+        'latitude_deg': mapped['latitude_deg'],
+        'longitude_deg': mapped['longitude_deg'],
+        'elevation_ft': mapped['elevation_ft'],
+        'iso_country': 'US',
+        'iso_region': 'US-' + mapped['state'],
+        'municipality': mapped['code'].str.title() + ' City',
+        'iata_code': mapped['code'],
+    })
+
+    n_small = 4 * len(airports)
+    small_codes = _codes(n_small + 26 ** 2, length=4)[26 ** 2:]
+    small = pd.DataFrame({
+        'ident': small_codes,
+        'type': rng.choice(['small_airport', 'heliport', 'closed'], size=n_small),
+        'name': [f'{code} Field' for code in small_codes],
+        'latitude_deg': rng.uniform(25, 49, size=n_small).round(4),
+        'longitude_deg': rng.uniform(-124, -67, size=n_small).round(4),
+        'elevation_ft': rng.integers(0, 9000, size=n_small),
+        'iso_country': 'US',
+        'iso_region': 'US-' + rng.choice(STATES, size=n_small),
+        'municipality': 'Smallville',
+        'iata_code': None,
+    })
+
+    foreign = pd.DataFrame({
+        'ident': ['EGLL', 'CYYZ', 'EDDF', 'OMDB'],
+        'type': 'large_airport',
+        'name': ['London Heathrow Airport', 'Toronto Pearson International Airport',
+                 'Frankfurt Airport', 'Dubai International Airport'],
+        'latitude_deg': [51.47, 43.68, 50.03, 25.25],
+        'longitude_deg': [-0.46, -79.63, 8.56, 55.36],
+        'elevation_ft': [83, 569, 364, 62],
+        'iso_country': ['GB', 'CA', 'DE', 'AE'],
+        'iso_region': ['GB-ENG', 'CA-ON', 'DE-HE', 'AE-DU'],
+        'municipality': ['London', 'Toronto', 'Frankfurt', 'Dubai'],
+        'iata_code': ['LHR', 'YYZ', 'FRA', 'DXB'],
+    })
+
+    geo = pd.concat([us, small, foreign], ignore_index=True)
+    geo.insert(0, 'id', np.arange(1, len(geo) + 1))
+    geo['continent'] = np.where(geo['iso_country'].isin(['US', 'CA']), 'NA', 'EU')
+    geo['scheduled_service'] = np.where(geo['iata_code'].notna(), 'yes', 'no')
+    geo['gps_code'] = geo['ident']
+    geo['local_code'] = geo['iata_code']
+    return geo
+
+
+def make_weather(stations, rng):
+    """weather_all_airports.csv: hourly observations, 'M' for missing and 'T' for trace precipitation."""
+    hours = pd.date_range(DETAIL_START, DETAIL_END, freq='h')
+    n = len(stations) * len(hours)
+    station = np.repeat(stations['code'].to_numpy(), len(hours))
+    valid = np.tile(hours.strftime('%Y-%m-%d %H:%M').to_numpy(), len(stations))
+
+    day_of_year = np.tile(hours.dayofyear.to_numpy(), len(stations))
+    tmpf = (55 - 25 * np.cos(2 * np.pi * day_of_year / 365) + rng.normal(0, 8, size=n)).round(1)
+    dwpf = (tmpf - rng.gamma(2, 6, size=n)).round(1)
+    sknt = rng.gamma(2, 4, size=n).round()
+
+    precipitation = np.where(rng.random(n) < 0.9, 0.0, rng.exponential(0.08, size=n)).round(2).astype(object)
+    precipitation[rng.random(n) < 0.03] = 'T'
+    visibility = np.minimum(10, rng.gamma(6, 2.2, size=n)).round(2).astype(object)
+    visibility[rng.random(n) < 0.02] = 'M'
+    gust = np.where(sknt > 15, (sknt * 1.5).round(), np.nan).astype(object)
+    gust[pd.isna(gust)] = 'M'
+
+    lat = np.repeat(stations['latitude_deg'].to_numpy(), len(hours))
+    lon = np.repeat(stations['longitude_deg'].to_numpy(), len(hours))
+    return pd.DataFrame({
+        'station': station,
+        'valid': valid,
+        'lon': lon,
+        'lat': lat,
+        'tmpf': tmpf,
+        'dwpf': dwpf,
+        'relh': np.clip(100 - 5 * (tmpf - dwpf), 5, 100).round(2),
+        'drct': rng.integers(0, 36, size=n) * 10,
+        'sknt': sknt,
+        'p01i': precipitation,
+        'vsby': visibility,
+        'gust': gust,
+        'skyc1': rng.choice(['CLR', 'FEW', 'SCT', 'BKN', 'OVC'], size=n),
+        'feel': (tmpf - 0.3 * sknt).round(1),
+    })
+
+
+def make_flights(n, airports, stations, carriers, rng):
+    """
+    bts_airline_delays.csv: flight-level records in the weather date range. Most
+    flights leave from a weather station so the JOIN_EXAMPLES weather join matches.
+    """
+    days = pd.date_range(DETAIL_START, DETAIL_END, freq='D')
+    dates = days[rng.integers(0, len(days), size=n)]
+
+    from_station = rng.random(n) < 0.8
+    origin = np.where(
+        from_station,
+        stations['code'].to_numpy()[rng.integers(0, len(stations), size=n)],
+        airports['code'].to_numpy()[rng.integers(0, len(airports), size=n)],
+    )
+    dest = airports['code'].to_numpy()[rng.integers(0, len(airports), size=n)]
+    state = airports.set_index('code')['state']
+
+    dep_delay = np.round(rng.normal(-2, 8, size=n) + np.where(rng.random(n) < 0.2, rng.gamma(1.5, 40, size=n), 0))
+    arr_delay = dep_delay + np.round(rng.normal(-3, 6, size=n))
+    cancelled = rng.random(n) < 0.015
+    arr_delay[cancelled] = np.nan
+    dep_delay[cancelled] = np.nan
+
+    # Cause minutes are only reported for flights arriving 15+ minutes late
+    late = arr_delay >= 15
+    shares = rng.dirichlet([3, 0.6, 3, 0.05, 3.5], size=n)
+    causes = np.where(late[:, None], np.floor(shares * np.nan_to_num(arr_delay)[:, None]), np.nan)
+
+    flights = pd.DataFrame({
+        'FlightDate': dates.strftime('%Y-%m-%d'),
+        'Year': dates.year,
+        'Month': dates.month,
+        'DayofMonth': dates.day,
+        'DayOfWeek': dates.dayofweek + 1,
+        'Carrier': np.array([code for code, _ in carriers])[rng.integers(0, len(carriers), size=n)],
+        'Origin': origin,
+        'Dest': dest,
+        'OriginCityName': pd.Series(origin).str.title().add(' City').to_numpy(),
+        'DestCityName': pd.Series(dest).str.title().add(' City').to_numpy(),
+        'OriginState': state.reindex(origin).to_numpy(),
+        'DestState': state.reindex(dest).to_numpy(),
+        'DepDelay': dep_delay,
+        'ArrDelay': arr_delay,
+        'CarrierDelay': causes[:, 0],
+        'WeatherDelay': causes[:, 1],
+        'NASDelay': causes[:, 2],
+        'SecurityDelay': causes[:, 3],
+        'LateAircraftDelay': causes[:, 4],
+        'ArrFlights': 1,
+        'Cancelled': cancelled.astype(int),
+        'Diverted': (rng.random(n) < 0.002).astype(int),
+    })
+    return flights.sort_values(['FlightDate', 'Carrier', 'Origin'], kind='stable').reset_index(drop=True)
+
+
+def make_reviews(n, carriers, rng):
+    """skytrax_airline_reviews.csv: ratings loosely tied to whether the text mentions a delay."""
+    slugs = [REVIEW_AIRLINES[code] for code, _ in carriers if code in REVIEW_AIRLINES] + FOREIGN_AIRLINES
+    airline = np.array(slugs)[rng.integers(0, len(slugs), size=n)]
+
+    mentions_delay = rng.random(n) < 0.3
+    delay_text = np.array(REVIEW_PHRASES['delay'])[rng.integers(0, len(REVIEW_PHRASES['delay']), size=n)]
+    first = np.array(REVIEW_PHRASES['neutral'])[rng.integers(0, len(REVIEW_PHRASES['neutral']), size=n)]
+    second = np.array(REVIEW_PHRASES['neutral'])[rng.integers(0, len(REVIEW_PHRASES['neutral']), size=n)]
+    content = np.where(mentions_delay, pd.Series(first) + ' ' + delay_text, pd.Series(first) + ' ' + second)
+    content = content.astype(object)
+    content[rng.random(n) < 0.01] = None
+
+    rating = np.clip(np.round(rng.normal(np.where(mentions_delay, 3.5, 6.5), 2.2)), 1, 10)
+    rating = pd.Series(rating).astype('Int64')
+    rating[rng.random(n) < 0.05] = pd.NA
+
+    flown = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 3650, size=n), unit='D')
+    published = flown + pd.to_timedelta(rng.integers(1, 60, size=n), unit='D')
+
+    return pd.DataFrame({
+        'airline_name': airline,
+        'link': [f'/airline-reviews/{slug}/review-{i}' for i, slug in enumerate(airline)],
+        'title': np.where(mentions_delay, '"Delayed again"', '"Decent trip"'),
+        'author': [f'Reviewer {i}' for i in range(n)],
+        'author_country': rng.choice(['United States', 'United Kingdom', 'Canada', 'Australia'], size=n),
+        'date': published.strftime('%Y-%m-%d'),
+        'date_flown': flown.strftime('%B %Y'),
+        'content': content,
+        'aircraft': rng.choice(['Boeing 737', 'Airbus A320', 'Boeing 787', None], size=n),
+        'type_traveller': rng.choice(['Business', 'Couple Leisure', 'Family Leisure', 'Solo Leisure'], size=n),
+        'cabin_flown': rng.choice(['Economy', 'Premium Economy', 'Business Class', 'First Class'],
+                                  size=n, p=[0.75, 0.1, 0.12, 0.03]),
+        'route': None,
+        'overall_rating': rating,
+        'recommended': (rating.fillna(0) >= 6).astype(int),
+    })
+
+
+# ============================================================================
+# WRITE DATASETS
+# ============================================================================
+
+def scale_config(scale='1x', **overrides):
+    """The size settings for a named scale, with any non-None overrides applied."""
+    if scale not in SCALES:
+        raise ValueError(f"unknown scale {scale!r}; choose from {', '.join(SCALES)}")
+    return {**SCALES[scale], **{k: v for k, v in overrides.items() if v is not None}}
+
+
+def make_datasets(config, seed=0):
+    """Generate every dataset for a size config. Returns {source key: DataFrame}."""
+    rng = np.random.default_rng(seed)
+    carriers = make_carriers(config['carriers'])
+    airports = make_airports(config['airports'], rng)
+    # Weather stations are the busiest airports
+    stations = airports.nlargest(min(config['stations'], len(airports)), 'weight')
+
+    return {
+        'bts': make_bts(airports, carriers, config['years'], config['served'], rng),
+        'airports': make_geo(airports, rng),
+        'weather': make_weather(stations, rng),
+        'flights': make_flights(config['flights'], airports, stations, carriers, rng),
+        'reviews': make_reviews(config['reviews'], carriers, rng),
+    }
+
+
+def write_datasets(out_dir, scale='1x', seed=0, **overrides):
+    """Write every dataset as its raw CSV into out_dir. Returns {source key: rows}."""
+    os.makedirs(out_dir, exist_ok=True)
+    rows = {}
+    for key, frame in make_datasets(scale_config(scale, **overrides), seed).items():
+        frame.to_csv(os.path.join(out_dir, SOURCES[key]['filename']), index=False)
+        rows[key] = len(frame)
+    return rows
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Write synthetic stand-ins for the raw datasets.")
+    parser.add_argument('--scale', default='1x', choices=list(SCALES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out-dir', required=True)
+    for name in SCALES['1x']:
+        parser.add_argument(f'--{name}', type=int, default=None, help=f"Override the scale's {name}")
+    args = parser.parse_args()
+
+    overrides = {name: getattr(args, name) for name in SCALES['1x']}
+    start = time.time()
+    rows = write_datasets(args.out_dir, args.scale, args.seed, **overrides)
+
+    print(f"Synthetic datasets ({args.scale}, seed {args.seed}) in {args.out_dir}")
+    for key, count in rows.items():
+        print(f"  ✓ {SOURCES[key]['filename']:<30} {count:>12,} rows")
+    print(f"\n✓ Done in {time.time() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""
+Flight / Weather Join
+=====================
+Attaches ASOS weather observations (weather_all_airports.csv) to flight-level
+records by airport and time, without building Python date objects:
+
+    daily   - the day's aggregated observations (mean temperature, total
+              precipitation, max gust, ...) at the flight's airport
+    hourly  - the single observation closest in time at the flight's airport,
+              within a tolerance: the last one at or before the flight
+              ('backward'), the first one at or after it ('forward') or
+              whichever is nearer ('nearest')
+
+Observations are kept as datetime64 and sorted by (station, valid), so each
+station's observations are one contiguous sorted run. Flights are grouped by
+station and matched against that run with np.searchsorted (merge_asof
+semantics), and each weather column is then gathered with a single take, so
+memory stays at one position array plus the added columns.
+
+Usage:
+    from weather_join import join_weather
+    flights = join_weather(flights, weather, on='Origin', time_col='FlightDate', align='daily')
+    flights = join_weather(flights, weather, time_col='dep_time', align='hourly',
+                           direction='nearest', tolerance='1h')
+"""
+
+import numpy as np
+import pandas as pd
+
+WEATHER_COLUMNS = ['tmpf', 'dwpf', 'relh', 'sknt', 'p01i', 'vsby', 'gust']
+
+# How hourly observations become one value per station and day
+DAILY_AGG = {
+    'tmpf': 'mean',      # Average temperature
+    'dwpf': 'mean',      # Average dew point
+    'relh': 'mean',      # Average humidity
+    'sknt': 'mean',      # Average wind speed
+    'p01i': 'sum',       # Total precipitation
+    'vsby': 'mean',      # Average visibility
+    'gust': 'max',       # Max gust
+}
+
+ALIGNMENTS = ['daily', 'hourly']
+DIRECTIONS = ['backward', 'forward', 'nearest']
+
+
+# ============================================================================
+# OBSERVATIONS
+# ============================================================================
+
+def prepare_weather(weather, columns=None):
+    """Observations with `valid` as datetime64 and a categorical station, sorted by station then time."""
+    columns = columns or [col for col in WEATHER_COLUMNS if col in weather.columns]
+    weather = weather[['station', 'valid'] + columns]
+    weather = weather.assign(
+        station=weather['station'].astype('category'),
+        valid=pd.to_datetime(weather['valid']),
+    )
+    weather = weather.dropna(subset=['station', 'valid'])
+    return weather.sort_values(['station', 'valid'], kind='stable').reset_index(drop=True)
+
+
+def daily_weather(weather, agg=None):
+    """One row per (station, day) of prepared observations; `valid` is the day at midnight."""
+    agg = {col: how for col, how in (agg or DAILY_AGG).items() if col in weather.columns}
+    day = weather['valid'].dt.floor('D')
+    # Grouping on the categorical station and a datetime64 day keeps the result
+    # sorted by station then time, as prepare_weather() left it
+    return weather.groupby([weather['station'], day], observed=True).agg(agg).reset_index()
+
+
+# ============================================================================
+# AS-OF MATCHING
+# ============================================================================
+
+def _ns(times):
+    return pd.to_datetime(times).to_numpy(dtype='datetime64[ns]').view('int64')
+
+
+def asof_positions(times, obs_times, direction='backward', tolerance=None):
+    """
+    Position in the sorted obs_times of each time's match, or -1 where there is
+    none within the tolerance. Times and tolerance are int64 nanoseconds.
+    """
+    n = len(obs_times)
+    # Last observation at or before, first at or after
+    before = np.searchsorted(obs_times, times, side='right') - 1
+    after = np.searchsorted(obs_times, times, side='left')
+
+    no_match = np.iinfo(np.int64).max
+    back_gap = np.where(before >= 0, times - obs_times[np.maximum(before, 0)], no_match)
+    forward_gap = np.where(after < n, obs_times[np.minimum(after, n - 1)] - times, no_match)
+
+    if direction == 'backward':
+        positions, gap = before, back_gap
+    elif direction == 'forward':
+        positions, gap = after, forward_gap
+    else:
+        # Ties go to the earlier observation
+        use_after = forward_gap < back_gap
+        positions = np.where(use_after, after, before)
+        gap = np.where(use_after, forward_gap, back_gap)
+
+    matched = gap != no_match
+    if tolerance is not None:
+        matched &= gap <= tolerance
+    return np.where(matched, positions, -1)
+
+
+def match_positions(keys, times, observations, direction='backward', tolerance=None):
+    """
+    Row position in the prepared observations matching each (station key, time),
+    -1 where there is none. Works one station at a time over contiguous runs.
+    """
+    stations = observations['station'].cat.categories
+    obs_codes = observations['station'].cat.codes.to_numpy()
+    obs_times = _ns(observations['valid'])
+    tolerance = pd.Timedelta(tolerance).value if tolerance is not None else None
+
+    # Keys that are not a weather station get code -1 and stay unmatched
+    codes = stations.get_indexer(pd.Series(keys).astype(object))
+    times = pd.to_datetime(pd.Series(times)).reset_index(drop=True)
+    codes = np.where(times.isna().to_numpy(), -1, codes)
+    times = _ns(times)
+
+    positions = np.full(len(codes), -1, dtype=np.int64)
+    order = np.argsort(codes, kind='stable')
+    sorted_codes = codes[order]
+
+    for code in np.unique(sorted_codes[sorted_codes >= 0]):
+        rows = order[np.searchsorted(sorted_codes, code, 'left'):np.searchsorted(sorted_codes, code, 'right')]
+        start, end = np.searchsorted(obs_codes, code, 'left'), np.searchsorted(obs_codes, code, 'right')
+        if start == end:
+            continue
+        found = asof_positions(times[rows], obs_times[start:end], direction, tolerance)
+        positions[rows] = np.where(found >= 0, found + start, -1)
+
+    return positions
+
+
+# ============================================================================
+# JOIN
+# ============================================================================
+
+def join_weather(flights, weather, on='Origin', time_col='FlightDate', align='daily',
+                 direction='backward', tolerance='1h', columns=None):
+    """
+    Return flights with the matched weather columns added (NaN where nothing
+    matched). Hourly joins also add weather_valid, the matched observation time.
+    `weather` may be raw observations or the output of prepare_weather().
+    """
+    if align not in ALIGNMENTS:
+        raise ValueError(f"align must be one of {', '.join(ALIGNMENTS)}")
+    if direction not in DIRECTIONS:
+        raise ValueError(f"direction must be one of {', '.join(DIRECTIONS)}")
+
+    observations = prepare_weather(weather, columns)
+    times = flights[time_col]
+    if align == 'daily':
+        observations = daily_weather(observations)
+        # Exact match on the day
+        times = pd.to_datetime(times).dt.floor('D')
+        direction, tolerance = 'backward', 0
+
+    positions = match_positions(flights[on], times, observations, direction, tolerance)
+
+    value_columns = [col for col in observations.columns if col not in ('station', 'valid')]
+    if align == 'hourly':
+        value_columns.append('valid')
+    added = {
+        'weather_valid' if col == 'valid' else col:
+            pd.api.extensions.take(observations[col].to_numpy(), positions, allow_fill=True)
+        for col in value_columns
+    }
+    return flights.assign(**{name: pd.Series(values, index=flights.index) for name, values in added.items()})
@@ -0,0 +1,128 @@
+"""
+Output Writers
+==============
+JSON serialization for the pipeline's outputs: orjson when it is installed
+(the standard json module otherwise), compact by default or pretty-printed
+with a 2-space indent as json.dump(indent=2) wrote them, plus precompressed
+.gz / .br siblings for the files the browser downloads.
+
+    <out_dir>/sunburst_data.json
+    <out_dir>/sunburst_data.json.gz     gzip -9, reproducible (no timestamp)
+    <out_dir>/sunburst_data.json.br     brotli -q 11, if brotli is installed
+
+Each file is written to a temporary name and renamed into place, so readers
+never see a partial file.
+
+Usage:
+    from writers import keyed_records, write_json
+    write_json(tree, os.path.join(out_dir, 'sunburst_data.json'))
+    write_json(stats, path, pretty=True, compress=False)
+
+Optional: pip install orjson brotli
+"""
+
+import gzip
+import json
+import os
+
+import numpy as np
+
+COMPRESSED_SUFFIXES = ['.gz', '.br']
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _default(value):
+    # NumPy scalars that slipped into a dictionary
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def dumps(obj, pretty=False, sort_keys=False):
+    """Serialize to UTF-8 JSON bytes. NaN and infinity become null."""
+    orjson = _orjson()
+    if orjson is not None:
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=_default, option=option)
+
+    text = json.dumps(
+        _without_nan(obj), default=_default, sort_keys=sort_keys, ensure_ascii=False,
+        indent=2 if pretty else None, separators=None if pretty else (',', ':'),
+    )
+    return text.encode('utf-8')
+
+
+def _without_nan(value):
+    # Match orjson, which writes non-finite floats as null
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _without_nan(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_without_nan(v) for v in value]
+    return value
+
+
+def compressed_suffixes():
+    """The compressed siblings written here: .gz, plus .br when brotli is installed."""
+    return [suffix for suffix in COMPRESSED_SUFFIXES if suffix != '.br' or _brotli() is not None]
+
+
+def compressed(body):
+    """{suffix: bytes} of the gzip (and, if available, brotli) encodings of body."""
+    encoded = {'.gz': gzip.compress(body, compresslevel=9, mtime=0)}
+    brotli = _brotli()
+    if brotli is not None:
+        encoded['.br'] = brotli.compress(body, quality=11)
+    return encoded
+
+
+def write_bytes(path, data):
+    """Write data to path atomically."""
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+
+def write_json(obj, path, pretty=False, compress=True, sort_keys=False):
+    """Write obj as JSON (plus compressed siblings). Returns {path: bytes written}."""
+    body = dumps(obj, pretty=pretty, sort_keys=sort_keys)
+    files = {path: body}
+    if compress:
+        files.update({path + suffix: data for suffix, data in compressed(body).items()})
+    for file_path, data in files.items():
+        write_bytes(file_path, data)
+    return {file_path: len(data) for file_path, data in files.items()}
+
+
+def json_files(filename):
+    """A JSON output and its possible compressed siblings (for stage output lists)."""
+    return [filename] + [filename + suffix for suffix in COMPRESSED_SUFFIXES]
+
+
+def keyed_records(keys, columns):
+    """
+    {key: {column: value}} from parallel lists, built column-wise instead of
+    row by row (e.g. with iterrows).
+    """
+    names = list(columns)
+    return {key: dict(zip(names, values)) for key, values in zip(keys, zip(*columns.values()))}
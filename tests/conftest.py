@@ -0,0 +1,165 @@
+"""
+Shared fixtures: a small synthetic raw data directory (see src1/synth.py) and
+the enriched BTS rows and airports dimension built from it, as the pipeline
+builds them.
+
+The pipeline modules in src1/ import each other as top-level modules, so
+src1/ is put on sys.path here, as is the repository root for the download
+scripts. The stub_server fixture serves files from a local http.server for
+their tests.
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src1'))
+
+from dataProcess import BTS_COLUMNS  # noqa: E402
+from dimensions import airport_dimension  # noqa: E402
+from enrich import enrich_bts  # noqa: E402
+from ingest import load_dataset  # noqa: E402
+from synth import write_datasets  # noqa: E402
+
+# Two years, so there are months to refresh incrementally
+SCALE = {'years': 2, 'carriers': 4, 'airports': 25, 'served': 15,
+         'stations': 3, 'flights': 500, 'reviews': 200}
+
+
+@pytest.fixture(scope='session')
+def raw_dir(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('raw'))
+    write_datasets(path, 'tiny', seed=0, **SCALE)
+    return path
+
+
+@pytest.fixture(scope='session')
+def store_dir(raw_dir):
+    # Never ingested, so every source is read from its raw CSV
+    return os.path.join(raw_dir, 'store')
+
+
+@pytest.fixture(scope='session')
+def airports(raw_dir, store_dir):
+    return airport_dimension(load_dataset('airports', raw_dir=raw_dir, store_dir=store_dir))
+
+
+@pytest.fixture(scope='session')
+def bts_data(raw_dir, store_dir, airports):
+    """Enriched BTS rows. Shared by every test: copy before changing them."""
+    bts = load_dataset('bts', columns=BTS_COLUMNS, raw_dir=raw_dir, store_dir=store_dir)
+    return enrich_bts(bts, airports)
+
+
+# ============================================================================
+# STUB HTTP SERVER
+# ============================================================================
+
+class StubServer:
+    """
+    Serves in-memory files ({path with query: bytes}) on 127.0.0.1.
+
+    Answers Range requests with 206 (unless ranges is False), sends an ETag and
+    Last-Modified and honours If-None-Match / If-Modified-Since with 304.
+    Status codes queued in errors[path] are answered first, one per request.
+    Every request's (path, headers) is recorded, as is the most requests
+    served at once.
+    """
+
+    LAST_MODIFIED = 'Tue, 01 Oct 2024 10:00:00 GMT'
+
+    def __init__(self):
+        self.files = {}
+        self.errors = {}
+        self.ranges = True
+        self.delay = 0.0
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.url = f'http://127.0.0.1:{self.server.server_port}'
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def etag(self, path):
+        return '"' + hashlib.sha256(self.files[path]).hexdigest()[:16] + '"'
+
+    def requests_for(self, path):
+        """Requests made for one path."""
+        return [headers for requested, headers in self.requests if requested == path]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                with stub.lock:
+                    stub.requests.append((self.path, dict(self.headers)))
+                    stub.active += 1
+                    stub.max_active = max(stub.max_active, stub.active)
+                    queued = stub.errors.get(self.path)
+                    error = queued.pop(0) if queued else None
+                time.sleep(stub.delay)
+                # Done before the response goes out, so a client that has read
+                # it never sees this request still counted as in flight
+                with stub.lock:
+                    stub.active -= 1
+
+                if error:
+                    return self.send_error(error)
+                if self.path not in stub.files:
+                    return self.send_error(404)
+                self.respond(stub.files[self.path], stub.etag(self.path))
+
+            def respond(self, body, etag):
+                if (self.headers.get('If-None-Match') == etag
+                        or (self.headers.get('If-None-Match') is None
+                            and self.headers.get('If-Modified-Since') == stub.LAST_MODIFIED)):
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+
+                status, start = 200, 0
+                match = re.fullmatch(r'bytes=(\d+)-', self.headers.get('Range') or '')
+                if_range = self.headers.get('If-Range')
+                if stub.ranges and match and if_range in (None, etag, stub.LAST_MODIFIED):
+                    start = int(match.group(1))
+                    if start >= len(body):
+                        self.send_response(416)
+                        self.send_header('Content-Range', f'bytes */{len(body)}')
+                        self.end_headers()
+                        return
+                    status = 206
+
+                self.send_response(status)
+                if status == 206:
+                    self.send_header('Content-Range', f'bytes {start}-{len(body) - 1}/{len(body)}')
+                self.send_header('Content-Length', str(len(body) - start))
+                self.send_header('ETag', etag)
+                self.send_header('Last-Modified', stub.LAST_MODIFIED)
+                self.end_headers()
+                self.wfile.write(body[start:])
+
+        return Handler
+
+
+@pytest.fixture
+def stub_server():
+    server = StubServer()
+    yield server
+    server.close()
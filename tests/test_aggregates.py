@@ -0,0 +1,185 @@
+"""
+The partial-aggregate paths (aggregates.py) against a full rebuild:
+incremental month refreshes against partials of every row, and the streaming
+outputs against the ones dataProcess.py builds from the rows in memory.
+"""
+
+import gzip
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import dataProcess
+from aggregates import finalize, partial_aggregates, partial_months, replace_months
+from dimensions import airport_dimension
+from enrich import DELAY_COLS, enrich_bts
+from ingest import SOURCES, load_dataset
+from rankings import RankingIndex
+from sunburst import build_sunburst, build_sunburst_loop
+
+AIRPORTS = {
+    'ATL': 'US-GA', 'SAV': 'US-GA', 'DFW': 'US-TX', 'AUS': 'US-TX', 'IAH': 'US-TX',
+    'ORD': 'US-IL', 'DEN': 'US-CO', 'SEA': 'US-WA',
+}
+CARRIERS = [('DL', 'Delta Air Lines Inc.'), ('AA', 'American Airlines Inc.'), ('ZZ', 'Zed Air')]
+
+
+def make_geo():
+    codes = list(AIRPORTS)
+    return pd.DataFrame({
+        'name': [f'{code} International' for code in codes],
+        'latitude_deg': np.linspace(25, 48, len(codes)),
+        'longitude_deg': np.linspace(-122, -80, len(codes)),
+        'iso_region': list(AIRPORTS.values()),
+        'municipality': [f'{code} City' for code in codes],
+        'iata_code': codes,
+    })
+
+
+def make_bts(seed=0):
+    """
+    One row per (year, month, carrier, airport) over two years. 'XNA' has no
+    airport record; about 2% of rows have no security delay reported.
+    """
+    rng = np.random.default_rng(seed)
+    codes = list(AIRPORTS) + ['XNA']
+    keys = pd.MultiIndex.from_product(
+        [[2022, 2023], range(1, 13), range(len(CARRIERS)), codes],
+        names=['year', 'month', 'carrier_idx', 'airport'],
+    ).to_frame(index=False)
+    n = len(keys)
+
+    flights = rng.integers(50, 3000, size=n).astype('float64')
+    del15 = np.floor(flights * rng.uniform(0.05, 0.3, size=n))
+    causes = np.floor(del15[:, None] * rng.gamma(2, 15, size=(n, len(DELAY_COLS))))
+    bts = pd.DataFrame({
+        'year': keys['year'],
+        'month': keys['month'],
+        'carrier': [CARRIERS[i][0] for i in keys['carrier_idx']],
+        'carrier_name': [CARRIERS[i][1] for i in keys['carrier_idx']],
+        'airport': keys['airport'],
+        'arr_flights': flights,
+        'arr_del15': del15,
+        'arr_cancelled': np.floor(flights * rng.uniform(0, 0.03, size=n)),
+        'arr_delay': causes.sum(axis=1),
+        **{col: causes[:, i] for i, col in enumerate(DELAY_COLS)},
+    })
+    bts.loc[rng.random(n) < 0.02, 'security_delay'] = np.nan
+    return bts
+
+
+@pytest.fixture(scope='module')
+def airports():
+    return airport_dimension(make_geo())
+
+
+@pytest.fixture
+def bts_data(airports):
+    return enrich_bts(make_bts(), airports)
+
+
+def approx_tree(value):
+    """A JSON-like value with every float compared approximately (sums added in another order)."""
+    if isinstance(value, dict):
+        return {key: approx_tree(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [approx_tree(item) for item in value]
+    if isinstance(value, float):
+        return pytest.approx(value, nan_ok=True)
+    return value
+
+
+def assert_outputs_equal(result, expected):
+    assert result.keys() == expected.keys()
+    for name, output in expected.items():
+        if isinstance(output, pd.DataFrame):
+            pd.testing.assert_frame_equal(result[name].reset_index(drop=True), output.reset_index(drop=True),
+                                          check_dtype=False)
+        elif isinstance(output, RankingIndex):
+            assert result[name].to_dict() == approx_tree(output.to_dict()), name
+        else:
+            assert result[name] == approx_tree(output), name
+
+
+# ============================================================================
+# INCREMENTAL
+# ============================================================================
+
+def test_new_months_match_full_rebuild(bts_data, airports):
+    old = partial_aggregates(bts_data[bts_data['year'] < 2023].copy())
+    new = partial_aggregates(bts_data[bts_data['year'] == 2023].copy())
+    full = partial_aggregates(bts_data)
+
+    merged = replace_months(old, new)
+
+    assert partial_months(merged) == partial_months(full)
+    assert_outputs_equal(finalize(merged, airports), finalize(full, airports))
+
+
+def test_revised_month_replaces_old_copy(bts_data, airports):
+    revised = make_bts()
+    in_month = (revised['year'] == 2023) & (revised['month'] == 12)
+    for col in DELAY_COLS + ['arr_delay']:
+        revised[col] = revised[col].where(~in_month, revised[col] * 2)
+    revised = enrich_bts(revised, airports)
+
+    merged = replace_months(partial_aggregates(bts_data), partial_aggregates(revised[in_month].copy()))
+
+    assert_outputs_equal(finalize(merged, airports), finalize(partial_aggregates(revised), airports))
+
+
+def test_partials_are_additive(bts_data):
+    partials = partial_aggregates(bts_data)
+    for view in ('carrier', 'airport'):
+        np.testing.assert_allclose(partials[view]['arr_delay'].sum(), bts_data['arr_delay'].sum())
+    assert int(partials['airport']['n_rows'].sum()) == len(bts_data)
+
+
+def test_sunburst_from_partials_matches_rows(bts_data):
+    # Partials keep the rows' first-appearance order of states and airports
+    assert build_sunburst(partial_aggregates(bts_data)['airport']) == build_sunburst_loop(bts_data)
+
+
+# ============================================================================
+# STREAMING
+# ============================================================================
+
+def read_output(path):
+    if path.endswith('.json'):
+        with open(path) as f:
+            return json.load(f)
+    return pd.read_csv(path)
+
+
+def test_streaming_matches_in_memory(airports, tmp_path):
+    raw_dir, rows_dir, stream_dir = tmp_path / 'raw', tmp_path / 'rows', tmp_path / 'stream'
+    for path in (raw_dir, rows_dir, stream_dir):
+        path.mkdir()
+    make_bts().to_csv(raw_dir / SOURCES['bts']['filename'], index=False)
+    store_dir = str(tmp_path / 'store')
+
+    bts = enrich_bts(load_dataset('bts', columns=dataProcess.BTS_COLUMNS, raw_dir=str(raw_dir),
+                                  store_dir=store_dir), airports)
+    rankings = dataProcess.build_ranking_index(bts, str(rows_dir))
+    dataProcess.build_state_summary(bts, rankings, str(rows_dir))
+    dataProcess.build_sunburst_data(bts, str(rows_dir))
+    dataProcess.build_carrier_metrics(bts, str(rows_dir))
+    dataProcess.build_temporal_delays(bts, str(rows_dir))
+    dataProcess.build_airport_performance(bts, airports, str(rows_dir))
+    dataProcess.build_summary_stats(bts, rankings, str(rows_dir))
+
+    # Several chunks, so partials are combined along the way
+    dataProcess.stream_bts_outputs(str(raw_dir), store_dir, airports, str(stream_dir),
+                                   chunksize=200)
+
+    assert sorted(os.listdir(stream_dir)) == sorted(os.listdir(rows_dir))
+    # Compressed siblings hold the same bytes as their file
+    filenames = [name for name in sorted(os.listdir(rows_dir)) if not name.endswith(('.gz', '.br'))]
+    for name in filenames:
+        if os.path.exists(stream_dir / f'{name}.gz'):
+            assert gzip.decompress((stream_dir / f'{name}.gz').read_bytes()) == (stream_dir / name).read_bytes()
+    assert_outputs_equal({name: read_output(str(stream_dir / name)) for name in filenames},
+                         {name: read_output(str(rows_dir / name)) for name in filenames})
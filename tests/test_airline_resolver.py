@@ -0,0 +1,62 @@
+"""AirlineResolver: review slugs and other spellings to BTS carrier codes."""
+
+import pandas as pd
+import pytest
+
+from airline_resolver import AirlineResolver, add_review_carrier, name_kind, normalize_name
+from dimensions import REVIEW_AIRLINES
+
+
+@pytest.fixture(scope='module')
+def resolver(bts_data):
+    return AirlineResolver.from_carriers(bts_data)
+
+
+def test_normalize_name():
+    assert normalize_name('delta-air-lines') == 'delta'
+    assert normalize_name('Delta Air Lines Inc.') == 'delta'
+    assert normalize_name('sun-country-airlines') == 'sun country'
+
+
+def test_name_kind():
+    assert name_kind('united-airways') != name_kind('United Airlines')
+    assert name_kind('delta-air-lines') == name_kind('Delta Airlines')
+    assert name_kind('Endeavor') == 0
+
+
+@pytest.mark.parametrize('name', ['delta-air-lines', 'Delta Air Lines Inc.', 'Delta Airlines', 'DELTA'])
+def test_delta_spellings(resolver, name):
+    assert resolver.match_table([name]).loc[name, 'carrier'] == 'DL'
+
+
+@pytest.mark.parametrize('name', ['united-airways', 'air-india', 'british-airways', 'lufthansa'])
+def test_foreign_airlines_unmatched(resolver, name):
+    match = resolver.match_table([name]).loc[name]
+    assert pd.isna(match['carrier'])
+    assert pd.isna(match['carrier_name'])
+    # No alias is reported for a name that did not match
+    assert pd.isna(match['alias'])
+
+
+def test_review_slugs_resolve_to_their_carrier(resolver):
+    table = resolver.match_table(list(REVIEW_AIRLINES))
+    assert table['carrier'].to_dict() == REVIEW_AIRLINES
+    assert (table['confidence'] >= resolver.min_confidence).all()
+
+
+def test_kind_only_conflicts_when_both_state_one():
+    resolver = AirlineResolver([('Air Wisconsin Airlines Corp', 'ZW'), ('United Airlines', 'UA')])
+    table = resolver.match_table(['air-wisconsin', 'united-airways', 'united'])
+    assert table.loc['air-wisconsin', 'carrier'] == 'ZW'
+    assert pd.isna(table.loc['united-airways', 'carrier'])
+    assert table.loc['united', 'carrier'] == 'UA'
+
+
+def test_add_review_carrier(resolver):
+    reviews = pd.DataFrame({'airline_name': pd.Series(
+        ['delta-air-lines', 'united-airways', None, 'delta-air-lines'], dtype='category')})
+    add_review_carrier(reviews, resolver)
+    assert reviews['carrier_code'].tolist()[0] == 'DL'
+    assert reviews['carrier_code'].tolist()[3] == 'DL'
+    assert reviews['carrier_code'].iloc[1:3].isna().all()
+    assert reviews['carrier_match'].iloc[2] == 0.0
@@ -0,0 +1,119 @@
+"""
+ColumnStore.group_sum() against DataFrame.groupby(...).sum(), and the query
+service's column-store answers against its cuboid answers.
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import colstore
+from aggregates import MEASURES
+from colstore import build_column_store
+from cube import build_cube
+from enrich import add_state
+from ingest import load_dataset
+from query_service import QueryService
+
+
+@pytest.fixture(scope='module')
+def store(bts_data, tmp_path_factory):
+    return build_column_store(bts_data, str(tmp_path_factory.mktemp('columns') / 'bts'))
+
+
+def expected_sums(rows, by):
+    sums = rows.groupby(by, observed=True, dropna=False)[MEASURES].sum()
+    sums['n_rows'] = rows.groupby(by, observed=True, dropna=False).size()
+    return sums.reset_index()
+
+
+def assert_sums_equal(result, expected, by):
+    assert len(result) == len(expected)
+    for key in by:
+        assert result[key].tolist() == expected[key].astype(object).tolist()
+    for measure in MEASURES + ['n_rows']:
+        np.testing.assert_allclose(result[measure].to_numpy(), expected[measure].to_numpy('float64'))
+
+
+# Sort-order prefixes (reduceat) and other groupings (bincount)
+GROUPINGS = [['year'], ['year', 'month'], ['year', 'month', 'carrier'], ['state'],
+             ['carrier_name', 'airport'], ['airport', 'year']]
+
+
+@pytest.mark.parametrize('by', GROUPINGS)
+def test_group_sum_matches_groupby(store, bts_data, by):
+    assert_sums_equal(store.group_sum(by, MEASURES), expected_sums(bts_data, by), by)
+
+
+@pytest.mark.parametrize('by', GROUPINGS)
+def test_sparse_group_sum_matches_groupby(store, bts_data, by, monkeypatch):
+    # Key combinations summed through np.unique instead of a dense bincount
+    monkeypatch.setattr(colstore, 'DENSE_GROUPS', 0)
+    if by == store.sort_keys[:len(by)]:
+        by = by[::-1]
+    assert_sums_equal(store.group_sum(by, MEASURES), expected_sums(bts_data, by), by)
+
+
+def test_filtered_group_sum_matches_groupby(store, bts_data):
+    first_year = int(bts_data['year'].min())
+    carriers = sorted(bts_data['carrier'].unique())[:2]
+    where = {'year': (first_year, first_year), 'carrier': carriers}
+    rows = bts_data[(bts_data['year'] == first_year) & bts_data['carrier'].isin(carriers)]
+
+    assert_sums_equal(store.group_sum(['year', 'month'], MEASURES, where=where),
+                      expected_sums(rows, ['year', 'month']), ['year', 'month'])
+
+
+def test_total_without_keys(store, bts_data):
+    total = store.group_sum([], ['arr_flights'], where={'carrier': 'no such carrier'})
+    assert total['n_rows'].tolist() == [0]
+    total = store.group_sum([], ['arr_flights'])
+    assert total['arr_flights'].tolist() == [pd.to_numeric(bts_data['arr_flights']).sum()]
+
+
+def test_unknown_key(store):
+    with pytest.raises(KeyError):
+        store.group_sum(['year'], where={'tail_number': 'N123'})
+
+
+# ============================================================================
+# QUERY SERVICE
+# ============================================================================
+
+QUERIES = [
+    {},
+    {'group_by': ['state'], 'measure': ['arr_delay', 'arr_flights']},
+    {'group_by': ['year', 'month'], 'measure': ['arr_del15']},
+    {'group_by': ['carrier_name'], 'measure': ['weather_delay'], 'year_start': ['2024']},
+    {'group_by': ['airport'], 'measure': ['arr_flights'], 'year': ['2023', '2024'], 'year_end': ['2023']},
+]
+
+
+@pytest.fixture(scope='module')
+def services(raw_dir, store_dir, airports, tmp_path_factory):
+    # The cube keeps the cause counts, so it is built from every BTS column
+    bts = add_state(load_dataset('bts', raw_dir=raw_dir, store_dir=store_dir), airports)
+    # An airport with no state, so groups with a missing label are compared too
+    bts['state'] = bts['state'].where(bts['airport'] != bts['airport'].iloc[0])
+    store = build_column_store(bts, str(tmp_path_factory.mktemp('service') / 'bts'))
+    cube = build_cube(bts)
+    return QueryService(cube, store), QueryService(cube)
+
+
+@pytest.mark.parametrize('params', QUERIES)
+def test_column_answers_match_cuboids(services, params):
+    columns, cuboids = services
+    answer, expected = columns.query(params), cuboids.query(params)
+    assert answer['cuboid'] == 'columns'
+    assert expected['cuboid'] != 'columns'
+
+    # Both in label order, missing labels last
+    assert answer['columns'] == expected['columns']
+    if 'state' in answer['group_by']:
+        assert answer['columns']['state'][-1] is None
+
+
+def test_ratios_and_delay_types_use_cuboids(services):
+    columns, _ = services
+    assert columns.query({'measure': ['delay_rate']})['cuboid'] != 'columns'
+    assert columns.query({'measure': ['arr_delay'], 'delay_type': ['weather']})['cuboid'] != 'columns'
@@ -0,0 +1,111 @@
+"""download_cache.sync: the manifest and conditional re-downloads, against a local stub server."""
+
+import hashlib
+import io
+import json
+
+import pytest
+
+from download_cache import load_manifest, save_manifest, sync, verify
+from downloader import Progress
+
+DATA = b'iata_code,name\n' + b'ATL,Hartsfield-Jackson\n' * 2000
+
+
+@pytest.fixture
+def setup(stub_server, tmp_path):
+    stub_server.files['/airports.csv'] = DATA
+    output_path = str(tmp_path / 'airports.csv')
+    manifest_path = str(tmp_path / 'manifest.json')
+
+    def run(**kwargs):
+        jobs = [{'key': 'airports', 'url': f'{stub_server.url}/airports.csv', 'output_path': output_path}]
+        return sync(jobs, manifest_path, progress=Progress(io.StringIO()), **kwargs)['airports']
+
+    return run, output_path, manifest_path
+
+
+def test_first_sync_writes_manifest(stub_server, setup):
+    run, output_path, manifest_path = setup
+    result = run()
+
+    assert result['success'] and result['status'] == 'downloaded'
+    entry = load_manifest(manifest_path)['airports']
+    assert entry['url'] == f'{stub_server.url}/airports.csv'
+    assert entry['filename'] == 'airports.csv'
+    assert entry['size'] == len(DATA)
+    assert entry['sha256'] == hashlib.sha256(DATA).hexdigest()
+    assert entry['etag'] == stub_server.etag('/airports.csv')
+    assert entry['last_modified'] == stub_server.LAST_MODIFIED
+    assert verify(entry, output_path) == (True, "OK (size and SHA-256 match)")
+    # Nothing conditional about a file that is not on disk yet
+    request = stub_server.requests_for('/airports.csv')[0]
+    assert 'If-None-Match' not in request and 'If-Modified-Since' not in request
+
+
+def test_unchanged_file_is_not_transferred(stub_server, setup):
+    run, output_path, manifest_path = setup
+    run()
+    fetched_at = load_manifest(manifest_path)['airports']['fetched_at']
+
+    result = run()
+
+    assert result['success'] and result['status'] == 'not_modified'
+    request = stub_server.requests_for('/airports.csv')[1]
+    assert request['If-None-Match'] == stub_server.etag('/airports.csv')
+    assert request['If-Modified-Since'] == stub_server.LAST_MODIFIED
+    assert load_manifest(manifest_path)['airports']['fetched_at'] == fetched_at
+    with open(output_path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_last_modified_alone_is_enough(stub_server, setup):
+    run, _, manifest_path = setup
+    run()
+    manifest = load_manifest(manifest_path)
+    manifest['airports']['etag'] = None
+    save_manifest(manifest, manifest_path)
+
+    assert run()['status'] == 'not_modified'
+    request = stub_server.requests_for('/airports.csv')[1]
+    assert 'If-None-Match' not in request
+    assert request['If-Modified-Since'] == stub_server.LAST_MODIFIED
+
+
+@pytest.mark.parametrize('damage', ['truncate', 'alter'])
+def test_damaged_file_is_fetched_again(stub_server, setup, damage):
+    run, output_path, manifest_path = setup
+    run()
+    with open(output_path, 'r+b') as f:
+        if damage == 'truncate':
+            f.truncate(len(DATA) // 2)
+        else:
+            f.write(b'XXX')
+    assert not verify(load_manifest(manifest_path)['airports'], output_path)[0]
+
+    result = run()
+
+    assert result['status'] == 'downloaded'
+    assert 'If-None-Match' not in stub_server.requests_for('/airports.csv')[1]
+    with open(output_path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_changed_upstream_file_is_fetched(stub_server, setup):
+    run, output_path, manifest_path = setup
+    run()
+    stub_server.files['/airports.csv'] = DATA + b'ORD,OHare\n'
+
+    assert run()['status'] == 'downloaded'
+    with open(output_path, 'rb') as f:
+        assert f.read().endswith(b'ORD,OHare\n')
+    with open(manifest_path) as f:
+        assert json.load(f)['airports']['etag'] == stub_server.etag('/airports.csv')
+
+
+def test_force_skips_conditional_request(stub_server, setup):
+    run, _, _ = setup
+    run()
+
+    assert run(force=True)['status'] == 'downloaded'
+    assert 'If-None-Match' not in stub_server.requests_for('/airports.csv')[1]
@@ -0,0 +1,84 @@
+"""download_all / download_file against a local stub server."""
+
+import hashlib
+import io
+import os
+
+from downloader import Progress, download_all, download_file
+
+DATA = bytes(range(256)) * 400
+
+
+def test_concurrent_downloads_stay_under_host_limit(stub_server, tmp_path):
+    stub_server.delay = 0.05
+    jobs = []
+    for i in range(6):
+        stub_server.files[f'/file{i}.csv'] = DATA
+        jobs.append({'key': f'file{i}', 'url': f'{stub_server.url}/file{i}.csv',
+                     'output_path': str(tmp_path / f'file{i}.csv')})
+
+    results = download_all(jobs, max_workers=6, per_host_limit=2, progress=Progress(io.StringIO()))
+
+    assert all(result['success'] for result in results.values())
+    assert stub_server.max_active == 2
+    for job in jobs:
+        with open(job['output_path'], 'rb') as f:
+            assert f.read() == DATA
+
+
+def test_resumes_part_file_with_range(stub_server, tmp_path):
+    stub_server.files['/data.csv'] = DATA
+    output_path = str(tmp_path / 'data.csv')
+    with open(output_path + '.part', 'wb') as f:
+        f.write(DATA[:1000])
+
+    result = download_file(f'{stub_server.url}/data.csv', output_path)
+
+    assert stub_server.requests_for('/data.csv')[0]['Range'] == 'bytes=1000-'
+    assert result['status'] == 'downloaded'
+    assert result['size'] == len(DATA)
+    assert result['sha256'] == hashlib.sha256(DATA).hexdigest()
+    with open(output_path, 'rb') as f:
+        assert f.read() == DATA
+    assert not os.path.exists(output_path + '.part')
+
+
+def test_restarts_when_server_ignores_range(stub_server, tmp_path):
+    stub_server.files['/data.csv'] = DATA
+    stub_server.ranges = False
+    output_path = str(tmp_path / 'data.csv')
+    # Not a prefix of DATA: appending to it would corrupt the file
+    with open(output_path + '.part', 'wb') as f:
+        f.write(b'x' * 1000)
+
+    result = download_file(f'{stub_server.url}/data.csv', output_path)
+
+    assert stub_server.requests_for('/data.csv')[0]['Range'] == 'bytes=1000-'
+    assert result['size'] == len(DATA)
+    assert result['sha256'] == hashlib.sha256(DATA).hexdigest()
+    with open(output_path, 'rb') as f:
+        assert f.read() == DATA
+
+
+def test_failed_download_keeps_nothing_in_place(stub_server, tmp_path):
+    output_path = str(tmp_path / 'missing.csv')
+    results = download_all([{'key': 'missing', 'url': f'{stub_server.url}/missing.csv',
+                             'output_path': output_path}], progress=Progress(io.StringIO()))
+
+    assert not results['missing']['success']
+    assert '404' in results['missing']['error']
+    assert not os.path.exists(output_path)
+
+
+def test_already_complete_part_file(stub_server, tmp_path):
+    # 416 for a .part that already holds every byte: it is moved into place
+    stub_server.files['/data.csv'] = DATA
+    output_path = str(tmp_path / 'data.csv')
+    with open(output_path + '.part', 'wb') as f:
+        f.write(DATA)
+
+    result = download_file(f'{stub_server.url}/data.csv', output_path)
+
+    assert result['sha256'] == hashlib.sha256(DATA).hexdigest()
+    with open(output_path, 'rb') as f:
+        assert f.read() == DATA
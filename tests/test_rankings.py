@@ -0,0 +1,108 @@
+"""
+RankingIndex top / bottom / leaders against groupby(...).sum() and
+nlargest / nsmallest over the BTS rows, built from the rows and from the
+streaming partials.
+"""
+
+import pandas as pd
+import pytest
+
+from aggregates import MEASURES, partial_aggregates
+from metrics import metric_of_sums, row_metric
+from rankings import RANKED_METRICS, ROW_MEANS, SUMS, build_rankings, rank_partials, rank_rows
+
+K = 5
+
+# entity: (key column, partitions, metrics)
+ENTITIES = {
+    'airport': ('airport', [[], ['state'], ['year'], ['state', 'year']], list(RANKED_METRICS) + list(ROW_MEANS)),
+    'carrier': ('carrier_full_name', [[], ['year']], list(RANKED_METRICS)),
+    'state': ('state', [[], ['year']], list(RANKED_METRICS) + list(ROW_MEANS)),
+}
+CASES = [(entity, partition) for entity, (_, partitions, _) in ENTITIES.items() for partition in partitions]
+
+
+def build_index(bts_data, source, k=K):
+    if source == 'rows':
+        return build_rankings(rank_rows(bts_data), k)
+    return build_rankings(rank_partials(partial_aggregates(bts_data)), k)
+
+
+@pytest.fixture(scope='module', params=['rows', 'partials'])
+def index(request, bts_data):
+    return build_index(bts_data, request.param)
+
+
+def expected_values(bts_data, key, partition, metric):
+    """Metric per (partition..., key), from the rows."""
+    if metric in ROW_MEANS:
+        rows = bts_data.assign(value=row_metric(bts_data, ROW_MEANS[metric], dtype='float64'))
+        return rows.groupby(partition + [key], observed=True)['value'].mean()
+    sums = bts_data.groupby(partition + [key], observed=True)[SUMS].sum()
+    return metric_of_sums(sums, RANKED_METRICS[metric]).dropna()
+
+
+def partitions(values, partition):
+    """({column: value}, values of one partition indexed by key) for every partition."""
+    if not partition:
+        yield {}, values
+        return
+    for labels, group in values.groupby(level=partition):
+        labels = labels if isinstance(labels, tuple) else (labels,)
+        yield dict(zip(partition, labels)), group.droplevel(partition)
+
+
+def assert_ranked(ranked, expected):
+    assert [key for key, _ in ranked] == expected.index.tolist()
+    assert [value for _, value in ranked] == pytest.approx(expected.tolist())
+
+
+@pytest.mark.parametrize('entity, partition', CASES)
+def test_top_and_bottom_match_groupby(index, bts_data, entity, partition):
+    key, _, metrics = ENTITIES[entity]
+    for metric in metrics:
+        values = expected_values(bts_data, key, partition, metric)
+        for where, group in partitions(values, partition):
+            assert_ranked(index.top(entity, metric, **where), group.nlargest(K))
+            assert_ranked(index.bottom(entity, metric, **where), group.nsmallest(K))
+            assert_ranked(index.top(entity, metric, 2, **where), group.nlargest(2))
+
+
+@pytest.mark.parametrize('entity, by', [('airport', 'state'), ('airport', 'year'), ('carrier', 'year')])
+def test_leaders_match_groupby(index, bts_data, entity, by):
+    key, _, metrics = ENTITIES[entity]
+    for metric in metrics:
+        values = expected_values(bts_data, key, [by], metric)
+        groups = values.groupby(level=by)
+        assert index.leaders(entity, metric, by) == {
+            str(label): group.droplevel(by).nlargest(1).index[0] for label, group in groups}
+        assert index.leaders(entity, metric, by, order='bottom') == {
+            str(label): group.droplevel(by).nsmallest(1).index[0] for label, group in groups}
+
+
+def tie_rows():
+    """One TX month: A1 and A3 average 10 minutes per flight, A2 and A4 5; A5 has no flights."""
+    rows = pd.DataFrame({
+        'airport': ['A3', 'A1', 'A4', 'A2', 'A5'],
+        'arr_flights': [1.0, 2.0, 1.0, 1.0, 0.0],
+        'arr_delay': [10.0, 20.0, 5.0, 5.0, 0.0],
+    }).assign(year=2022, month=1, year_month='2022-01', state='TX', carrier='DL', carrier_full_name='Delta')
+    for col in MEASURES:
+        if col not in rows.columns:
+            rows[col] = 0.0
+    return rows
+
+
+@pytest.mark.parametrize('source', ['rows', 'partials'])
+def test_ties_keep_entity_order(source):
+    rows = tie_rows()
+    index = build_index(rows, source)
+    values = expected_values(rows, 'airport', [], 'avg_delay')
+
+    for where in [{}, {'state': 'TX'}, {'year': 2022}, {'state': 'TX', 'year': 2022}]:
+        assert index.top('airport', 'avg_delay', **where) == [('A1', 10.0), ('A3', 10.0), ('A2', 5.0), ('A4', 5.0)]
+        assert index.bottom('airport', 'avg_delay', **where) == [('A2', 5.0), ('A4', 5.0), ('A1', 10.0), ('A3', 10.0)]
+        assert_ranked(index.top('airport', 'avg_delay', **where), values.nlargest(K))
+        assert_ranked(index.bottom('airport', 'avg_delay', **where), values.nsmallest(K))
+    assert index.leaders('airport', 'avg_delay', 'state') == {'TX': 'A1'}
+    assert index.leaders('airport', 'avg_delay', 'state', order='bottom') == {'TX': 'A2'}
@@ -0,0 +1,139 @@
+"""Stage fingerprints and the stage cache: what reruns when inputs, parameters or code change."""
+
+import os
+
+import pytest
+
+from stages import plan_stages, run_stages, stage_order
+
+
+def count_lines(rows, out_dir):
+    with open(os.path.join(out_dir, 'count.txt'), 'w') as f:
+        f.write(str(len(rows)))
+    return len(rows)
+
+
+def count_lines_twice(rows, out_dir):
+    with open(os.path.join(out_dir, 'count.txt'), 'w') as f:
+        f.write(str(2 * len(rows)))
+    return 2 * len(rows)
+
+
+def label_count(count, title, out_dir):
+    with open(os.path.join(out_dir, 'label.txt'), 'w') as f:
+        f.write(f'{title}: {count}')
+
+
+def first_line(rows, out_dir):
+    with open(os.path.join(out_dir, 'first.txt'), 'w') as f:
+        f.write(rows[0])
+
+
+def make_stages(count_fn=count_lines):
+    return {
+        'count': {'fn': count_fn, 'inputs': ['rows', 'out_dir'], 'outputs': ['count.txt']},
+        'label': {'fn': label_count, 'inputs': ['count', 'title', 'out_dir'], 'outputs': ['label.txt']},
+        'first': {'fn': first_line, 'inputs': ['rows', 'out_dir'], 'outputs': ['first.txt']},
+    }
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    source = tmp_path / 'rows.txt'
+    source.write_text('a\nb\nc\n')
+    out_dir, cache_dir = tmp_path / 'out', tmp_path / 'cache'
+    out_dir.mkdir()
+
+    def load():
+        return {'rows': source.read_text().splitlines()}
+
+    def run(stages=None, params=None, workers=1, **kwargs):
+        return run_stages(stages or make_stages(), data={'rows': {'files': [str(source)]}}, load=load,
+                          params=params or {'title': 'rows'}, out_dir=str(out_dir), cache_dir=str(cache_dir),
+                          workers=workers, **kwargs)
+
+    def cached(stages=None, params=None):
+        _, _, cached = plan_stages(stages or make_stages(), {'rows': {'files': [str(source)]}},
+                                   params or {'title': 'rows'}, str(cache_dir))
+        return set(cached)
+
+    return source, out_dir, run, cached
+
+
+def test_order_follows_dependencies():
+    assert stage_order(make_stages()) == ['count', 'label', 'first']
+    assert stage_order(make_stages(), only=['label']) == ['count', 'label']
+    with pytest.raises(ValueError):
+        stage_order(make_stages(), only=['missing'])
+
+
+def test_unchanged_stages_are_cached(pipeline):
+    _, out_dir, run, cached = pipeline
+    assert set(run()) == {'count', 'label', 'first'}
+    assert cached() == {'count', 'label', 'first'}
+    assert run() == {}
+    assert (out_dir / 'label.txt').read_text() == 'rows: 3'
+
+
+def test_changed_input_file_reruns_its_stages(pipeline):
+    source, out_dir, run, cached = pipeline
+    run()
+    source.write_text('x\ny\n')
+    assert cached() == set()
+    assert set(run()) == {'count', 'label', 'first'}
+    assert (out_dir / 'label.txt').read_text() == 'rows: 2'
+
+
+def test_changed_param_reruns_only_its_stage(pipeline):
+    _, out_dir, run, cached = pipeline
+    run()
+    assert cached(params={'title': 'lines'}) == {'count', 'first'}
+    # 'count' is cached; the rerun 'label' gets its saved return value
+    assert set(run(params={'title': 'lines'})) == {'label'}
+    assert (out_dir / 'label.txt').read_text() == 'lines: 3'
+
+
+def test_changed_code_reruns_stage_and_dependants(pipeline):
+    _, out_dir, run, cached = pipeline
+    run()
+    stages = make_stages(count_lines_twice)
+    assert cached(stages) == {'first'}
+    assert set(run(stages)) == {'count', 'label'}
+    assert (out_dir / 'label.txt').read_text() == 'rows: 6'
+
+
+def test_missing_output_is_restored(pipeline):
+    _, out_dir, run, _ = pipeline
+    run()
+    (out_dir / 'count.txt').unlink()
+    (out_dir / 'first.txt').write_text('edited')
+    assert run() == {}
+    assert (out_dir / 'count.txt').read_text() == '3'
+    assert (out_dir / 'first.txt').read_text() == 'a'
+
+
+def test_force_reruns_everything(pipeline):
+    _, _, run, _ = pipeline
+    run()
+    assert set(run(force=True)) == {'count', 'label', 'first'}
+
+
+def test_pool_run_matches_serial(pipeline):
+    _, out_dir, run, _ = pipeline
+    assert set(run(workers=2, force=True)) == {'count', 'label', 'first'}
+    assert (out_dir / 'label.txt').read_text() == 'rows: 3'
+    assert (out_dir / 'first.txt').read_text() == 'a'
+
+
+def test_changed_code_constant_reruns_data_stages(tmp_path):
+    # e.g. the column list a data input is loaded with
+    def data(columns):
+        return {'rows': {'files': [], 'code': [first_line, columns]}}
+
+    run_stages(make_stages(), data=data(['year', 'month']), load=lambda: {'rows': ['a']},
+               params={'title': 'rows'}, out_dir=str(tmp_path), cache_dir=str(tmp_path / 'cache'), workers=1)
+
+    def cached(columns):
+        return set(plan_stages(make_stages(), data(columns), {'title': 'rows'}, str(tmp_path / 'cache'))[2])
+    assert cached(['year', 'month']) == {'count', 'label', 'first'}
+    assert cached(['year', 'month', 'carrier']) == set()
@@ -0,0 +1,52 @@
+"""build_sunburst() against the per-state / per-airport reference loop."""
+
+import json
+
+import pandas as pd
+import pytest
+
+from bench_sunburst import make_bts_like
+from sunburst import build_sunburst, build_sunburst_loop
+
+
+@pytest.fixture(scope='module')
+def bts_data():
+    # A few airports without a state, some zero and missing minutes
+    return make_bts_like(n_airports=100, n_carriers=2, n_years=1)
+
+
+def test_matches_reference_loop(bts_data):
+    assert build_sunburst(bts_data) == build_sunburst_loop(bts_data)
+
+
+def test_serializes_identically(bts_data):
+    # Same state and airport order, not just the same nodes
+    assert json.dumps(build_sunburst(bts_data)) == json.dumps(build_sunburst_loop(bts_data))
+
+
+def test_tree_shape():
+    rows = pd.DataFrame({
+        'state': ['TX', 'GA', 'TX', None, 'TX'],
+        'airport': ['DFW', 'ATL', 'DFW', 'XXX', 'AUS'],
+        'arr_delay': [10, 7, 5, 100, 3],
+        'carrier_delay': [4, 7, 2, 50, 0],
+        'weather_delay': [6, 0, 0, 50, 0],
+        'nas_delay': [0, 0, 3, 0, 0],
+        'security_delay': [0, 0, 0, 0, 0],
+        'late_aircraft_delay': [0, 0, 0, 0, 0],
+    })
+    expected = {'name': 'USA', 'value': 0, 'children': [
+        {'name': 'TX', 'value': 18, 'children': [
+            {'name': 'DFW', 'value': 15, 'children': [
+                {'name': 'Carrier', 'value': 6},
+                {'name': 'Weather', 'value': 6},
+                {'name': 'NAS', 'value': 3},
+            ]},
+        ]},
+        {'name': 'GA', 'value': 7, 'children': [
+            {'name': 'ATL', 'value': 7, 'children': [{'name': 'Carrier', 'value': 7}]},
+        ]},
+    ]}
+    # Rows without a state are left out; airports without cause minutes (AUS) too
+    assert build_sunburst(rows) == expected
+    assert build_sunburst_loop(rows) == expected
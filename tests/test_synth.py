@@ -0,0 +1,26 @@
+"""The synthetic datasets: reproducible, and readable by the pipeline's loaders."""
+
+import filecmp
+import os
+
+from conftest import SCALE
+from ingest import SOURCES, load_dataset
+from synth import write_datasets
+
+
+def test_same_seed_same_files(raw_dir, tmp_path):
+    write_datasets(str(tmp_path), 'tiny', seed=0, **SCALE)
+    for source in SOURCES.values():
+        assert filecmp.cmp(os.path.join(raw_dir, source['filename']), tmp_path / source['filename'],
+                           shallow=False), source['filename']
+
+
+def test_loads_with_source_schemas(raw_dir, store_dir):
+    bts = load_dataset('bts', raw_dir=raw_dir, store_dir=store_dir)
+    assert len(bts) == SCALE['years'] * 12 * SCALE['carriers'] * SCALE['served']
+    assert (bts['arr_del15'].fillna(0) <= bts['arr_flights'].fillna(0)).all()
+
+    weather = load_dataset('weather', raw_dir=raw_dir, store_dir=store_dir)
+    # 'M' (missing) markers do not turn the readings into text
+    assert weather['station'].nunique() == SCALE['stations']
+    assert weather['tmpf'].dtype.kind == 'f'
@@ -0,0 +1,134 @@
+"""fetch_weather against a local stub of the IEM ASOS service."""
+
+import os
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+import weather_fetch
+from ingest import load_dataset
+from weather_fetch import TRACE_AMOUNT, chunk_path, chunk_url, fetch_weather, plan_chunks
+
+HEADER = 'station,valid,lon,lat,tmpf,p01i,skyc1\n'
+
+
+@pytest.fixture
+def config(stub_server):
+    return {'base_url': f'{stub_server.url}/asos.py', 'stations': ['ATL', 'ORD'],
+            'variables': ['tmpf', 'p01i', 'skyc1'], 'start': '2023-01-01', 'end': '2023-02-28',
+            'max_workers': 2, 'retries': 2, 'backoff_seconds': 0, 'timeout': 10}
+
+
+@pytest.fixture
+def store(tmp_path):
+    return tmp_path / 'store'
+
+
+def serve_chunks(stub_server, config):
+    """Serve two observations per chunk; return {(station, label): request path}."""
+    paths = {}
+    for chunk in plan_chunks({'chunk': 'month', **config}):
+        path = chunk_url(config, chunk)[len(stub_server.url):]
+        day = chunk['start'].isoformat()
+        stub_server.files[path] = (HEADER + f"{chunk['station']},{day} 00:52,-84.4,33.6,40.0,T,CLR\n"
+                                   f"{chunk['station']},{day} 01:52,-84.4,33.6,M,0.02,M\n").encode()
+        paths[chunk['station'], chunk['label']] = path
+    return paths
+
+
+def fetch(config, store):
+    return fetch_weather(config, str(store / 'weather'))
+
+
+def test_chunk_urls(stub_server, config, store):
+    paths = serve_chunks(stub_server, config)
+    assert len(paths) == 4
+
+    query = parse_qs(urlsplit(paths['ORD', '2023-02']).query)
+    assert query['station'] == ['ORD']
+    assert query['data'] == ['tmpf', 'p01i', 'skyc1']
+    assert (query['year1'], query['month1'], query['day1']) == (['2023'], ['2'], ['1'])
+    # The end date is exclusive: the day after the configured end
+    assert (query['year2'], query['month2'], query['day2']) == (['2023'], ['3'], ['1'])
+
+    summary = fetch(config, store)
+    assert summary['fetched'] == 4 and not summary['failed']
+    assert sorted(path for path, _ in stub_server.requests) == sorted(paths.values())
+
+
+def test_retries_transient_errors(stub_server, config, store):
+    paths = serve_chunks(stub_server, config)
+    stub_server.errors[paths['ATL', '2023-01']] = [503, 429]
+
+    summary = fetch(config, store)
+
+    assert summary['fetched'] == 4 and summary['rows'] == 8 and not summary['failed']
+    assert len(stub_server.requests_for(paths['ATL', '2023-01'])) == 3
+
+    weather = load_dataset('weather', raw_dir=str(store), store_dir=str(store))
+    assert len(weather) == 8
+    assert sorted(weather['station'].unique()) == ['ATL', 'ORD']
+    assert sorted(weather['p01i']) == [TRACE_AMOUNT] * 4 + [0.02] * 4
+
+
+def test_rerun_fetches_only_failed_chunks(stub_server, config, store):
+    paths = serve_chunks(stub_server, config)
+    failing = paths['ORD', '2023-01']
+    stub_server.errors[failing] = [500] * 3
+
+    summary = fetch(config, store)
+    assert summary['fetched'] == 3
+    assert [(station, label) for station, label, _ in summary['failed']] == [('ORD', '2023-01')]
+
+    stub_server.requests.clear()
+    summary = fetch(config, store)
+    assert (summary['fetched'], summary['skipped'], summary['failed']) == (1, 3, [])
+    assert [path for path, _ in stub_server.requests] == [failing]
+
+
+def test_partial_chunks_replaced_once_settled(stub_server, config, store):
+    serve_chunks(stub_server, config)
+    out_dir = str(store / 'weather')
+
+    # Periods that have not settled yet are written as .partial files...
+    summary = fetch({**config, 'settle_days': 100_000}, store)
+    assert summary['partial'] == 4
+    chunk = plan_chunks({'chunk': 'month', **config})[0]
+    assert os.path.exists(chunk_path(out_dir, chunk, partial=True))
+    assert not os.path.exists(chunk_path(out_dir, chunk))
+
+    # ...and fetched again on every run, until the final file replaces them
+    summary = fetch(config, store)
+    assert (summary['fetched'], summary['partial'], summary['skipped']) == (4, 0, 0)
+    assert os.path.exists(chunk_path(out_dir, chunk))
+    assert not os.path.exists(chunk_path(out_dir, chunk, partial=True))
+    assert len(load_dataset('weather', raw_dir=str(store), store_dir=str(store))) == 8
+
+
+def test_empty_chunk(stub_server, config, store):
+    # The partition's first part: its schema is the one the others are read as
+    paths = serve_chunks(stub_server, config)
+    stub_server.files[paths['ATL', '2023-01']] = HEADER.encode()
+
+    summary = fetch(config, store)
+    assert summary['fetched'] == 4 and summary['rows'] == 6
+
+    weather = load_dataset('weather', raw_dir=str(store), store_dir=str(store))
+    assert len(weather) == 6
+    assert str(weather['valid'].dtype).startswith('datetime64')
+
+
+def test_interrupted_write_leaves_no_readable_part(stub_server, config, store, monkeypatch):
+    serve_chunks(stub_server, config)
+    fetch({**config, 'stations': ['ORD']}, store)
+
+    # A run killed after writing a temp file but before moving it into place
+    def killed(src, dst):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(weather_fetch.os, 'replace', killed)
+    with pytest.raises(KeyboardInterrupt):
+        weather_fetch.fetch_chunk({**weather_fetch.WEATHER_CONFIG, **config},
+                                  plan_chunks({'chunk': 'month', **config})[0], str(store / 'weather'))
+    monkeypatch.undo()
+
+    assert len(load_dataset('weather', raw_dir=str(store), store_dir=str(store))) == 4
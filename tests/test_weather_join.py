@@ -0,0 +1,80 @@
+"""join_weather() against pandas merge_asof (hourly) and a groupby + merge (daily)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from ingest import load_dataset
+from weather_join import DAILY_AGG, WEATHER_COLUMNS, join_weather
+
+
+@pytest.fixture(scope='module')
+def weather(raw_dir, store_dir):
+    return load_dataset('weather', raw_dir=raw_dir, store_dir=store_dir)
+
+
+@pytest.fixture(scope='module')
+def flights(raw_dir, store_dir, weather):
+    flights = load_dataset('flights', columns=['FlightDate', 'Origin'], raw_dir=raw_dir, store_dir=store_dir)
+    # Departure times within the day, and some flights from airports without a station
+    minutes = np.random.default_rng(0).integers(0, 24 * 60, size=len(flights))
+    return flights.assign(dep_time=flights['FlightDate'] + pd.to_timedelta(minutes, unit='min'))
+
+
+def merge_asof_weather(flights, weather, direction, tolerance):
+    left = flights.assign(station=flights['Origin'].astype(object), row=np.arange(len(flights)))
+    left = left.dropna(subset=['dep_time']).sort_values('dep_time', kind='stable')
+    right = weather[['station', 'valid'] + WEATHER_COLUMNS].assign(station=weather['station'].astype(object))
+    right = right.dropna(subset=['station', 'valid']).sort_values('valid', kind='stable')
+    right = right.assign(weather_valid=right['valid'])
+    matched = pd.merge_asof(left, right, left_on='dep_time', right_on='valid', by='station',
+                            direction=direction, tolerance=pd.Timedelta(tolerance))
+    return matched.set_index('row').reindex(np.arange(len(flights)))
+
+
+@pytest.mark.parametrize('direction', ['backward', 'forward', 'nearest'])
+@pytest.mark.parametrize('tolerance', ['20min', '1h', '3h'])
+def test_hourly_matches_merge_asof(flights, weather, direction, tolerance):
+    joined = join_weather(flights, weather, time_col='dep_time', align='hourly',
+                          direction=direction, tolerance=tolerance)
+    expected = merge_asof_weather(flights, weather, direction, tolerance)
+
+    assert joined['weather_valid'].notna().any()
+    np.testing.assert_array_equal(joined['weather_valid'].to_numpy('datetime64[ns]'),
+                                  expected['weather_valid'].to_numpy('datetime64[ns]'))
+    for col in WEATHER_COLUMNS:
+        np.testing.assert_array_equal(joined[col].to_numpy('float64'), expected[col].to_numpy('float64'))
+
+
+def test_daily_matches_groupby(flights, weather):
+    joined = join_weather(flights, weather, align='daily')
+
+    days = weather.assign(station=weather['station'].astype(object), FlightDate=weather['valid'].dt.floor('D'))
+    daily = days.groupby(['station', 'FlightDate'])[list(DAILY_AGG)].agg(DAILY_AGG).reset_index()
+    expected = flights.assign(station=flights['Origin'].astype(object)).merge(
+        daily, on=['station', 'FlightDate'], how='left')
+
+    assert joined['tmpf'].notna().any()
+    for col in DAILY_AGG:
+        np.testing.assert_allclose(joined[col].to_numpy('float64'), expected[col].to_numpy('float64'))
+
+
+def test_hourly_edge_cases():
+    weather = pd.DataFrame({
+        'station': ['ATL', 'ATL', 'ORD'],
+        'valid': pd.to_datetime(['2024-01-01 10:00', '2024-01-01 11:00', '2024-01-01 10:00']),
+        'tmpf': [50.0, 60.0, 20.0],
+    })
+    flights = pd.DataFrame({
+        'Origin': ['ATL', 'ATL', 'ATL', 'DEN', 'ORD'],
+        'dep_time': pd.to_datetime(['2024-01-01 10:30', '2024-01-01 10:40', '2024-01-01 13:00',
+                                    '2024-01-01 10:00', None]),
+    }, index=[5, 4, 3, 2, 1])
+
+    joined = join_weather(flights, weather, time_col='dep_time', align='hourly', direction='nearest',
+                          columns=['tmpf'])
+
+    # A tie goes to the earlier observation; too far, no station or no time: no match
+    assert joined.index.tolist() == [5, 4, 3, 2, 1]
+    assert joined['tmpf'].tolist()[:2] == [50.0, 60.0]
+    assert joined['tmpf'].iloc[2:].isna().all()
@@ -0,0 +1,265 @@
+"""
+Chunked IEM ASOS Weather Fetcher
+================================
+Replaces the single all-stations, two-year IEM request with one request per
+station and month (or quarter), built from a declarative config.
+
+- Chunks run concurrently, bounded per host, with retry and exponential backoff
+- Each response is parsed straight off the socket and written to its own
+  Parquet file in a per-station partition:
+      <out_dir>/station=ATL/2023-01.parquet
+- Finished chunks are skipped on the next run, so widening the config to more
+  stations or years only fetches the new chunks, and a failed run only
+  re-fetches the chunks that failed
+- A chunk is finished only if it was fetched after its period ended (plus
+  'settle_days' for late reports). Chunks of a period still in progress are
+  written as <label>.partial.parquet, which load_dataset('weather') reads like
+  any other part, and are fetched again on every run until they are finished
+- Trace precipitation ('T') is stored as TRACE_AMOUNT inches, not as missing,
+  so daily precipitation sums count it
+
+The output directory uses the same layout as the 'weather' dataset in
+src1/ingest.py, so load_dataset('weather') reads it directly.
+
+Usage:
+    python weather_fetch.py --out-dir data/store/weather [--config weather.json]
+
+Requires pandas and pyarrow.
+"""
+
+import argparse
+import json
+import os
+import random
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from urllib.parse import urlencode
+
+import pandas as pd
+
+from downloader import host_semaphore
+
+# ============================================================================
+# CONFIGURATION
+# ============================================================================
+
+WEATHER_CONFIG = {
+    'base_url': 'https://mesonet.agron.iastate.edu/cgi-bin/request/asos.py',
+    'stations': ['ATL', 'ORD', 'DEN', 'LAX', 'JFK', 'DFW', 'SFO', 'MIA'],
+    'variables': ['tmpf', 'dwpf', 'relh', 'drct', 'sknt', 'p01i', 'vsby', 'gust',
+                  'skyc1', 'skyc2', 'feel'],
+    'start': '2023-01-01',
+    'end': '2024-12-31',
+    'chunk': 'month',          # 'month' or 'quarter'
+    'max_workers': 4,
+    'per_host_limit': 2,
+    'retries': 4,
+    'backoff_seconds': 2.0,
+    'timeout': 300,
+    'settle_days': 1,          # days after a period ends before its chunk is final
+}
+
+MONTHS_PER_CHUNK = {'month': 1, 'quarter': 3}
+
+# Text-valued ASOS variables; everything else is numeric. Fixing the dtypes
+# keeps every chunk's Parquet schema identical even when a column is all 'M'.
+STRING_VARIABLES = {'skyc1', 'skyc2', 'skyc3', 'skyc4', 'wxcodes', 'metar'}
+
+# Amount variables IEM reports as 'T' for a trace (too small to measure)
+TRACE_VARIABLES = {'p01i', 'ice_accretion_1hr', 'ice_accretion_3hr', 'ice_accretion_6hr'}
+TRACE_AMOUNT = 0.0001      # inches; also used by the 'weather' source in src1/ingest.py
+
+
+# ============================================================================
+# CHUNK PLANNING
+# ============================================================================
+
+def _add_months(day, months):
+    month_index = day.month - 1 + months
+    return date(day.year + month_index // 12, month_index % 12 + 1, 1)
+
+
+def plan_chunks(config):
+    """
+    Return one chunk per (station, period). Each chunk covers [start, end),
+    clipped to the configured date range.
+    """
+    start = date.fromisoformat(config['start'])
+    last = date.fromisoformat(config['end'])
+    step = MONTHS_PER_CHUNK[config['chunk']]
+
+    periods = []
+    period_start = date(start.year, start.month, 1)
+    while period_start <= last:
+        period_end = _add_months(period_start, step)
+        periods.append((max(period_start, start), min(period_end, date.fromordinal(last.toordinal() + 1))))
+        period_start = period_end
+
+    return [
+        {'station': station, 'start': begin, 'end': end,
+         'label': f"{begin.year}-{begin.month:02d}"}
+        for station in config['stations']
+        for begin, end in periods
+    ]
+
+
+def chunk_url(config, chunk):
+    """Build the IEM request URL for one chunk (the end date is exclusive)."""
+    params = [('station', chunk['station'])]
+    params += [('data', variable) for variable in config['variables']]
+    params += [
+        ('year1', chunk['start'].year), ('month1', chunk['start'].month), ('day1', chunk['start'].day),
+        ('year2', chunk['end'].year), ('month2', chunk['end'].month), ('day2', chunk['end'].day),
+        ('tz', 'Etc/UTC'), ('format', 'comma'), ('latlon', 'yes'),
+    ]
+    return f"{config['base_url']}?{urlencode(params)}"
+
+
+def chunk_path(out_dir, chunk, partial=False):
+    suffix = '.partial.parquet' if partial else '.parquet'
+    return os.path.join(out_dir, f"station={chunk['station']}", f"{chunk['label']}{suffix}")
+
+
+def is_settled(config, chunk, today=None):
+    """True once the chunk's period has ended and 'settle_days' have passed (UTC)."""
+    today = today or datetime.now(timezone.utc).date()
+    return chunk['end'] + timedelta(days=config['settle_days']) <= today
+
+
+# ============================================================================
+# FETCH
+# ============================================================================
+
+def chunk_dtypes(config):
+    dtypes = {'lon': 'float64', 'lat': 'float64'}
+    for variable in config['variables']:
+        if variable in STRING_VARIABLES or variable in TRACE_VARIABLES:
+            dtypes[variable] = 'string'
+        else:
+            dtypes[variable] = 'float64'
+    return dtypes
+
+
+def fill_traces(df):
+    """Replace 'T' (trace) in the amount columns with TRACE_AMOUNT, as float64."""
+    for variable in TRACE_VARIABLES & set(df.columns):
+        df[variable] = pd.to_numeric(df[variable].replace('T', str(TRACE_AMOUNT))).astype('float64')
+    return df
+
+
+def _is_retryable(error):
+    if isinstance(error, urllib.error.HTTPError):
+        return error.code == 429 or error.code >= 500
+    return isinstance(error, (urllib.error.URLError, OSError, pd.errors.ParserError))
+
+
+def fetch_chunk(config, chunk, out_dir):
+    """
+    Fetch one chunk and write it to its Parquet file (the .partial file if its
+    period has not settled yet). Returns (row count, settled).
+    Retries transient failures with exponential backoff and jitter.
+    """
+    url = chunk_url(config, chunk)
+    settled = is_settled(config, chunk)
+    path = chunk_path(out_dir, chunk, partial=not settled)
+    dtypes = chunk_dtypes(config)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    for attempt in range(config['retries'] + 1):
+        try:
+            with host_semaphore(url, config['per_host_limit']):
+                with urllib.request.urlopen(url, timeout=config['timeout']) as response:
+                    df = pd.read_csv(response, na_values=['M'], dtype=dtypes,
+                                     parse_dates=['valid'])
+            break
+        except Exception as e:
+            if attempt == config['retries'] or not _is_retryable(e):
+                raise
+            time.sleep(config['backoff_seconds'] * 2 ** attempt * (1 + random.random()))
+
+    # The station lives in the partition directory name. A chunk with no
+    # observations parses 'valid' as object, which would not share a schema
+    # with the other parts.
+    df = fill_traces(df.drop(columns=['station'], errors='ignore'))
+    df['valid'] = df['valid'].astype('datetime64[us]')
+
+    # pyarrow skips '.' files, so a killed run's leftover is never read as a part
+    tmp_path = os.path.join(os.path.dirname(path), '.' + os.path.basename(path) + '.tmp')
+    df.to_parquet(tmp_path, index=False)
+    os.replace(tmp_path, path)
+
+    # A finished chunk replaces the partial one from an earlier run
+    partial_path = chunk_path(out_dir, chunk, partial=True)
+    if settled and os.path.exists(partial_path):
+        os.remove(partial_path)
+    return len(df), settled
+
+
+def fetch_weather(config=WEATHER_CONFIG, out_dir='data/store/weather', force=False):
+    """
+    Fetch every chunk that is not finished on disk: new chunks, and partial
+    chunks of periods that were still in progress when last fetched.
+
+    Returns {'fetched': n, 'partial': n, 'skipped': n, 'rows': n,
+             'failed': [(station, label, error), ...]}.
+    """
+    config = {**WEATHER_CONFIG, **config}
+    chunks = plan_chunks(config)
+    todo = [c for c in chunks if force or not os.path.exists(chunk_path(out_dir, c))]
+
+    def run(chunk):
+        try:
+            return (chunk, *fetch_chunk(config, chunk, out_dir), None)
+        except Exception as e:
+            return chunk, 0, False, str(e)
+
+    summary = {'fetched': 0, 'partial': 0, 'skipped': len(chunks) - len(todo), 'rows': 0, 'failed': []}
+    with ThreadPoolExecutor(max_workers=config['max_workers']) as pool:
+        for chunk, rows, settled, error in pool.map(run, todo):
+            if error:
+                summary['failed'].append((chunk['station'], chunk['label'], error))
+                print(f"  ✗ {chunk['station']} {chunk['label']}: {error}")
+            else:
+                summary['fetched'] += 1
+                summary['partial'] += not settled
+                summary['rows'] += rows
+                note = '' if settled else ' (period in progress, fetched again next run)'
+                print(f"  ✓ {chunk['station']} {chunk['label']}: {rows:,} observations{note}")
+
+    return summary
+
+
+# ============================================================================
+# RUN SCRIPT
+# ============================================================================
+
+def main():
+    parser = argparse.ArgumentParser(description="Fetch IEM ASOS weather in station/period chunks.")
+    parser.add_argument('--out-dir', default='data/store/weather')
+    parser.add_argument('--config', help="JSON file overriding WEATHER_CONFIG keys")
+    parser.add_argument('--force', action='store_true', help="Re-fetch chunks already on disk")
+    args = parser.parse_args()
+
+    config = dict(WEATHER_CONFIG)
+    if args.config:
+        with open(args.config) as f:
+            config.update(json.load(f))
+
+    start = time.time()
+    summary = fetch_weather(config, args.out_dir, force=args.force)
+
+    print()
+    print(f"Fetched {summary['fetched']} chunk(s), {summary['rows']:,} observations; "
+          f"{summary['skipped']} already on disk ({time.time() - start:.1f} s)")
+    if summary['partial']:
+        print(f"   {summary['partial']} chunk(s) cover a period still in progress and stay partial")
+    if summary['failed']:
+        print(f"⚠️  {len(summary['failed'])} chunk(s) failed. Run again to retry only those.")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()